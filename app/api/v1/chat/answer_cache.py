@@ -0,0 +1,92 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from prometheus_client import Counter
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_MAX_PER_DOMAIN = int(os.getenv("ANSWER_CACHE_MAX_PER_DOMAIN", "500"))
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+
+ANSWER_CACHE_LOOKUPS = Counter(
+    "answer_cache_lookups_total", "Semantic answer cache lookups", ["result"]
+)
+
+
+class SemanticAnswerCache:
+    """
+    Per-domain cache of synthesized answers looked up by query-embedding similarity.
+
+    Entries expire after `ttl` seconds, each domain keeps at most
+    `max_per_domain` answers (oldest dropped first), and a domain is cleared
+    whenever its collection changes.
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD, max_per_domain: int = ANSWER_CACHE_MAX_PER_DOMAIN, ttl: int = ANSWER_CACHE_TTL):
+        self.threshold = threshold
+        self.max_per_domain = max_per_domain
+        self.ttl = ttl
+        self._domains: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _prune(self, entry: Dict[str, Any]) -> None:
+        now = time.monotonic()
+        keep = [i for i, created in enumerate(entry["created"]) if now - created < self.ttl]
+        keep = keep[-self.max_per_domain:]
+        if len(keep) != len(entry["created"]):
+            entry["vectors"] = entry["vectors"][keep]
+            entry["answers"] = [entry["answers"][i] for i in keep]
+            entry["created"] = [entry["created"][i] for i in keep]
+
+    def lookup(self, domain: str, query_vector: List[float]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._domains.get(domain)
+            if entry is not None:
+                self._prune(entry)
+            if entry is not None and entry["vectors"].shape[1] != len(query_vector):
+                # The domain was re-embedded at another dimensionality
+                del self._domains[domain]
+                entry = None
+            if entry is None or not entry["answers"]:
+                ANSWER_CACHE_LOOKUPS.labels(result="miss").inc()
+                return None
+
+            scores = entry["vectors"] @ self._normalize(query_vector)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                ANSWER_CACHE_LOOKUPS.labels(result="miss").inc()
+                return None
+
+            ANSWER_CACHE_LOOKUPS.labels(result="hit").inc()
+            return {**entry["answers"][best], "similarity": float(scores[best])}
+
+    def store(self, domain: str, query_vector: List[float], query: str, answer: str, sources: List[str], pages: Optional[List[Dict[str, Any]]] = None) -> None:
+        vector = self._normalize(query_vector)
+        with self._lock:
+            entry = self._domains.get(domain)
+            if entry is None or entry["vectors"].shape[1] != vector.shape[0]:
+                entry = {"vectors": np.empty((0, vector.shape[0]), dtype=np.float32), "answers": [], "created": []}
+                self._domains[domain] = entry
+            entry["vectors"] = np.vstack([entry["vectors"], vector])
+            entry["answers"].append({"query": query, "answer": answer, "sources": list(sources), "pages": list(pages or [])})
+            entry["created"].append(time.monotonic())
+            self._prune(entry)
+
+    def invalidate(self, domain: str) -> None:
+        with self._lock:
+            if self._domains.pop(domain, None) is not None:
+                logger.info(f"Invalidated semantic answer cache for domain '{domain}'")
+
+
+answer_cache = SemanticAnswerCache()
@@ -8,7 +8,7 @@ class AgentState(TypedDict):
     query: str
     answer: str
     sources: List[str]
-    pages: List[int]
+    pages: List[Dict]
     chat_id: str
     search_results: Optional[str]
     document_context: Optional[str]
@@ -18,3 +18,8 @@ class AgentState(TypedDict):
     booking_details: Optional[Dict]
     booking_options: Optional[Dict]
     collection_id: Optional[str]
+    domains: Optional[List[str]]
+    filters: Optional[Dict]
+    intent: Optional[str]
+    cache_mode: bool
+    cache_hit: bool
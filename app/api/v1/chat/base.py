@@ -1,14 +1,17 @@
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Union
 import asyncio
+import json
 import uuid
-from datetime import datetime
+from datetime import date, datetime, timezone
 import logging
 import os
 from dotenv import load_dotenv
 from db.psql_connector import DB, default_config
+from db import async_db
 import re
 from langchain.prompts import PromptTemplate
 from langchain.chains import LLMChain
@@ -16,7 +19,6 @@ from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmb
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from api.v1.chat.vectorstore import *
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_tavily import TavilySearch
 from .document_agent import document_search_agent
@@ -25,6 +27,10 @@ import spacy
 from langsmith import trace
 from .intent_detector import detect_intent, detect_intent_with_context
 from .auth import verify_token, token_manager
+from .history_writer import history_writer
+from .history_store import load_recent_history, recent_history, deletion_watcher
+from .answer_cache import answer_cache
+from .session_store import BoundedSessionStore, BoundedMemorySaver, CHECKPOINTER, create_postgres_checkpointer
 
 nlp = spacy.load("en_core_web_sm")
 
@@ -50,15 +56,24 @@ router = APIRouter()
 
 REQUEST_TIMEOUT = 30
 
-db = DB(default_config())
+class SearchFilters(BaseModel):
+    source: Optional[List[str]] = None
+    doc_type: Optional[List[str]] = None
+    content_type: Optional[List[str]] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
 
 class ChatRequest(BaseModel):
     query: str
     chat_id: Optional[str] = None
+    cache_mode: bool = False
+    domains: Optional[List[str]] = None
+    filters: Optional[SearchFilters] = None
 
 class ChatResponse(BaseModel):
     answer: str
     sources: List[str] = []
+    pages: List[Dict] = []
     chat_id: str
     reasoning_chain: List[str] = []
 
@@ -67,11 +82,11 @@ class CollectionResponse(BaseModel):
     collection_name: str
 
 # Global state management
-chat_sessions: Dict[str, Dict] = {}
-document_collections: Dict[str, Dict] = {}
+chat_sessions = BoundedSessionStore("chat_sessions")
+document_collections = BoundedSessionStore("document_collections")
 
 # Collection-based storage
-collection_documents: Dict[str, List[Dict]] = {}
+collection_documents = BoundedSessionStore("collection_documents")
 
 try:
     embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
@@ -115,7 +130,7 @@ def get_default_collection_id() -> Optional[str]:
             except:
                 pass
 
-def create_initial_state(query: str, collection_ids: Optional[List[str]] = None) -> dict:
+def create_initial_state(query: str, collection_ids: Optional[List[str]] = None, cache_mode: bool = False) -> dict:
     """Create initial state with proper collection handling."""
     if not collection_ids:
         default_collection = get_default_collection_id()
@@ -130,7 +145,7 @@ def create_initial_state(query: str, collection_ids: Optional[List[str]] = None)
         "chat_id": str(uuid.uuid4()),
         "collection_id": collection_ids[0] if collection_ids else None,
         "chat_mode": "short",
-        "cache_mode": False,
+        "cache_mode": cache_mode,
         "collection_mode": False,
         "search_results": None,
         "document_context": None,
@@ -151,7 +166,7 @@ def initialize_available_collections():
 
 initialize_available_collections()
 
-user_sessions: Dict[str, Dict[str, Union[str, int]]] = {}
+user_sessions = BoundedSessionStore("user_sessions")
 
 def convert_history_to_messages(history: List[Dict[str, str]]) -> List:
     """Convert DB chat history to LangChain messages."""
@@ -178,8 +193,8 @@ def route_to_specific_agent(state: AgentState) -> str:
     logger.info(f"[ROUTER] Routing query: {query}")
     logger.info(f"[ROUTER] Collection ID in state: {collection_id}")
     
-    # Use enhanced intent detector with destination context
-    detected_intent = detect_intent_with_context(query)
+    # The coordinator already classified this turn; only re-detect if it did not run
+    detected_intent = state.get("intent") or detect_intent_with_context(query)
 
     if detected_intent == "DOCUMENT":
         logger.info(f"[ROUTER] Routing to document_search_agent for domain: {collection_id}")
@@ -188,23 +203,6 @@ def route_to_specific_agent(state: AgentState) -> str:
         logger.info(f"[ROUTER] Defaulting to document_search_agent for domain: {collection_id}")
         return "document_search_agent"
     
-def save_chat_to_db(chat_id: str, role: str, message: str):
-    try:
-        db = DB(default_config())
-
-        logger.info(f"Saving {role} message to DB: chat_id={chat_id}")
-
-        insert_query = """
-        INSERT INTO ask_hr_history (chat_id, role, message, timestamp)
-        VALUES (%s, %s, %s, NOW())
-        """
-        db.exec(insert_query, (chat_id, role, message))
-        db.commit()
-    except Exception as e:
-        logger.error(f"Error saving message to database: {e}")
-    finally:
-        db.close()
-
 def extract_subject_from_messages(messages: List[BaseMessage]) -> str:
     """Try to extract a subject entity from previous human/assistant messages."""
     for msg in reversed(messages):
@@ -253,6 +251,7 @@ def coordinator_agent(state: AgentState) -> AgentState:
     lower_query = query.lower()
     needs_document = detected_intent == "DOCUMENT" 
 
+    state["intent"] = detected_intent
     state["needs_doc_search"] = needs_document
     state["reasoning_chain"] = reasoning_chain
     if collection_id:
@@ -338,6 +337,17 @@ Answer ONLY using the document context. If not found, say:
 
             state["answer"] = answer
             state["reasoning_chain"].append("Synthesis Agent: Used document-only reasoning.")
+
+            extra_domains = set(state.get("domains") or []) - {state.get("collection_id")}
+            if state.get("cache_mode") and state.get("collection_id") and not extra_domains and not state.get("filters"):
+                answer_cache.store(
+                    get_collection_name(state["collection_id"]),
+                    embed_domain_query(query, state["collection_id"]),
+                    query,
+                    answer,
+                    state.get("sources", []),
+                    state.get("pages", []),
+                )
             return state
 
         except Exception as e:
@@ -367,7 +377,7 @@ def debug_state_node(state: AgentState) -> AgentState:
     logger.info(f"[DEBUG_NODE] === End State Inspection ===")
     return state
 
-def create_chat_graph():
+def create_chat_graph(checkpointer=None):
     with trace("create_chat_graph"):
         """Create the LangGraph workflow with proper routing."""
         workflow = StateGraph(AgentState)
@@ -390,17 +400,31 @@ def create_chat_graph():
             }
         )
         
-        workflow.add_edge("document_search_agent","synthesis_agent" )
+        # A semantic cache hit already carries the answer, skip synthesis
+        workflow.add_conditional_edges(
+            "document_search_agent",
+            should_continue,
+            {
+                "synthesis_agent": "synthesis_agent",
+                END: END,
+            }
+        )
 
         workflow.add_edge("synthesis_agent", END)
     
-        memory = MemorySaver()
+        memory = checkpointer or BoundedMemorySaver()
         app = workflow.compile(checkpointer=memory)
         
         return app
     
 chat_graph = create_chat_graph()
 
+async def init_chat_graph():
+    """Rebuild the chat graph on startup when a Postgres checkpointer is configured."""
+    global chat_graph
+    if CHECKPOINTER == "postgres":
+        chat_graph = create_chat_graph(await create_postgres_checkpointer())
+
 def get_or_create_chat_session(chat_id: str = None) -> str:
     """Return the provided chat_id if it exists, otherwise create a new one."""
     if chat_id and chat_id in chat_sessions:
@@ -414,6 +438,48 @@ def get_or_create_chat_session(chat_id: str = None) -> str:
     return new_chat_id
 
 
+async def build_initial_state(query: str, chat_id: str, domain: str, cache_mode: bool = False, domains: Optional[List[str]] = None, filters: Optional[SearchFilters] = None) -> AgentState:
+    """Load recent history for chat_id and build the graph's initial state."""
+    try:
+        limited_history = await load_recent_history(chat_id)
+    except Exception as db_error:
+        logger.error(f"DB error when loading chat history: {db_error}")
+        limited_history = []
+
+    messages = convert_history_to_messages(limited_history)
+
+    # Append the current message
+    messages.append(HumanMessage(content=query))
+
+    # Create text-based previous context
+    previous_context = "\n".join([
+        f"User: {m['content']}" if m["role"] == "user" else f"Assistant: {m['content']}"
+        for m in limited_history
+    ])
+
+    # Append the current message
+    messages.append(HumanMessage(content=query))
+
+    initial_state = AgentState(
+        messages=[HumanMessage(content=query)],
+        query=query,
+        answer="",
+        sources=[],
+        pages=[],
+        chat_id=chat_id,
+        search_results=None,
+        document_context=None,
+        reasoning_chain=[],
+        previous_context=previous_context,
+        collection_id=domain, 
+        domains=domains,
+        filters=filters.model_dump(mode="json", exclude_none=True) if filters else None,
+        intent=None,
+        cache_mode=cache_mode,
+        cache_hit=False,
+    )
+    return initial_state
+
 @router.post("/{domain}/chat", response_model=ChatResponse, tags=["Chat"])
 async def chat_endpoint(
     request: ChatRequest,
@@ -426,63 +492,9 @@ async def chat_endpoint(
             logger.info(f"[CHAT_ENDPOINT] Received request for domain: '{domain}'")
             logger.info(f"[CHAT_ENDPOINT] Query: {request.query}")
             
+            started_at = datetime.now(timezone.utc)
             chat_id = request.chat_id or str(uuid.uuid4())
-
-            db = DB(default_config())
-            try:
-                cursor = db.exec(
-                    """
-                    SELECT role, message FROM ask_hr_history
-                    WHERE chat_id = %s
-                    ORDER BY timestamp ASC
-                    """,
-                    (chat_id,)
-                )
-                history_rows = cursor.fetchall() if cursor else []
-            except Exception as db_error:
-                logger.error(f"DB error when loading chat history: {db_error}")
-                history_rows = []
-            finally:
-                db.close()
-
-            history_messages = []
-            for row in history_rows:
-                role = row["role"]
-                content = row["message"]
-                if role == "user":
-                    history_messages.append({"role": "user", "content": content})
-                elif role == "assistant":
-                    history_messages.append({"role": "assistant", "content": content})
-
-            # Get the last 5 user-assistant pairs (10 messages)
-            limited_history = history_messages[-10:] if len(history_messages) > 10 else history_messages
-            messages = convert_history_to_messages(limited_history)
-
-            # Append the current message
-            messages.append(HumanMessage(content=request.query))
-
-            # Create text-based previous context
-            previous_context = "\n".join([
-                f"User: {m['content']}" if m["role"] == "user" else f"Assistant: {m['content']}"
-                for m in limited_history
-            ])
-
-            # Append the current message
-            messages.append(HumanMessage(content=request.query))
-
-            initial_state = AgentState(
-                messages=[HumanMessage(content=request.query)],
-                query=request.query,
-                answer="",
-                sources=[],
-                pages=[],
-                chat_id=chat_id,
-                search_results=None,
-                document_context=None,
-                reasoning_chain=[],
-                previous_context=previous_context,
-                collection_id=domain, 
-            )
+            initial_state = await build_initial_state(request.query, chat_id, domain, request.cache_mode, request.domains, request.filters)
             
             logger.info(f"[CHAT_ENDPOINT] Initial state collection_id: {initial_state.get('collection_id')}")
 
@@ -497,19 +509,24 @@ async def chat_endpoint(
             logger.info(f"[CHAT_ENDPOINT] Document found: {final_state.get('document_found')}")
             logger.info(f"[CHAT_ENDPOINT] Reasoning chain: {final_state.get('reasoning_chain')}")
 
-            if chat_id not in chat_sessions:
-                chat_sessions[chat_id] = {"messages": []}
-            chat_sessions[chat_id]["messages"].extend([
+            session = chat_sessions.get(chat_id) or {"messages": []}
+            session["messages"].extend([
                 {"role": "user", "content": request.query},
                 {"role": "assistant", "content": final_state["answer"]}
             ])
+            # Reassign so the bounded store re-measures the session
+            chat_sessions[chat_id] = session
             
-            save_chat_to_db(chat_id=chat_id, role="user", message=request.query)
-            save_chat_to_db(chat_id=chat_id, role="assistant", message=final_state["answer"])
+            await history_writer.save_turn(chat_id, request.query, final_state["answer"], started_at=started_at)
+            recent_history.append(chat_id, [
+                {"role": "user", "content": request.query},
+                {"role": "assistant", "content": final_state["answer"]},
+            ])
             
             return ChatResponse(
                 answer=final_state["answer"],
                 sources=final_state.get("sources", []),
+                pages=final_state.get("pages", []),
                 chat_id=chat_id,
                 reasoning_chain=final_state.get("reasoning_chain", []),
             )
@@ -521,6 +538,86 @@ async def chat_endpoint(
             raise HTTPException(status_code=500, detail=str(e))
         
 
+def _sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@router.post("/{domain}/chat/stream", tags=["Chat"])
+async def chat_stream_endpoint(
+    request: ChatRequest,
+    domain: str,
+    token: str = Depends(token_manager.verify_frontend_token)
+):
+    """
+    Streaming chat endpoint (Server-Sent Events).
+
+    Emits `reasoning` events as each graph node finishes, a `sources` event
+    once documents are retrieved, `token` events as the synthesis LLM
+    generates the answer and a final `done` event with the full answer.
+    """
+    logger.info(f"[CHAT_STREAM] Received request for domain: '{domain}'")
+    started_at = datetime.now(timezone.utc)
+    chat_id = request.chat_id or str(uuid.uuid4())
+    initial_state = await build_initial_state(request.query, chat_id, domain, request.cache_mode, request.domains, request.filters)
+    config = {"configurable": {"thread_id": chat_id}}
+
+    async def event_stream():
+        answer = ""
+        streamed_tokens = []
+        sources: List[str] = []
+        pages: List[Dict] = []
+        reasoning_sent = 0
+        yield _sse_event("start", {"chat_id": chat_id})
+        try:
+            async for mode, chunk in chat_graph.astream(
+                initial_state, config, stream_mode=["updates", "messages"]
+            ):
+                if mode == "messages":
+                    message, metadata = chunk
+                    if metadata.get("langgraph_node") == "synthesis_agent" and message.content:
+                        streamed_tokens.append(message.content)
+                        yield _sse_event("token", {"content": message.content})
+                    continue
+
+                for node, update in chunk.items():
+                    if not isinstance(update, dict):
+                        continue
+                    reasoning_chain = update.get("reasoning_chain") or []
+                    for step in reasoning_chain[reasoning_sent:]:
+                        yield _sse_event("reasoning", {"node": node, "step": step})
+                    reasoning_sent = max(reasoning_sent, len(reasoning_chain))
+
+                    if node == "document_search_agent" and update.get("sources"):
+                        sources = update["sources"]
+                        pages = update.get("pages") or []
+                        yield _sse_event("sources", {"sources": sources, "pages": pages})
+                    if update.get("answer"):
+                        # Set by synthesis_agent, or by document_search_agent on a cache hit
+                        answer = update["answer"]
+
+            if not answer:
+                answer = "".join(streamed_tokens)
+            if not streamed_tokens and answer:
+                # Fallback answers are not produced by the LLM, send them whole
+                yield _sse_event("token", {"content": answer})
+
+            yield _sse_event("done", {"answer": answer, "sources": sources, "pages": pages, "chat_id": chat_id})
+        except Exception as e:
+            logger.error(f"[CHAT_STREAM] Streaming error: {e}")
+            yield _sse_event("error", {"detail": str(e)})
+        finally:
+            if answer:
+                await history_writer.save_turn(chat_id, request.query, answer, started_at=started_at)
+                recent_history.append(chat_id, [
+                    {"role": "user", "content": request.query},
+                    {"role": "assistant", "content": answer},
+                ])
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/health", tags=["Chat"])
 async def health_check(
     token: str = Depends(verify_token)
@@ -534,18 +631,14 @@ async def debug_check_data(
 ):
     """Simple check to see what's in the database."""
     try:
-        db = DB(default_config())
-        
-        db.exec("SELECT COUNT(*) as count FROM ask_hr_history")
-        total_result = db.fetchone()
-        total_count = total_result["count"] if total_result else 0
-        
-        db.exec("SELECT chat_id, role, message, timestamp FROM ask_hr_history ORDER BY timestamp DESC LIMIT 10")
-        sample_records = db.fetchall()
-        
-        db.exec("SELECT DISTINCT chat_id FROM ask_hr_history")
-        distinct_ids = db.fetchall()
-        
+        total_result = await async_db.fetch_all("SELECT COUNT(*) as count FROM ask_hr_history")
+        total_count = total_result[0]["count"] if total_result else 0
+
+        sample_records = await async_db.fetch_all(
+            "SELECT chat_id, role, message, timestamp FROM ask_hr_history ORDER BY timestamp DESC LIMIT 10"
+        )
+        distinct_ids = await async_db.fetch_all("SELECT DISTINCT chat_id FROM ask_hr_history")
+
         return {
             "total_records": total_count,
             "distinct_chat_ids": [row["chat_id"] for row in distinct_ids] if distinct_ids else [],
@@ -555,8 +648,6 @@ async def debug_check_data(
     except Exception as e:
         logger.error(f"Debug error: {e}")
         return {"error": str(e)}
-    finally:
-        db.close()
 
 
 @router.get("/sessions", tags=["Database"])
@@ -565,8 +656,7 @@ async def get_all_chat_sessions(
 ):
     """Get all unique chat session IDs from the database."""
     try:
-        db = DB(default_config())
-        db.exec(
+        await async_db.execute(
             """
             CREATE TABLE IF NOT EXISTS ask_hr_history (
                 id SERIAL PRIMARY KEY,
@@ -577,8 +667,7 @@ async def get_all_chat_sessions(
             )
             """
         )
-        db.commit()
-        db.exec(
+        sessions = await async_db.fetch_all(
             """
             SELECT DISTINCT chat_id, 
                    MIN(timestamp) as first_message_time,
@@ -590,7 +679,6 @@ async def get_all_chat_sessions(
             ORDER BY last_message_time DESC
             """
         )
-        sessions = db.fetchall()
         
         session_list = []
         for session in sessions:
@@ -610,8 +698,6 @@ async def get_all_chat_sessions(
     except Exception as e:
         logger.error(f"Error fetching chat sessions: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch chat sessions: {str(e)}")
-    finally:
-        db.close()
 
 
 @router.get("/session/{session_id}/history", tags=["Database"])
@@ -621,8 +707,7 @@ async def get_session_history(
     ):
     """Get chat history for a specific session ID."""
     try:
-        db = DB(default_config())
-        db.exec(
+        history = await async_db.fetch_all(
             """
             SELECT role, message, timestamp
             FROM ask_hr_history
@@ -631,7 +716,6 @@ async def get_session_history(
             """,
             (session_id,)
         )
-        history = db.fetchall()
         
         return {
             "session_id": session_id,
@@ -642,8 +726,6 @@ async def get_session_history(
     except Exception as e:
         logger.error(f"Error fetching session history: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch session history: {str(e)}")
-    finally:
-        db.close()
 
 
 @router.delete("/session/{session_id}", tags=["Database"])
@@ -653,18 +735,22 @@ async def delete_session(
     ):
     """Delete all messages for a specific session ID."""
     try:
-        db = DB(default_config())
-        db.exec(
+        # Drop unflushed turns first so the next flush does not bring them back
+        await history_writer.discard(session_id)
+        await async_db.execute(
             """
             DELETE FROM ask_hr_history
             WHERE chat_id = %s
             """,
             (session_id,)
         )
-        db.commit()
         
         if session_id in chat_sessions:
             del chat_sessions[session_id]
+        # Other workers evict their cached copy when they see the marker
+        await deletion_watcher.mark_deleted(session_id)
+        if isinstance(chat_graph.checkpointer, BoundedMemorySaver):
+            chat_graph.checkpointer.evict_thread(session_id)
         
         return {
             "status": "success",
@@ -674,17 +760,11 @@ async def delete_session(
     except Exception as e:
         logger.error(f"Error deleting session: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to delete session: {str(e)}")
-    finally:
-        db.close()
 
 async def get_chats():
     try:
-        db = DB(default_config())
-        db.exec("SELECT * FROM ask_hr_history ORDER BY timestamp DESC LIMIT 10")
-        rows = db.fetchall()
+        rows = await async_db.fetch_all("SELECT * FROM ask_hr_history ORDER BY timestamp DESC LIMIT 10")
         return {"chats": rows}
     except Exception as e:
         logger.error(f"Failed to fetch chats: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch chats")
-    finally:
-        db.close()
\ No newline at end of file
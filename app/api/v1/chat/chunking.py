@@ -0,0 +1,227 @@
+"""
+Token-sized, structure-aware text chunking.
+
+Text is split into headings and sentences, which are packed into chunks
+of at most `chunk_size` tokens (the tokenizer the context budget uses)
+with `chunk_overlap` tokens of trailing sentences repeated in the next
+chunk. A chunk never crosses a heading, and the current heading is
+prepended to every chunk of its section.
+
+Markdown headings always start a section. Numbered ("1.2 Revenue") and
+ALL-CAPS titles only do when they stand alone as their own paragraph,
+so wrapped body lines and running page headers do not split chunks.
+Extractors mark layout-confirmed headings (PDF font size, DOCX heading
+styles) as markdown.
+
+Kept free of app-level imports so it can run inside extraction workers.
+"""
+import logging
+import os
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "2048"))
+CHUNK_ENCODING = os.getenv("CHUNK_ENCODING", "cl100k_base")
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_MARKDOWN_HEADING = re.compile(r"#{1,6}\s+\S.*")
+_TITLE = re.compile(
+    r"(?:\d+(?:\.\d+)*\.?|[IVXLC]+\.)\s+[A-Z][^.]*"  # 1.2 Revenue / IV. Risks
+    r"|[A-Z][A-Z0-9 &,/()'-]{2,}"             # ALL CAPS
+)
+_MAX_HEADING_CHARS = 100
+
+logger = logging.getLogger(__name__)
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    """The tiktoken encoding, or None when it cannot be loaded (tried and logged once)."""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(CHUNK_ENCODING)
+        except Exception as e:
+            _encoding_failed = True
+            logger.warning(f"Tokenizer '{CHUNK_ENCODING}' unavailable, estimating tokens from characters: {e}")
+    return _encoding
+
+
+def token_counts(texts: Sequence[str]) -> List[int]:
+    """Token counts for a batch of strings, encoded in one call."""
+    encoding = _get_encoding()
+    if encoding is None:
+        return [len(text) // 4 + 1 for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(list(texts))]
+
+
+def split_tokens(text: str, size: int) -> List[str]:
+    """Hard-split a run of text with no usable boundary into `size`-token pieces."""
+    encoding = _get_encoding()
+    if encoding is None:
+        # Matches the len // 4 + 1 estimate of token_counts
+        step = max(size - 1, 1) * 4
+        return [text[i:i + step] for i in range(0, len(text), step)]
+    tokens = encoding.encode_ordinary(text)
+    return [encoding.decode(tokens[i:i + size]) for i in range(0, len(tokens), size)]
+
+
+def _is_heading(line: str, standalone: bool) -> bool:
+    """
+    Markdown headings always count; numbered and ALL-CAPS titles only when
+    the line is a paragraph of its own, never when it runs into the next line.
+    """
+    if len(line) > _MAX_HEADING_CHARS:
+        return False
+    if _MARKDOWN_HEADING.fullmatch(line):
+        return True
+    return standalone and not line.endswith((".", ",", ";")) and _TITLE.fullmatch(line) is not None
+
+
+def split_units(text: str) -> Iterator[Tuple[str, bool]]:
+    """Yield (unit, is_heading) where a unit is a heading line or a sentence."""
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        body: List[str] = []
+        lines = [line.strip() for line in paragraph.splitlines() if line.strip()]
+        for line in lines:
+            if _is_heading(line, standalone=len(lines) == 1):
+                if body:
+                    yield from ((s, False) for s in _SENTENCE_BREAK.split(" ".join(body)))
+                    body = []
+                yield line.lstrip("# "), True
+            else:
+                body.append(line)
+        if body:
+            yield from ((s, False) for s in _SENTENCE_BREAK.split(" ".join(body)))
+
+
+class IncrementalChunker:
+    """
+    Packs a stream of text segments into token-sized chunks.
+
+    Segments are fed one at a time (e.g. one PDF page) and chunks are
+    emitted as soon as they are full, so the buffer never holds much more
+    than one chunk plus the current segment. Each chunk records the pages
+    its sentences came from.
+    """
+
+    def __init__(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None):
+        self.chunk_size = chunk_size or CHUNK_TOKENS
+        self.chunk_overlap = CHUNK_OVERLAP_TOKENS if chunk_overlap is None else chunk_overlap
+        if self.chunk_overlap >= self.chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self._heading = ""
+        self._heading_tokens = 0
+        # (sentence, tokens, page) waiting to be emitted
+        self._units: List[Tuple[str, int, Optional[int]]] = []
+        self._tokens = 0
+        self._fresh = 0
+
+    def feed(self, text: str, page: Optional[int] = None) -> Iterator[Dict]:
+        if not text or not text.strip():
+            return
+        units = list(split_units(text))
+        counts = token_counts([unit for unit, _ in units])
+        for (unit, is_heading), tokens in zip(units, counts):
+            if is_heading:
+                yield from self._start_section(unit, tokens)
+                continue
+            budget = self._budget()
+            if tokens > budget:
+                pieces = split_tokens(unit, budget)
+                for piece, piece_tokens in zip(pieces, token_counts(pieces)):
+                    yield from self._add(piece, piece_tokens, page)
+            else:
+                yield from self._add(unit, tokens, page)
+
+    def flush(self) -> Iterator[Dict]:
+        if self._fresh:
+            yield self._emit()
+        self._units = []
+        self._tokens = 0
+        self._fresh = 0
+
+    def _budget(self) -> int:
+        return max(self.chunk_size - self._heading_tokens, self.chunk_size // 2)
+
+    def _start_section(self, heading: str, tokens: int) -> Iterator[Dict]:
+        if self._fresh:
+            yield self._emit()
+            self._heading = ""
+        # Consecutive headings (e.g. part and item titles) are kept together
+        lines = (self._heading.split("\n") if self._heading else [])[-2:] + [heading]
+        self._heading = "\n".join(lines)
+        self._heading_tokens = sum(token_counts(lines)) if len(lines) > 1 else tokens
+        if self._heading_tokens > self.chunk_size // 2:
+            self._heading = heading[:_MAX_HEADING_CHARS]
+            self._heading_tokens = min(tokens, self.chunk_size // 2)
+        # Overlap does not cross sections
+        self._units = []
+        self._tokens = 0
+
+    def _add(self, unit: str, tokens: int, page: Optional[int]) -> Iterator[Dict]:
+        budget = self._budget()
+        if self._fresh and self._tokens + tokens > budget:
+            yield self._emit()
+        # Overlap carried from the previous chunk gives way to a unit that
+        # would not fit next to it
+        carried = len(self._units) - self._fresh
+        while carried and self._tokens + tokens > budget:
+            self._tokens -= self._units.pop(0)[1]
+            carried -= 1
+        self._units.append((unit, tokens, page))
+        self._tokens += tokens
+        self._fresh += 1
+
+    def _emit(self) -> Dict:
+        body = " ".join(unit for unit, _, _ in self._units)
+        chunk = {
+            "text": f"{self._heading}\n{body}" if self._heading else body,
+            "pages": list(dict.fromkeys(page for _, _, page in self._units if page is not None)),
+            "tokens": self._heading_tokens + self._tokens if self._heading else self._tokens,
+        }
+
+        # Carry trailing sentences into the next chunk as overlap
+        kept: List[Tuple[str, int, Optional[int]]] = []
+        kept_tokens = 0
+        for unit in reversed(self._units):
+            if kept_tokens + unit[1] > self.chunk_overlap:
+                break
+            kept.insert(0, unit)
+            kept_tokens += unit[1]
+        self._units = kept
+        self._tokens = kept_tokens
+        self._fresh = 0
+        return chunk
+
+
+def chunk_segments(
+    segments: Iterable[Tuple[Optional[int], str]],
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+) -> Iterator[Dict]:
+    """Chunk (page, text) segments lazily, e.g. the pages of a PDF."""
+    chunker = IncrementalChunker(chunk_size, chunk_overlap)
+    for page, text in segments:
+        yield from chunker.feed(text, page)
+    yield from chunker.flush()
+
+
+def iter_chunks(text: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> Iterator[Dict]:
+    """Generator over the chunks of one document, yielded as they are cut."""
+    return chunk_segments([(None, text)], chunk_size, chunk_overlap)
+
+
+def chunk_text(text: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[str]:
+    return [chunk["text"] for chunk in iter_chunks(text, chunk_size, chunk_overlap)]
+
+
+def chunk_batch(texts: Sequence[str], chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[List[Dict]]:
+    """Chunk several documents in one call, e.g. one pool task per batch."""
+    return [list(iter_chunks(text, chunk_size, chunk_overlap)) for text in texts]
@@ -1,27 +1,33 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer
-from pydantic import BaseModel, HttpUrl
-from typing import Dict, List, Optional
+from pydantic import BaseModel, Field, HttpUrl, model_validator
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 import logging
 import os
 import aiohttp
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
-import trafilatura
-from readability import Document
 from db.psql_connector import DB, default_config
 from api.v1.chat.vectorstore import *
 from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from .app_types import AgentState
 from .auth import verify_token, token_manager 
-import pdfplumber
-import docx
+from .session_store import BoundedSessionStore
+from .answer_cache import answer_cache
+from .reranker import select_context, RERANK_ENABLED, RERANK_CANDIDATES
+from .onedrive import GraphClient, ONEDRIVE_DOWNLOAD_CONCURRENCY
+from .chunking import chunk_text, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_MAX_TOKENS
+from .extraction import (
+    extraction_executor, extract_chunks, extract_html,
+    parse_csv, parse_docx, parse_pdf, parse_text, parse_xlsx,
+)
+from .ingest_jobs import ingestion_jobs, IngestionJob
 import io
-import requests
-
-GRAPH_URL = "https://graph.microsoft.com/v1.0"
+import asyncio
+import json
+import math
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +45,9 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 REQUEST_TIMEOUT = 30
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "10"))
+FETCH_PER_HOST_CONCURRENCY = int(os.getenv("FETCH_PER_HOST_CONCURRENCY", "2"))
+FETCH_RETRIES = int(os.getenv("FETCH_RETRIES", "2"))
 
 security = HTTPBearer()
 
@@ -52,7 +61,7 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     answer: str
     sources: List[str] = []
-    pages: List[int] = []
+    pages: List[Dict] = []
     images: List[str] = []
     chat_id: str
     reasoning_chain: List[str] = []
@@ -61,6 +70,14 @@ class ChatResponse(BaseModel):
 class DomainRequest(BaseModel):
     domain: str
     description: Optional[str] = None
+    hybrid: Optional[bool] = None
+    profile: Optional[str] = None
+    hnsw_m: Optional[int] = None
+    hnsw_ef_construct: Optional[int] = None
+    dimension: Optional[int] = None
+
+class ReembedRequest(BaseModel):
+    dimension: int = Field(..., gt=0)
 
 class DomainResponse(BaseModel):
     domain: str
@@ -68,18 +85,44 @@ class DomainResponse(BaseModel):
     status: str
     points_count: Optional[int] = None
 
-class HRKBRequest(BaseModel):
+class ChunkingParams(BaseModel):
+    """
+    Chunk sizing shared by the ingest requests. `chunk_tokens` and
+    `overlap_tokens` are in tokens. `chunk_size` and `chunk_overlap` keep
+    their original meaning, characters, and are converted at 4 characters
+    per token when the token fields are not given.
+    """
+    chunk_tokens: Optional[int] = Field(None, gt=0, le=CHUNK_MAX_TOKENS)  # defaults to CHUNK_TOKENS
+    overlap_tokens: Optional[int] = Field(None, ge=0, le=CHUNK_MAX_TOKENS)  # defaults to CHUNK_OVERLAP_TOKENS
+    chunk_size: Optional[int] = Field(None, gt=0, le=CHUNK_MAX_TOKENS * 4)  # characters, deprecated
+    chunk_overlap: Optional[int] = Field(None, ge=0, le=CHUNK_MAX_TOKENS * 4)  # characters, deprecated
+
+    def token_sizes(self) -> Tuple[int, int]:
+        """(chunk size, overlap) in tokens."""
+        size = self.chunk_tokens or (max(self.chunk_size // 4, 1) if self.chunk_size else CHUNK_TOKENS)
+        if self.overlap_tokens is not None:
+            overlap = self.overlap_tokens
+        elif self.chunk_overlap is not None:
+            overlap = self.chunk_overlap // 4
+        else:
+            overlap = min(CHUNK_OVERLAP_TOKENS, size // 2)
+        return size, overlap
+
+    @model_validator(mode="after")
+    def _overlap_below_size(self):
+        size, overlap = self.token_sizes()
+        if overlap >= size:
+            raise ValueError("the chunk overlap must be smaller than the chunk size")
+        return self
+
+class HRKBRequest(ChunkingParams):
     folder_id: str
     token: str
     domain: str = "hr"
-    chunk_size: Optional[int] = 1000
-    chunk_overlap: Optional[int] = 200
 
-class LinkRequest(BaseModel):
+class LinkRequest(ChunkingParams):
     urls: List[HttpUrl]
     domain: str  # Added domain field
-    chunk_size: Optional[int] = 1000
-    chunk_overlap: Optional[int] = 200
 
 class LinkResponse(BaseModel):
     success: bool
@@ -93,15 +136,15 @@ class LinkResponse(BaseModel):
     internal_links: List[str] = []
     metadata: Dict = {}
 
-class BulkLinkRequest(BaseModel):
+class BulkLinkRequest(ChunkingParams):
     urls: List[HttpUrl]
     domain: str  # Added domain field
-    chunk_size: Optional[int] = 1000
-    chunk_overlap: Optional[int] = 200
     extract_images: Optional[bool] = False
     extract_links: Optional[bool] = False
 
 class BulkLinkResponse(BaseModel):
+    status: str = ""
+    message: str = ""
     success: bool
     processed: int
     failed: int
@@ -109,30 +152,21 @@ class BulkLinkResponse(BaseModel):
     errors: List[str] = []
     domain: str  # Added domain field
 
-chat_sessions: Dict[str, Dict] = {}
-document_collections: Dict[str, Dict] = {}
-collection_documents: Dict[str, List[Dict]] = {}
-
-search_tool = TavilySearchResults()
+class JobSubmitResponse(BaseModel):
+    job_id: str
+    status: str
+    domain: str
 
-logger = logging.getLogger(__name__)
+class JobResumeRequest(BaseModel):
+    token: Optional[str] = None
 
-def parse_docx(file_bytes: bytes) -> str:
-    """Extract text from DOCX file."""
-    doc = docx.Document(io.BytesIO(file_bytes))
-    return "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
+chat_sessions = BoundedSessionStore("document_chat_sessions")
+document_collections = BoundedSessionStore("document_agent_collections")
+collection_documents = BoundedSessionStore("document_agent_documents")
 
-def parse_pdf(file_bytes: bytes) -> str:
-    """Extract text from PDF file."""
-    text = ""
-    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text() or ""
-    return text
+search_tool = TavilySearchResults()
 
-def parse_text(file_bytes: bytes) -> str:
-    """Default handler for txt/md/json/etc."""
-    return file_bytes.decode("utf-8", errors="ignore")
+logger = logging.getLogger(__name__)
 
 def save_chat_to_db(chat_id: str, role: str, message: str, domain: str = "default"):
     """Save chat message to database with domain."""
@@ -202,69 +236,31 @@ def get_chat_history(chat_id: str, domain: Optional[str] = None):
             except:
                 pass
 
-async def fetch_page_content(session: aiohttp.ClientSession, url: str) -> tuple[str, Dict]:
+class FetchError(HTTPException):
+    """A failed page fetch. `retryable` is set for network errors, timeouts, 429 and 5xx."""
+
+    def __init__(self, status_code: int, detail: str, retryable: bool = False):
+        super().__init__(status_code=status_code, detail=detail)
+        self.retryable = retryable
+
+async def fetch_page_content(session: aiohttp.ClientSession, url: str, timeout: int = REQUEST_TIMEOUT) -> tuple[str, Dict]:
     """Fetch and extract content from a web page."""
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
     }
     
     try:
-        async with session.get(str(url), headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as response:
+        async with session.get(str(url), headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
             if response.status != 200:
-                raise HTTPException(status_code=400, detail=f"Failed to fetch URL: HTTP {response.status}")
+                raise FetchError(
+                    400, f"Failed to fetch URL: HTTP {response.status}",
+                    retryable=response.status == 429 or response.status >= 500,
+                )
             
             html_content = await response.text()
 
-            content = ""
-            title = ""
-            metadata = {}
-            
-            try:
-                extracted = trafilatura.extract(html_content, include_comments=False, include_tables=True)
-                if extracted:
-                    content = extracted
-
-                    metadata_extracted = trafilatura.extract_metadata(html_content)
-                    if metadata_extracted:
-                        title = metadata_extracted.title or ""
-                        metadata.update({
-                            'author': metadata_extracted.author,
-                            'date': str(metadata_extracted.date) if metadata_extracted.date else None,
-                            'description': metadata_extracted.description,
-                            'categories': metadata_extracted.categories,
-                            'tags': metadata_extracted.tags
-                        })
-            except Exception as e:
-                logger.warning(f"Trafilatura extraction failed: {e}")
-            
-            if not content:
-                try:
-                    doc = Document(html_content)
-                    content = doc.summary()
-                    title = doc.title()
-                except Exception as e:
-                    logger.warning(f"Readability extraction failed: {e}")
-            
-            if not content:
-                try:
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    
-                    for script in soup(["script", "style"]):
-                        script.decompose()
-                    
-                    if not title:
-                        title_tag = soup.find('title')
-                        title = title_tag.get_text().strip() if title_tag else ""
-                    
-                    content = soup.get_text()
-                    
-                    lines = (line.strip() for line in content.splitlines())
-                    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                    content = ' '.join(chunk for chunk in chunks if chunk)
-                    
-                except Exception as e:
-                    logger.error(f"BeautifulSoup extraction failed: {e}")
-                    content = html_content
+            # Parsing is CPU-bound, keep it off the event loop
+            content, title, metadata = await extraction_executor.run(extract_html, html_content)
             
             if not content:
                 raise HTTPException(status_code=400, detail="Failed to extract content from the webpage")
@@ -273,64 +269,138 @@ async def fetch_page_content(session: aiohttp.ClientSession, url: str) -> tuple[
                 'url': str(url),
                 'title': title,
                 'content_length': len(content),
-                'extraction_method': 'trafilatura' if 'trafilatura' in str(type(content)) else 'readability' if 'readability' in str(type(content)) else 'beautifulsoup'
             })
             
             return content, metadata
             
-    except aiohttp.ClientError as e:
-        logger.error(f"Network error fetching {url}: {e}")
-        raise HTTPException(status_code=400, detail=f"Network error: {str(e)}")
+    except HTTPException:
+        raise
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.error(f"Network error fetching {url}: {e!r}")
+        raise FetchError(400, f"Network error: {e!r}", retryable=True)
     except Exception as e:
         logger.error(f"Error processing {url}: {e}")
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
-async def fetch_onedrive_folder_docs(folder_id: str, token: str):
-    """Fetch all files in a OneDrive folder and extract their text."""
-    url = f"{GRAPH_URL}/me/drive/items/{folder_id}/children"
-    headers = {"Authorization": f"Bearer {token}"}
-
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
-    items = response.json().get("value", [])
-
-    docs = []
+def _doc_type(name: str) -> str:
+    """Document type stored in the payload, e.g. 'pdf' for report.pdf."""
+    return os.path.splitext(name)[1].lstrip(".").lower() or "text"
+
+def _parser_for(name: str):
+    name = name.lower()
+    if name.endswith(".docx"):
+        return parse_docx
+    if name.endswith(".pdf"):
+        return parse_pdf
+    if name.endswith(".xlsx"):
+        return parse_xlsx
+    if name.endswith(".csv"):
+        return parse_csv
+    if name.endswith((".txt", ".md", ".json")):
+        return parse_text
+    return None
+
+async def list_onedrive_folder_items(folder_id: str, token: str) -> List[Dict]:
+    """All supported files below a OneDrive folder, without downloading them."""
+    async with aiohttp.ClientSession() as session:
+        graph = GraphClient(token, session)
+        return [item async for item in graph.walk(folder_id) if _parser_for(item["name"]) is not None]
+
+async def _iter_items(items: Sequence[Dict]) -> AsyncIterator[Dict]:
     for item in items:
-        if "@microsoft.graph.downloadUrl" in item:
-            download_url = item["@microsoft.graph.downloadUrl"]
-            file_resp = requests.get(download_url)
-            file_resp.raise_for_status()
-            file_bytes = file_resp.content
-            name = item["name"].lower()
-
-            if name.endswith(".docx"):
-                file_text = parse_docx(file_bytes)
-            elif name.endswith(".pdf"):
-                file_text = parse_pdf(file_bytes)
-            elif name.endswith((".txt", ".md", ".json")):
-                file_text = parse_text(file_bytes)
-            else:
-                logger.warning(f"Skipping unsupported file type: {item['name']}")
-                continue
+        yield item
+
+async def iter_onedrive_folder_docs(
+    folder_id: str,
+    token: str,
+    items: Optional[Sequence[Dict]] = None,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+) -> AsyncIterator[Dict]:
+    """
+    Walk a OneDrive folder recursively and yield each document's chunks as
+    soon as it is downloaded, parsed and split. At most
+    ONEDRIVE_DOWNLOAD_CONCURRENCY documents are in flight at once. A
+    document keeps its slot until it is on the (equally bounded) queue, so
+    parsed documents cannot pile up when the consumer is slower than the
+    downloads. Large files are spooled to disk. PDFs are streamed page by
+    page and their chunks keep page numbers.
+
+    Pass `items` to process an already listed set of files instead of
+    walking the folder. Files that cannot be downloaded or parsed are
+    yielded with an `error` instead of `chunks`.
+    """
+    async with aiohttp.ClientSession() as session:
+        graph = GraphClient(token, session)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=ONEDRIVE_DOWNLOAD_CONCURRENCY)
+        slots = asyncio.Semaphore(ONEDRIVE_DOWNLOAD_CONCURRENCY)
+
+        async def process(item: Dict) -> None:
+            parser = _parser_for(item["name"])
+            downloaded = None
+            try:
+                try:
+                    downloaded = await graph.download(item)
+                    chunks = await extraction_executor.run(
+                        extract_chunks, parser, downloaded.source, chunk_size, chunk_overlap
+                    )
+                    doc = {
+                        "id": item["id"],
+                        "name": item["name"],
+                        "url": item.get("webUrl"),
+                        "modified": item.get("lastModifiedDateTime"),
+                        "chunks": chunks,
+                    } if chunks else None
+                except Exception as e:
+                    logger.error(f"Skipping {item['name']}: {e!r}")
+                    doc = {"id": item["id"], "name": item["name"], "error": str(e) or repr(e)}
+                finally:
+                    if downloaded is not None:
+                        downloaded.cleanup()
+                if doc is not None:
+                    await queue.put(doc)
+            finally:
+                slots.release()
+
+        async def produce() -> None:
+            tasks = set()
+            try:
+                async for item in (_iter_items(items) if items is not None else graph.walk(folder_id)):
+                    if _parser_for(item["name"]) is None:
+                        logger.warning(f"Skipping unsupported file type: {item['name']}")
+                        continue
+                    await slots.acquire()
+                    task = asyncio.create_task(process(item))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                await asyncio.gather(*tasks)
+            except asyncio.CancelledError:
+                for task in tasks:
+                    task.cancel()
+                raise
+            except Exception:
+                for task in tasks:
+                    task.cancel()
+                await queue.put(None)
+                raise
+            await queue.put(None)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while (doc := await queue.get()) is not None:
+                yield doc
+            await producer
+        finally:
+            if not producer.done():
+                producer.cancel()
 
-            if file_text.strip():
-                docs.append({
-                    "id": item["id"],
-                    "name": item["name"],
-                    "content": file_text
-                })
-    return docs
-
-def chunk_content(content: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
-    """Split content into chunks for processing."""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-    )
-    
-    chunks = text_splitter.split_text(content)
-    return chunks
+async def fetch_onedrive_folder_docs(folder_id: str, token: str):
+    """Fetch all files in a OneDrive folder and extract their chunks."""
+    return [doc async for doc in iter_onedrive_folder_docs(folder_id, token) if "error" not in doc]
+
+def chunk_content(content: str, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None) -> List[str]:
+    """Split content into token-sized chunks for processing."""
+    return chunk_text(content, chunk_size, chunk_overlap)
 
 @router.post("/domains/create", tags=["Domains"], response_model=DomainResponse)
 async def create_domain(
@@ -339,7 +409,21 @@ async def create_domain(
 ):
     """Create a new domain collection."""
     try:
-        status = create_collection(domain=request.domain)
+        hybrid = HYBRID_SEARCH if request.hybrid is None else request.hybrid
+        profile = request.profile or COLLECTION_PROFILE
+        if profile not in COLLECTION_PROFILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown profile '{profile}', expected one of {sorted(COLLECTION_PROFILES)}",
+            )
+        status = create_collection(
+            domain=request.domain,
+            size=request.dimension,
+            hybrid=hybrid,
+            profile=profile,
+            hnsw_m=request.hnsw_m,
+            hnsw_ef_construct=request.hnsw_ef_construct,
+        )
         stats = get_domain_stats(request.domain)
         
         return DomainResponse(
@@ -348,6 +432,8 @@ async def create_domain(
             status=status,
             points_count=stats.get("points_count", 0)
         )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating domain: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -362,7 +448,7 @@ async def list_domains(
         
         domain_info = []
         for col in collections:
-            stats = get_domain_stats(col["domain"])
+            stats = await aget_domain_stats(col["domain"])
             domain_info.append({
                 "domain": col["domain"],
                 "collection_name": col["collection_name"],
@@ -385,7 +471,7 @@ async def get_domain_statistics(
 ):
     """Get statistics for a specific domain."""
     try:
-        stats = get_domain_stats(domain)
+        stats = await aget_domain_stats(domain)
         if not stats.get("exists"):
             raise HTTPException(status_code=404, detail=f"Domain '{domain}' not found")
         return stats
@@ -395,6 +481,19 @@ async def get_domain_statistics(
         logger.error(f"Error getting domain stats: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/domains/{domain}/reembed", tags=["Domains"], response_model=JobSubmitResponse)
+async def reembed_domain(
+    domain: str,
+    request: ReembedRequest,
+    token: str = Depends(token_manager.verify_admin_token)
+):
+    """Queue a re-embed of a domain's chunks at a different embedding dimensionality."""
+    stats = await aget_domain_stats(domain)
+    if not stats["exists"]:
+        raise HTTPException(status_code=404, detail=f"Domain '{domain}' not found")
+    job_id = await ingestion_jobs.submit("reembed", domain, request.model_dump())
+    return JobSubmitResponse(job_id=job_id, status="queued", domain=domain)
+
 @router.delete("/domains/{domain}", tags=["Domains"])
 async def delete_domain(
     domain: str,
@@ -411,36 +510,129 @@ async def delete_domain(
         logger.error(f"Error deleting domain: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/add_data", tags=["Vectorstore"])
-async def add_data_to_collection(
-    request: LinkRequest,
-):
-    """Add web content to a specific domain."""
-    result = {"status": "", "message": "", "domain": request.domain}
-
-    try:
-        async with aiohttp.ClientSession() as session:
-            contents = ""
-            for link in request.urls:
-                content, metadata = await fetch_page_content(session, str(link))
-                contents += content
-
-            chunks = chunk_content(contents, request.chunk_size, request.chunk_overlap)
-
-            logger.info(f"Successfully processed {len(request.urls)} links into {len(chunks)} chunks for domain '{request.domain}'")
+async def fetch_with_retries(
+    session: aiohttp.ClientSession,
+    url: str,
+    global_limit: asyncio.Semaphore,
+    host_limits: Dict[str, asyncio.Semaphore],
+    retries: int = FETCH_RETRIES,
+) -> tuple[str, Dict]:
+    """
+    Fetch a page under the global and per-host limits. Network errors,
+    timeouts, 429 and 5xx responses are retried with backoff; other
+    failures (4xx, extraction errors) are raised at once.
+    """
+    host = urlparse(url).netloc
+    host_limit = host_limits.setdefault(host, asyncio.Semaphore(FETCH_PER_HOST_CONCURRENCY))
+
+    for attempt in range(retries + 1):
+        try:
+            async with global_limit, host_limit:
+                return await fetch_page_content(session, url)
+        except FetchError as e:
+            if not e.retryable or attempt == retries:
+                raise
+            logger.warning(f"Fetching {url} failed ({e.detail}), retry {attempt + 1}/{retries}")
+            await asyncio.sleep(2 ** attempt)
+
+async def ingest_link(
+    session: aiohttp.ClientSession,
+    url: str,
+    request: BulkLinkRequest,
+    global_limit: asyncio.Semaphore,
+    host_limits: Dict[str, asyncio.Semaphore],
+) -> LinkResponse:
+    """Fetch one URL, then chunk and embed it without waiting for the other URLs."""
+    content, metadata = await fetch_with_retries(session, url, global_limit, host_limits)
+    # Chunking is CPU-bound too, run it in the extraction pool
+    chunks = await extraction_executor.run(chunk_text, content, *request.token_sizes())
+    chunk_metadata = {
+        "url": url,
+        "title": metadata.get("title"),
+        "author": metadata.get("author"),
+        "date": metadata.get("date"),
+        "doc_type": "web",
+        "content_type": "text",
+    }
+    await asyncio.to_thread(
+        add_texts, chunks, [chunk_metadata] * len(chunks), domain=request.domain, source=url
+    )
 
-            upsert_result = add_texts(chunks, domain=request.domain)
+    logger.info(f"Processed {url} into {len(chunks)} chunks for domain '{request.domain}'")
+    return LinkResponse(
+        success=True,
+        message=f"Added {len(chunks)} chunks",
+        document_id=str(uuid.uuid4()),
+        domain=request.domain,
+        title=metadata.get("title", ""),
+        content_length=len(content),
+        chunks_created=len(chunks),
+        metadata=metadata,
+    )
 
-            result["status"] = "success"
-            result["message"] = f"Added {len(chunks)} chunks to domain '{request.domain}'"
+@router.post("/add_data", tags=["Vectorstore"], response_model=BulkLinkResponse)
+async def add_data_to_collection(
+    request: BulkLinkRequest,
+):
+    """
+    Add web content to a specific domain.
+    URLs are fetched concurrently and each page is ingested as soon as it
+    arrives; failures are reported per URL without aborting the rest.
+    """
+    global_limit = asyncio.Semaphore(FETCH_CONCURRENCY)
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+    urls = [str(link) for link in request.urls]
+
+    async with aiohttp.ClientSession() as session:
+        outcomes = await asyncio.gather(
+            *(ingest_link(session, url, request, global_limit, host_limits) for url in urls),
+            return_exceptions=True,
+        )
 
-            return result
+    results: List[LinkResponse] = []
+    errors: List[str] = []
+    for url, outcome in zip(urls, outcomes):
+        if isinstance(outcome, LinkResponse):
+            results.append(outcome)
+        else:
+            detail = outcome.detail if isinstance(outcome, HTTPException) else str(outcome)
+            logger.error(f"Error processing {url} for domain '{request.domain}': {detail}")
+            errors.append(f"{url}: {detail}")
+
+    total_chunks = sum(r.chunks_created for r in results)
+    return BulkLinkResponse(
+        status="success" if results else "failed",
+        message=f"Added {total_chunks} chunks from {len(results)}/{len(urls)} links to domain '{request.domain}'",
+        success=bool(results),
+        processed=len(results),
+        failed=len(errors),
+        results=results,
+        errors=errors,
+        domain=request.domain,
+    )
 
-    except Exception as e:
-        logger.error(f"Error processing links for domain '{request.domain}': {e}")
-        result["status"] = "failed"
-        result["message"] = str(e)
-        return result
+async def ingest_onedrive_doc(doc: Dict, request: HRKBRequest) -> Dict:
+    """Embed the chunks of one downloaded OneDrive document."""
+    chunks = doc["chunks"]
+    chunk_metadata = {
+        "url": doc.get("url"),
+        "title": doc["name"],
+        "date": doc.get("modified"),
+        "doc_type": _doc_type(doc["name"]),
+    }
+    stats = await asyncio.to_thread(
+        add_texts,
+        [chunk["text"] for chunk in chunks],
+        [
+            {**chunk_metadata, "pages": chunk["pages"] or None, "content_type": chunk.get("content_type", "text")}
+            for chunk in chunks
+        ],
+        domain=request.domain,
+        source=f"onedrive:{doc['id']}",
+    )
+    stats["chunks_created"] = len(chunks)
+    logger.info(f"Processed OneDrive file {doc['name']} into {len(chunks)} chunks")
+    return stats
 
 @router.post("/add_hr_kb", tags=["Vectorstore"])
 async def add_hr_kb_to_collection(
@@ -450,21 +642,31 @@ async def add_hr_kb_to_collection(
     result = {"status": "", "message": "", "domain": request.domain}
 
     try:
-        docs = await fetch_onedrive_folder_docs(request.folder_id, request.token)
-        
-        if not docs:
-            return {"status": "failed", "message": "No documents found in OneDrive folder", "domain": request.domain}
+        doc_count = 0
+        chunk_count = 0
+        stats = {"embed_seconds": 0.0, "upsert_seconds": 0.0, "total_seconds": 0.0}
+        chunk_size, chunk_overlap = request.token_sizes()
+        async for doc in iter_onedrive_folder_docs(
+            request.folder_id, request.token,
+            chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+        ):
+            if "error" in doc:
+                continue
+            doc_stats = await ingest_onedrive_doc(doc, request)
+            for key in stats:
+                stats[key] += doc_stats.get(key, 0.0)
+            doc_count += 1
+            chunk_count += doc_stats["chunks_created"]
 
-        all_chunks = []
-        for doc in docs:
-            chunks = chunk_content(doc["content"], request.chunk_size, request.chunk_overlap)
-            all_chunks.extend(chunks)
-            logger.info(f"Processed OneDrive file {doc['name']} into {len(chunks)} chunks")
+        if not doc_count:
+            return {"status": "failed", "message": "No documents found in OneDrive folder", "domain": request.domain}
 
-        upsert_result = add_texts(all_chunks, domain=request.domain)
+        stats["chunks"] = chunk_count
+        stats["chunks_per_second"] = round(chunk_count / stats["total_seconds"], 2) if stats["total_seconds"] else 0.0
 
         result["status"] = "success"
-        result["message"] = f"Inserted {len(all_chunks)} chunks from {len(docs)} OneDrive docs to domain '{request.domain}'"
+        result["message"] = f"Inserted {chunk_count} chunks from {doc_count} OneDrive docs to domain '{request.domain}'"
+        result["stats"] = stats
         return result
 
     except Exception as e:
@@ -473,23 +675,221 @@ async def add_hr_kb_to_collection(
         result["message"] = str(e)
         return result
 
+async def run_links_job(job: IngestionJob) -> None:
+    """Job handler for /jobs/add_data: ingest each URL and checkpoint it."""
+    request = BulkLinkRequest(**job.params)
+    urls = [str(link) for link in request.urls]
+    await job.set_total(len(urls))
+
+    global_limit = asyncio.Semaphore(FETCH_CONCURRENCY)
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def ingest(session: aiohttp.ClientSession, url: str) -> None:
+        try:
+            result = await ingest_link(session, url, request, global_limit, host_limits)
+        except Exception as e:
+            detail = e.detail if isinstance(e, HTTPException) else str(e)
+            logger.error(f"Job {job.job_id}: error processing {url}: {detail}")
+            await job.checkpoint(url, error=detail)
+            return
+        await job.checkpoint(url, chunks=result.chunks_created)
+
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(ingest(session, url) for url in urls if not job.is_done(url)))
+
+async def run_onedrive_job(job: IngestionJob) -> None:
+    """Job handler for /jobs/add_hr_kb: ingest each OneDrive file and checkpoint it."""
+    token = job.secrets.get("token")
+    if not token:
+        raise RuntimeError("OneDrive token is no longer available, resume the job with a fresh token")
+    request = HRKBRequest(**job.params, token=token)
+
+    items = await list_onedrive_folder_items(request.folder_id, token)
+    await job.set_total(len(items))
+    pending = [item for item in items if not job.is_done(f"onedrive:{item['id']}")]
+
+    chunk_size, chunk_overlap = request.token_sizes()
+    async for doc in iter_onedrive_folder_docs(
+        request.folder_id, token, items=pending,
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+    ):
+        key = f"onedrive:{doc['id']}"
+        if "error" in doc:
+            await job.checkpoint(key, error=doc["error"])
+            continue
+        try:
+            stats = await ingest_onedrive_doc(doc, request)
+        except Exception as e:
+            logger.error(f"Job {job.job_id}: error ingesting {doc['name']}: {e}")
+            await job.checkpoint(key, error=str(e))
+            continue
+        await job.checkpoint(key, chunks=stats["chunks_created"])
+
+async def run_reembed_job(job: IngestionJob) -> None:
+    """
+    Job handler for /domains/{domain}/reembed. Progress is counted in
+    scroll batches. The target collection is named after the job, so a
+    resumed job continues filling the same collection.
+    """
+    request = ReembedRequest(**job.params)
+    stats = await aget_domain_stats(job.domain)
+    if not stats["exists"]:
+        raise ValueError(f"Domain '{job.domain}' not found")
+    await job.set_total(max(math.ceil((stats["points_count"] or 0) / EMBED_BATCH_SIZE), 1))
+
+    loop = asyncio.get_running_loop()
+
+    def on_batch(index: int, chunks: int) -> None:
+        # Keep the count recorded by the run that finished the batch
+        if not job.is_done(f"batch:{index}"):
+            asyncio.run_coroutine_threadsafe(job.checkpoint(f"batch:{index}", chunks=chunks), loop).result()
+
+    target = f"{get_collection_name(job.domain)}{REEMBED_SUFFIX}{job.job_id[:8]}"
+    await asyncio.to_thread(
+        reembed_collection, job.domain, request.dimension, target=target, on_batch=on_batch
+    )
+
+ingestion_jobs.register("links", run_links_job)
+ingestion_jobs.register("onedrive", run_onedrive_job, needs_secrets=True)
+ingestion_jobs.register("reembed", run_reembed_job)
+
+@router.post("/jobs/add_data", tags=["Jobs"], response_model=JobSubmitResponse)
+async def submit_add_data_job(
+    request: BulkLinkRequest,
+    token: str = Depends(token_manager.verify_admin_token)
+):
+    """Queue web content ingestion in the background and return its job ID."""
+    job_id = await ingestion_jobs.submit("links", request.domain, request.model_dump(mode="json"))
+    return JobSubmitResponse(job_id=job_id, status="queued", domain=request.domain)
+
+@router.post("/jobs/add_hr_kb", tags=["Jobs"], response_model=JobSubmitResponse)
+async def submit_add_hr_kb_job(
+    request: HRKBRequest,
+    token: str = Depends(token_manager.verify_admin_token)
+):
+    """Queue OneDrive ingestion in the background and return its job ID."""
+    job_id = await ingestion_jobs.submit(
+        "onedrive",
+        request.domain,
+        request.model_dump(mode="json", exclude={"token"}),
+        secrets={"token": request.token},
+    )
+    return JobSubmitResponse(job_id=job_id, status="queued", domain=request.domain)
+
+@router.get("/jobs", tags=["Jobs"])
+async def list_ingestion_jobs(
+    domain: Optional[str] = None,
+    status: Optional[str] = None,
+    limit: int = 50,
+    token: str = Depends(verify_token)
+):
+    """List recent ingestion jobs with their progress."""
+    jobs = await ingestion_jobs.list_jobs(domain=domain, status=status, limit=limit)
+    return {"jobs": jobs, "total_count": len(jobs)}
+
+@router.get("/jobs/{job_id}", tags=["Jobs"])
+async def get_ingestion_job(
+    job_id: uuid.UUID,
+    token: str = Depends(verify_token)
+):
+    """Status and progress of an ingestion job: documents, chunks, throughput and ETA."""
+    job = await ingestion_jobs.get_job(str(job_id))
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found")
+    return job
+
+@router.post("/jobs/{job_id}/resume", tags=["Jobs"])
+async def resume_ingestion_job(
+    job_id: uuid.UUID,
+    request: JobResumeRequest,
+    token: str = Depends(token_manager.verify_admin_token)
+):
+    """Re-queue a failed job. It skips the documents that were already ingested."""
+    secrets = {"token": request.token} if request.token else None
+    if not await ingestion_jobs.resume(str(job_id), secrets):
+        raise HTTPException(status_code=409, detail=f"Job '{job_id}' not found or not resumable")
+    return {"job_id": str(job_id), "status": "queued"}
+
 @router.get("/chunks/{domain}", tags=["Vectorstore"])
 async def list_domain_chunks(
     domain: str,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    with_vectors: bool = False,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
     token: str = Depends(verify_token)
 ):
-    """Get all chunks in a specific domain."""
+    """
+    List a domain's chunks one page at a time.
+
+    `cursor` is the `next_cursor` of the previous page (the Qdrant scroll
+    offset). `fields` is a comma-separated list of payload keys to return;
+    pass it empty to skip payloads. With `format=ndjson` every chunk from
+    `cursor` onwards is streamed as one JSON object per line, scrolling
+    `limit` points at a time, so memory stays flat for any domain size.
+    A failure after the stream has started ends it with an
+    `{"error": ...}` line.
+    """
+    selected = None if fields is None else [f.strip() for f in fields.split(",") if f.strip()]
+    try:
+        offset = parse_point_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Malformed cursor '{cursor}'")
+
+    if format == "ndjson":
+        # Fetch the first page up front so a failure is still a proper HTTP error
+        try:
+            first_page, first_offset = await ascroll_points(domain, limit, offset, selected, with_vectors)
+        except Exception as e:
+            logger.error(f"Error streaming chunks for domain '{domain}': {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+        async def stream_points():
+            points, next_offset = first_page, first_offset
+            while True:
+                for point in points:
+                    yield json.dumps(point, default=str) + "\n"
+                if next_offset is None:
+                    return
+                try:
+                    points, next_offset = await ascroll_points(domain, limit, next_offset, selected, with_vectors)
+                except Exception as e:
+                    # Headers are already sent, so report the failure as the last line
+                    logger.error(f"Error streaming chunks for domain '{domain}': {e}")
+                    yield json.dumps({"error": str(e)}) + "\n"
+                    return
+
+        return StreamingResponse(stream_points(), media_type="application/x-ndjson")
+
     try:
-        chunks = get_all_points(domain=domain)
+        chunks, next_offset = await ascroll_points(domain, limit, offset, selected, with_vectors)
+        stats = await aget_domain_stats(domain)
         return {
             "domain": domain,
             "chunks": chunks,
-            "total_count": len(chunks)
+            "count": len(chunks),
+            "next_cursor": None if next_offset is None else str(next_offset),
+            "total_count": stats.get("points_count"),
         }
     except Exception as e:
         logger.error(f"Error listing chunks for domain '{domain}': {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def document_source(hit: Dict) -> str:
+    """Citable location of a hit: its URL when known, else its source or point id."""
+    payload = hit.get("payload") or {}
+    return str(payload.get("url") or payload.get("source") or hit["id"])
+
+def source_pages(hits: List[Dict]) -> List[Dict]:
+    """Page numbers used from each source, in citation order, skipping sources without pages."""
+    pages: Dict[str, Dict[int, None]] = {}
+    for hit in hits:
+        hit_pages = (hit.get("payload") or {}).get("pages") or []
+        if hit_pages:
+            pages.setdefault(document_source(hit), {}).update(dict.fromkeys(hit_pages))
+    return [{"source": source, "pages": list(numbers)} for source, numbers in pages.items()]
+
 def document_search_agent(state: AgentState) -> AgentState:
     """Enhanced document search agent with domain support."""
     query = state["query"]
@@ -505,7 +905,35 @@ def document_search_agent(state: AgentState) -> AgentState:
     logger.info(f"[DOCUMENT_AGENT] Searching in domain '{domain}' for query: {query}")
     logger.info(f"[DOCUMENT_AGENT] Full state collection_id: {state.get('collection_id')}")
 
-    docs = search_similar(query, domain=domain)
+    # Extra domains requested for this turn are searched together with the path domain
+    domains = list(dict.fromkeys([domain] + (state.get("domains") or [])))
+    multi_domain = len(domains) > 1
+
+    filters = state.get("filters") or None
+
+    # Filtered answers are not comparable with unfiltered ones, so skip the cache
+    if state.get("cache_mode") and not multi_domain and not filters:
+        cached = answer_cache.lookup(get_collection_name(domain), embed_domain_query(query, domain))
+        if cached:
+            state["answer"] = cached["answer"]
+            state["sources"] = cached["sources"]
+            state["pages"] = cached["pages"]
+            state["cache_hit"] = True
+            state["document_found"] = True
+            state["reasoning_chain"].append(
+                f"Document Search Agent: Reused cached answer for a similar question ({cached['similarity']:.3f})"
+            )
+            logger.info(f"[DOCUMENT_AGENT] Semantic cache hit in domain '{domain}'")
+            return state
+
+    # Over-fetch so the reranker has candidates to choose from
+    limit = RERANK_CANDIDATES if RERANK_ENABLED else 5
+    if multi_domain:
+        docs = search_domains_merged(query, domains, limit=limit, filters=filters)
+        domain = ", ".join(domains)
+    else:
+        # Dense-only collections fall back to plain vector search inside search_hybrid
+        docs = search_hybrid(query, limit, domain=domain, filters=filters)
     
     logger.info(f"[DOCUMENT_AGENT] Found {len(docs)} documents in domain '{domain}'")
 
@@ -515,6 +943,9 @@ def document_search_agent(state: AgentState) -> AgentState:
         logger.warning(f"[DOCUMENT_AGENT] No documents found in domain '{domain}'")
         return state
 
+    # Rerank, de-duplicate and pack the best chunks into the context budget
+    docs = select_context(query, docs)
+
     # Build context
     context = "\n\n".join(
         [r["payload"]["page_content"] for r in docs if "page_content" in r.get("payload", {})]
@@ -523,7 +954,8 @@ def document_search_agent(state: AgentState) -> AgentState:
     if context.strip():
         state["document_context"] = context.strip()
         state["reasoning_chain"].append(f"Document Search Agent: Retrieved context from domain '{domain}' ({len(docs)} docs)")
-        state["sources"] = [r["id"] for r in docs]
+        state["sources"] = list(dict.fromkeys(document_source(r) for r in docs))
+        state["pages"] = source_pages(docs)
         state["document_found"] = True
         logger.info(f"[DOCUMENT_AGENT] Successfully retrieved context from domain '{domain}'")
     else:
@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+import threading
+from typing import List, Optional, Tuple
+
+from cachetools import TTLCache
+from prometheus_client import Counter
+
+from db.psql_connector import default_config
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", "3600"))
+EMBEDDING_CACHE_BACKEND = os.getenv("EMBEDDING_CACHE_BACKEND", "memory").lower()
+
+EMBEDDING_CACHE_HITS = Counter(
+    "embedding_cache_hits_total", "Query embeddings served from cache", ["tier"]
+)
+EMBEDDING_CACHE_MISSES = Counter(
+    "embedding_cache_misses_total", "Query embeddings that required an API call"
+)
+
+CacheKey = Tuple[str, str, Optional[int]]
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase and collapse whitespace so trivially different queries share a key."""
+    return " ".join(text.lower().split())
+
+
+class EmbeddingCache:
+    """
+    LRU + TTL cache of query embeddings keyed by (model, normalized text, dimensionality).
+
+    An in-process TTLCache is always consulted first. When the redis backend is
+    enabled, misses fall through to redis so every uvicorn worker shares hits.
+    """
+
+    def __init__(self, maxsize: int = EMBEDDING_CACHE_SIZE, ttl: int = EMBEDDING_CACHE_TTL, backend: str = EMBEDDING_CACHE_BACKEND):
+        self.ttl = ttl
+        self._local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._redis = self._connect_redis() if backend == "redis" else None
+
+    def _connect_redis(self):
+        try:
+            import redis
+
+            params = default_config(section="redis")
+            client = redis.Redis(
+                host=params.get("host", "localhost"),
+                port=int(params.get("port", 6379)),
+                username=params.get("username"),
+                password=params.get("password"),
+            )
+            client.ping()
+            logger.info("Embedding cache using shared redis backend")
+            return client
+        except Exception as e:
+            logger.warning(f"Redis embedding cache unavailable, using in-process cache only: {e}")
+            return None
+
+    @staticmethod
+    def make_key(model: str, text: str, output_dimensionality: Optional[int]) -> CacheKey:
+        return (model, normalize_query(text), output_dimensionality)
+
+    @staticmethod
+    def _redis_key(key: CacheKey) -> str:
+        model, text, dim = key
+        return f"emb:{model}:{dim}:{text}"
+
+    def get(self, key: CacheKey) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._local.get(key)
+        if vector is not None:
+            EMBEDDING_CACHE_HITS.labels(tier="local").inc()
+            return vector
+
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"Redis embedding cache read failed: {e}")
+                raw = None
+            if raw is not None:
+                vector = json.loads(raw)
+                with self._lock:
+                    self._local[key] = vector
+                EMBEDDING_CACHE_HITS.labels(tier="redis").inc()
+                return vector
+
+        EMBEDDING_CACHE_MISSES.inc()
+        return None
+
+    def set(self, key: CacheKey, vector: List[float]) -> None:
+        with self._lock:
+            self._local[key] = vector
+        if self._redis is not None:
+            try:
+                self._redis.set(self._redis_key(key), json.dumps(vector), ex=self.ttl)
+            except Exception as e:
+                logger.warning(f"Redis embedding cache write failed: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,466 @@
+"""
+CPU-bound document extraction that runs in a process pool.
+
+The parsers in this module are kept free of app-level imports so pool
+workers (started with forkserver) load only what they need.
+"""
+import asyncio
+import concurrent.futures
+import io
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import docx
+import numpy as np
+import pandas as pd
+import pdfplumber
+import trafilatura
+from bs4 import BeautifulSoup
+from readability import Document
+
+from api.v1.chat.chunking import CHUNK_TOKENS, chunk_segments, split_tokens, token_counts
+
+logger = logging.getLogger(__name__)
+
+EXTRACTION_WORKERS = int(os.getenv("EXTRACTION_WORKERS", str(os.cpu_count() or 2)))
+EXTRACTION_TIMEOUT = float(os.getenv("EXTRACTION_TIMEOUT", "120"))
+EXTRACTION_MAX_MEMORY_MB = int(os.getenv("EXTRACTION_MAX_MEMORY_MB", "1024"))
+TABLE_ROW_BATCH = int(os.getenv("TABLE_ROW_BATCH", "5000"))
+PDF_HEADING_FONT_RATIO = float(os.getenv("PDF_HEADING_FONT_RATIO", "1.2"))
+
+
+class ExtractionError(Exception):
+    """Raised when a document parse times out, runs out of memory or crashes its worker."""
+
+
+Source = Union[bytes, str]
+
+
+def _as_file(source: Source):
+    """Parsers accept raw bytes or a path to a spooled file on disk."""
+    return io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+
+def parse_docx(file_bytes: Source) -> str:
+    """Extract text from DOCX file. Paragraphs in a Heading/Title style are marked as markdown headings."""
+    doc = docx.Document(_as_file(file_bytes))
+    return "\n".join([
+        f"# {p.text.strip()}" if p.style is not None and p.style.name.startswith(("Heading", "Title")) else p.text
+        for p in doc.paragraphs if p.text.strip()
+    ])
+
+def _page_text(page) -> str:
+    """
+    Text of a PDF page, one line per text line. Short lines set in a font
+    at least PDF_HEADING_FONT_RATIO times the page's median size are
+    marked as markdown headings, so the chunker can trust them.
+    """
+    lines = page.extract_text_lines(return_chars=True)
+    sizes = [char["size"] for line in lines for char in line["chars"]]
+    if not sizes:
+        return ""
+    body_size = float(np.median(sizes))
+    out = []
+    for line in lines:
+        text = line["text"].strip()
+        if not text:
+            continue
+        size = float(np.mean([char["size"] for char in line["chars"]]))
+        if size >= body_size * PDF_HEADING_FONT_RATIO and len(text) <= 100 and not text.endswith("."):
+            text = f"# {text}"
+        out.append(text)
+    return "\n".join(out)
+
+def iter_pdf_pages(file_bytes: Source) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page number, text) one page at a time. Each page's parsed
+    layout is released once its text is extracted, so memory does not grow
+    with the page count.
+    """
+    with pdfplumber.open(_as_file(file_bytes)) as pdf:
+        for number, page in enumerate(pdf.pages, start=1):
+            try:
+                yield number, _page_text(page)
+            finally:
+                page.close()
+
+def _table_caption(page, bbox) -> str:
+    """Last line of text just above a table, usually its title."""
+    top = bbox[1]
+    if top <= 0:
+        return ""
+    above = page.crop((0, max(0, top - 40), page.width, top)).extract_text() or ""
+    lines = [line.strip() for line in above.splitlines() if line.strip()]
+    return lines[-1] if lines else ""
+
+def iter_pdf_content(file_bytes: Source) -> Iterator[Tuple[int, str, List[Tuple[str, pd.DataFrame]]]]:
+    """
+    Like iter_pdf_pages, but detected tables are returned separately as
+    (caption, frame) pairs and their cells are left out of the page text.
+    """
+    with pdfplumber.open(_as_file(file_bytes)) as pdf:
+        for number, page in enumerate(pdf.pages, start=1):
+            try:
+                tables = page.find_tables()
+                frames = []
+                for table in tables:
+                    rows = [row for row in table.extract() if any(cell for cell in row)]
+                    if len(rows) < 2:
+                        continue
+                    header = [cell or "" for cell in rows[0]]
+                    frames.append((_table_caption(page, table.bbox), pd.DataFrame(rows[1:], columns=header)))
+
+                bboxes = [table.bbox for table in tables]
+
+                def outside_tables(obj) -> bool:
+                    return not any(
+                        obj["x0"] >= x0 and obj["x1"] <= x1 and obj["top"] >= top and obj["bottom"] <= bottom
+                        for x0, top, x1, bottom in bboxes
+                    )
+
+                text_page = page.filter(outside_tables) if bboxes else page
+                yield number, _page_text(text_page), frames
+            finally:
+                page.close()
+
+def parse_pdf(file_bytes: Source) -> str:
+    """Extract text from PDF file."""
+    return "\n".join(text for _, text in iter_pdf_pages(file_bytes))
+
+def iter_csv_frames(file_bytes: Source) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """Read a CSV in TABLE_ROW_BATCH-row frames so large files are never fully loaded."""
+    reader = pd.read_csv(_as_file(file_bytes), dtype=str, keep_default_na=False, chunksize=TABLE_ROW_BATCH)
+    for frame in reader:
+        yield "", frame
+
+def iter_xlsx_frames(file_bytes: Source) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """One frame per non-empty worksheet, captioned with the sheet name."""
+    sheets = pd.read_excel(_as_file(file_bytes), sheet_name=None, dtype=str, engine="openpyxl")
+    for name, frame in sheets.items():
+        frame = frame.dropna(how="all")
+        if not frame.empty:
+            yield f"Sheet: {name}", frame
+
+def table_chunks(frame: pd.DataFrame, caption: str = "", max_tokens: Optional[int] = CHUNK_TOKENS) -> List[str]:
+    """
+    Render a table as compact pipe-separated rows packed into chunks of at
+    most `max_tokens` tokens (one chunk when None).
+
+    Every chunk repeats the caption and the header row, so rows keep their
+    column meaning wherever the table is split. Rows are rendered with
+    column-wise pandas operations and tokenized in one batch. A row that
+    does not fit next to the header on its own is hard-split, and a
+    caption/header longer than half the budget is cut down to that half.
+    """
+    if frame.empty:
+        return []
+    cells = frame.fillna("").astype(str).apply(lambda column: column.str.strip().str.replace(r"\s+", " ", regex=True))
+    cells = cells[(cells != "").any(axis=1)]
+    if cells.empty:
+        return []
+
+    lines = cells.iloc[:, 0]
+    if cells.shape[1] > 1:
+        lines = lines.str.cat([cells.iloc[:, i] for i in range(1, cells.shape[1])], sep=" | ")
+
+    header = " | ".join(" ".join(str(column).split()) for column in frame.columns)
+    prefix = "\n".join(part for part in (caption, header) if part) + "\n"
+    if max_tokens is None:
+        return [prefix + "\n".join(lines)]
+
+    prefix_tokens = token_counts([prefix])[0]
+    if prefix_tokens > max_tokens // 2:
+        prefix = split_tokens(prefix, max(max_tokens // 2, 1))[0].rstrip("\n") + "\n"
+        prefix_tokens = token_counts([prefix])[0]
+    # Each row also costs its newline
+    budget = max(max_tokens - prefix_tokens, 2)
+
+    chunks: List[str] = []
+    group: List[str] = []
+    used = 0
+    rows = lines.tolist()
+    for row, tokens in zip(rows, token_counts(rows)):
+        if tokens + 1 > budget:
+            pieces = split_tokens(row, budget - 1)
+            parts = list(zip(pieces, token_counts(pieces)))
+        else:
+            parts = [(row, tokens)]
+        for part, part_tokens in parts:
+            if group and used + part_tokens + 1 > budget:
+                chunks.append(prefix + "\n".join(group))
+                group, used = [], 0
+            group.append(part)
+            used += part_tokens + 1
+    if group:
+        chunks.append(prefix + "\n".join(group))
+    return chunks
+
+def parse_csv(file_bytes: Source) -> str:
+    """Extract a CSV as pipe-separated rows."""
+    return "\n\n".join(chunk for caption, frame in iter_csv_frames(file_bytes) for chunk in table_chunks(frame, caption, max_tokens=None))
+
+def parse_xlsx(file_bytes: Source) -> str:
+    """Extract every worksheet of an XLSX workbook as pipe-separated rows."""
+    return "\n\n".join(chunk for caption, frame in iter_xlsx_frames(file_bytes) for chunk in table_chunks(frame, caption, max_tokens=None))
+
+def parse_text(file_bytes: Source) -> str:
+    """Default handler for txt/md/json/etc."""
+    if not isinstance(file_bytes, (bytes, bytearray)):
+        with open(file_bytes, "rb") as f:
+            file_bytes = f.read()
+    return file_bytes.decode("utf-8", errors="ignore")
+
+_TABLE_READERS = {parse_csv: iter_csv_frames, parse_xlsx: iter_xlsx_frames}
+
+def extract_chunks(
+    parser: Callable[[Source], str],
+    file_bytes: Source,
+    chunk_size: Optional[int] = None,
+    chunk_overlap: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Parse and chunk a document in one worker call.
+
+    PDFs are streamed page by page: page text goes through the chunker and
+    each detected table becomes its own table chunks. Every chunk keeps its
+    page numbers. CSV and XLSX files are chunked as tables. Other formats
+    are parsed whole and their chunks carry no pages.
+    """
+    if parser in _TABLE_READERS:
+        return [
+            {"text": chunk, "pages": [], "content_type": "table"}
+            for caption, frame in _TABLE_READERS[parser](file_bytes)
+            for chunk in table_chunks(frame, caption, chunk_size or CHUNK_TOKENS)
+        ]
+
+    if parser is not parse_pdf:
+        return list(chunk_segments([(None, parser(file_bytes))], chunk_size, chunk_overlap))
+
+    tables = []
+
+    def pages() -> Iterator[Tuple[int, str]]:
+        for number, text, frames in iter_pdf_content(file_bytes):
+            for caption, frame in frames:
+                caption = f"{caption} (page {number})" if caption else f"Table on page {number}"
+                tables.extend(
+                    {"text": chunk, "pages": [number], "content_type": "table"}
+                    for chunk in table_chunks(frame, caption, chunk_size or CHUNK_TOKENS)
+                )
+            yield number, text
+
+    return list(chunk_segments(pages(), chunk_size, chunk_overlap)) + tables
+
+def extract_html(html_content: str) -> Tuple[str, str, Dict[str, Any]]:
+    """Extract main content, title and metadata from an HTML page."""
+    content = ""
+    title = ""
+    metadata = {}
+    method = ""
+
+    try:
+        extracted = trafilatura.extract(html_content, include_comments=False, include_tables=True)
+        if extracted:
+            content = extracted
+            method = "trafilatura"
+
+            metadata_extracted = trafilatura.extract_metadata(html_content)
+            if metadata_extracted:
+                title = metadata_extracted.title or ""
+                metadata.update({
+                    'author': metadata_extracted.author,
+                    'date': str(metadata_extracted.date) if metadata_extracted.date else None,
+                    'description': metadata_extracted.description,
+                    'categories': metadata_extracted.categories,
+                    'tags': metadata_extracted.tags
+                })
+    except Exception as e:
+        logger.warning(f"Trafilatura extraction failed: {e}")
+
+    if not content:
+        try:
+            doc = Document(html_content)
+            content = doc.summary()
+            title = doc.title()
+            method = "readability"
+        except Exception as e:
+            logger.warning(f"Readability extraction failed: {e}")
+
+    if not content:
+        try:
+            soup = BeautifulSoup(html_content, 'html.parser')
+
+            for script in soup(["script", "style"]):
+                script.decompose()
+
+            if not title:
+                title_tag = soup.find('title')
+                title = title_tag.get_text().strip() if title_tag else ""
+
+            content = soup.get_text()
+
+            lines = (line.strip() for line in content.splitlines())
+            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+            content = ' '.join(chunk for chunk in chunks if chunk)
+            method = "beautifulsoup"
+
+        except Exception as e:
+            logger.error(f"BeautifulSoup extraction failed: {e}")
+            content = html_content
+
+    metadata["extraction_method"] = method or "raw"
+    return content, title, metadata
+
+
+def _limit_worker_memory(max_memory_mb: int) -> None:
+    if max_memory_mb <= 0:
+        return
+    try:
+        import resource
+
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError) as e:
+        logger.warning(f"Could not apply extraction memory limit: {e}")
+
+
+def _worker_main(conn, max_memory_mb: int) -> None:
+    """Loop of an extraction worker process: run (fn, args) tasks sent over `conn`."""
+    _limit_worker_memory(max_memory_mb)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            outcome = (True, fn(*args))
+        except BaseException as e:
+            outcome = (False, e)
+        try:
+            conn.send(outcome)
+        except Exception as e:  # unpicklable result or exception
+            conn.send((False, ExtractionError(f"{fn.__name__} failed: {e!r}")))
+
+
+class ExtractionExecutor:
+    """
+    Pool of worker processes for document parsing.
+
+    Each worker process is fed by its own thread in the server process.
+    The threads pull tasks from a shared queue, so the timeout starts when
+    a worker picks a task up, not while the task waits in the queue. A
+    parse that runs over the timeout costs only its own worker: that
+    process is killed and replaced, and parses running on the other
+    workers are unaffected. Each worker also runs under an address-space
+    limit, so a runaway parse fails with MemoryError instead of taking the
+    server down.
+    """
+
+    def __init__(self, workers: int = EXTRACTION_WORKERS, timeout: float = EXTRACTION_TIMEOUT, max_memory_mb: int = EXTRACTION_MAX_MEMORY_MB):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_memory_mb = max_memory_mb
+        self._context = multiprocessing.get_context("forkserver")
+        self._tasks: queue.Queue = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+        self._lock = threading.Lock()
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._serve, name=f"extraction-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _spawn(self):
+        conn, child = self._context.Pipe()
+        process = self._context.Process(target=_worker_main, args=(child, self.max_memory_mb), daemon=True)
+        process.start()
+        child.close()
+        with self._lock:
+            self._processes[process.pid] = process
+        return process, conn
+
+    def _kill(self, process, conn) -> None:
+        with self._lock:
+            self._processes.pop(process.pid, None)
+        process.kill()
+        process.join(timeout=5)
+        conn.close()
+
+    def _serve(self) -> None:
+        """Feed one worker process until shutdown, replacing it when it has to be killed."""
+        process = conn = None
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    return
+                future, fn, args, timeout = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if process is None:
+                    process, conn = self._spawn()
+                try:
+                    conn.send((fn, args))
+                    finished = conn.poll(timeout)
+                    if finished:
+                        ok, value = conn.recv()
+                except (EOFError, OSError):
+                    logger.error(f"{fn.__name__} crashed its extraction worker (pid {process.pid}), replacing it")
+                    self._kill(process, conn)
+                    process = conn = None
+                    future.set_exception(ExtractionError(f"{fn.__name__} crashed its extraction worker"))
+                    continue
+                except Exception as e:  # e.g. unpicklable arguments, the worker is unaffected
+                    future.set_exception(e)
+                    continue
+
+                if not finished:
+                    logger.error(f"{fn.__name__} exceeded {timeout}s, killing its extraction worker (pid {process.pid})")
+                    self._kill(process, conn)
+                    process = conn = None
+                    future.set_exception(ExtractionError(f"{fn.__name__} timed out"))
+                elif ok:
+                    future.set_result(value)
+                elif isinstance(value, MemoryError):
+                    future.set_exception(ExtractionError(f"{fn.__name__} exceeded the {self.max_memory_mb}MB memory limit"))
+                else:
+                    future.set_exception(value)
+        finally:
+            if process is not None:
+                self._kill(process, conn)
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None):
+        self._start()
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._tasks.put((future, fn, args, timeout or self.timeout))
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            threads, self._threads = self._threads, []
+            processes = list(self._processes.values())
+        # Cancel queued tasks, then stop the feeder threads and their workers
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                task[0].cancel()
+        for _ in threads:
+            self._tasks.put(None)
+        for process in processes:
+            process.kill()
+
+
+extraction_executor = ExtractionExecutor()
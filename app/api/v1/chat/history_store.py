@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from cachetools import TTLCache
+
+from db import async_db
+from .history_writer import history_writer
+
+logger = logging.getLogger(__name__)
+
+CHAT_HISTORY_TURNS = int(os.getenv("CHAT_HISTORY_TURNS", "5"))
+CHAT_HISTORY_CACHE_CHATS = int(os.getenv("CHAT_HISTORY_CACHE_CHATS", "1000"))
+CHAT_HISTORY_CACHE_TTL = int(os.getenv("CHAT_HISTORY_CACHE_TTL", "1800"))
+CHAT_HISTORY_INVALIDATION_INTERVAL = float(os.getenv("CHAT_HISTORY_INVALIDATION_INTERVAL", "2.0"))
+
+
+class RecentHistoryCache:
+    """
+    Per-chat ring buffer of the most recent messages.
+
+    Hot sessions are answered from memory; idle chats expire after the TTL
+    and the number of cached chats is bounded (least recently used first).
+    """
+
+    def __init__(self, turns: int = CHAT_HISTORY_TURNS, max_chats: int = CHAT_HISTORY_CACHE_CHATS, ttl: int = CHAT_HISTORY_CACHE_TTL):
+        self.max_messages = turns * 2
+        self._chats: TTLCache = TTLCache(maxsize=max_chats, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, chat_id: str):
+        with self._lock:
+            ring = self._chats.get(chat_id)
+            return list(ring) if ring is not None else None
+
+    def seed(self, chat_id: str, messages: List[Dict[str, str]]) -> None:
+        with self._lock:
+            self._chats[chat_id] = deque(messages, maxlen=self.max_messages)
+
+    def append(self, chat_id: str, messages: List[Dict[str, str]]) -> None:
+        """Add messages to a chat that is already cached; unknown chats are left to the next load."""
+        with self._lock:
+            ring = self._chats.get(chat_id)
+            if ring is not None:
+                ring.extend(messages)
+                self._chats[chat_id] = ring
+
+    def evict(self, chat_id: str) -> None:
+        with self._lock:
+            self._chats.pop(chat_id, None)
+
+
+recent_history = RecentHistoryCache()
+
+
+class DeletionWatcher:
+    """
+    Evicts chats deleted by other workers from this process's ring buffers.
+
+    `delete_session` records a marker in chat_deletions. Every process polls
+    for new markers every `interval` seconds, so a deleted chat is served
+    from a stale buffer for at most one interval. Markers older than the
+    cache TTL are pruned because no buffer can still hold those chats.
+    """
+
+    def __init__(self, cache: RecentHistoryCache, interval: float = CHAT_HISTORY_INVALIDATION_INTERVAL, ttl: int = CHAT_HISTORY_CACHE_TTL):
+        self.cache = cache
+        self.interval = interval
+        self.ttl = ttl
+        self._since: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def mark_deleted(self, chat_id: str) -> None:
+        self.cache.evict(chat_id)
+        await async_db.execute(
+            """
+            INSERT INTO chat_deletions (chat_id, deleted_at) VALUES (%s, clock_timestamp())
+            ON CONFLICT (chat_id) DO UPDATE SET deleted_at = EXCLUDED.deleted_at
+            """,
+            (chat_id,),
+        )
+        await async_db.execute(
+            "DELETE FROM chat_deletions WHERE deleted_at < NOW() - make_interval(secs => %s)",
+            (self.ttl,),
+        )
+
+    async def poll(self) -> None:
+        if self._since is None:
+            rows = await async_db.fetch_all("SELECT clock_timestamp() AS now")
+            self._since = rows[0]["now"]
+            return
+        # Look back one extra interval for markers committed after a poll
+        # that started later than their timestamp; eviction is idempotent
+        rows = await async_db.fetch_all(
+            """
+            SELECT chat_id, deleted_at FROM chat_deletions
+            WHERE deleted_at > %s - make_interval(secs => %s)
+            """,
+            (self._since, self.interval),
+        )
+        for row in rows:
+            self.cache.evict(row["chat_id"])
+            self._since = max(self._since, row["deleted_at"])
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.error(f"Chat deletion poll failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+deletion_watcher = DeletionWatcher(recent_history)
+
+
+async def load_recent_history(chat_id: str, turns: int = CHAT_HISTORY_TURNS) -> List[Dict[str, str]]:
+    """
+    Return the last `turns` user/assistant pairs for chat_id, oldest first.
+
+    Reads the ring buffer when the chat is hot, otherwise fetches only the
+    tail of the conversation using the (chat_id, timestamp DESC) index.
+    """
+    cached = recent_history.get(chat_id)
+    if cached is not None:
+        return cached[-turns * 2:]
+
+    # A flush landing between the query and reading the buffer would hide
+    # its turn from both, so the two are read with no flush in between
+    rows, pending = await history_writer.read_with_pending(chat_id, lambda: async_db.fetch_all(
+        """
+        SELECT role, message FROM (
+            SELECT role, message, timestamp, id FROM ask_hr_history
+            WHERE chat_id = %s
+            ORDER BY timestamp DESC, id DESC
+            LIMIT %s
+        ) recent
+        ORDER BY timestamp ASC, id ASC
+        """,
+        (chat_id, turns * 2)
+    ))
+    messages = [
+        {"role": row["role"], "content": row["message"]}
+        for row in rows
+        if row["role"] in ("user", "assistant")
+    ]
+    # Turns still waiting in the write-behind buffer are not in the table yet
+    messages += [{"role": role, "content": message} for _, role, message, _ in pending]
+    messages = messages[-turns * 2:]
+    recent_history.seed(chat_id, messages)
+    return messages
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple, TypeVar
+
+import psycopg
+
+from db import async_db
+
+logger = logging.getLogger(__name__)
+
+CHAT_HISTORY_WRITE_BEHIND = os.getenv("CHAT_HISTORY_WRITE_BEHIND", "true").lower() == "true"
+CHAT_HISTORY_FLUSH_SIZE = int(os.getenv("CHAT_HISTORY_FLUSH_SIZE", "50"))
+CHAT_HISTORY_FLUSH_INTERVAL = float(os.getenv("CHAT_HISTORY_FLUSH_INTERVAL", "1.0"))
+CHAT_HISTORY_MAX_BUFFER = int(os.getenv("CHAT_HISTORY_MAX_BUFFER", "10000"))
+
+Row = Tuple[str, str, str, datetime]
+T = TypeVar("T")
+
+
+class ChatHistoryWriter:
+    """
+    Persists chat turns to ask_hr_history.
+
+    Both messages of a turn are written in a single multi-row INSERT. With
+    write-behind enabled, rows are buffered and flushed when the buffer
+    reaches `flush_size` rows or every `flush_interval` seconds, and
+    `stop()` flushes whatever is left on shutdown.
+
+    When the database is unreachable, the rows are put back in the buffer
+    and retried on the next flush. The buffer holds at most `max_buffer`
+    rows, and the oldest rows are dropped past that. When a batch is
+    rejected, its rows are inserted one at a time and the rows that still
+    fail go to ask_hr_history_dead_letter, so one bad row cannot block
+    later flushes.
+    """
+
+    def __init__(
+        self,
+        write_behind: bool = CHAT_HISTORY_WRITE_BEHIND,
+        flush_size: int = CHAT_HISTORY_FLUSH_SIZE,
+        flush_interval: float = CHAT_HISTORY_FLUSH_INTERVAL,
+        max_buffer: int = CHAT_HISTORY_MAX_BUFFER,
+    ):
+        self.write_behind = write_behind
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max(max_buffer, flush_size)
+        self._buffer: List[Row] = []
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def save_turn(self, chat_id: str, user_message: str, assistant_message: str, started_at: Optional[datetime] = None) -> None:
+        now = datetime.now(timezone.utc)
+        rows = [
+            (chat_id, "user", user_message, started_at or now),
+            (chat_id, "assistant", assistant_message, now),
+        ]
+        if not self.write_behind:
+            await self._insert(rows)
+            return
+
+        self._buffer.extend(rows)
+        self._trim()
+        if len(self._buffer) >= self.flush_size:
+            await self.flush()
+
+    def pending_rows(self, chat_id: str) -> List[Row]:
+        """Buffered rows for chat_id that are not yet visible in the database."""
+        return [row for row in self._buffer if row[0] == chat_id]
+
+    async def read_with_pending(self, chat_id: str, query: Callable[[], Awaitable[T]]) -> Tuple[T, List[Row]]:
+        """
+        Run a database read and collect chat_id's buffered rows with no
+        flush in between, so every turn is seen exactly once: either in
+        the query result or among the pending rows.
+        """
+        async with self._lock:
+            result = await query()
+            return result, self.pending_rows(chat_id)
+
+    async def discard(self, chat_id: str) -> None:
+        """
+        Drop buffered rows for a deleted chat so a later flush does not
+        re-insert them. Waits for an in-flight flush, so a DELETE issued
+        afterwards also removes whatever that flush wrote.
+        """
+        async with self._lock:
+            self._buffer = [row for row in self._buffer if row[0] != chat_id]
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._buffer:
+                return
+            rows, self._buffer = self._buffer, []
+            try:
+                await self._insert(rows)
+            except psycopg.OperationalError as e:
+                logger.error(f"Chat history flush failed, retrying {len(rows)} rows later: {e}")
+                self._requeue(rows)
+            except Exception as e:
+                logger.error(f"Chat history batch of {len(rows)} rows rejected, inserting rows one by one: {e}")
+                await self._insert_each(rows)
+
+    def _requeue(self, rows: List[Row]) -> None:
+        self._buffer = rows + self._buffer
+        self._trim()
+
+    def _trim(self) -> None:
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            logger.error(f"Chat history buffer full, dropping the {overflow} oldest rows")
+            del self._buffer[:overflow]
+
+    async def _insert_each(self, rows: List[Row]) -> None:
+        for position, row in enumerate(rows):
+            try:
+                await self._insert([row])
+            except psycopg.OperationalError as e:
+                logger.error(f"Chat history flush failed, retrying {len(rows) - position} rows later: {e}")
+                self._requeue(rows[position:])
+                return
+            except Exception as e:
+                await self._dead_letter(row, e)
+
+    async def _dead_letter(self, row: Row, error: Exception) -> None:
+        try:
+            await async_db.execute(
+                "INSERT INTO ask_hr_history_dead_letter (chat_id, role, message, timestamp, error) VALUES (%s, %s, %s, %s, %s)",
+                (*row, str(error)),
+            )
+            logger.error(f"Moved a chat history row for chat {row[0]} to the dead-letter table: {error}")
+        except Exception as e:
+            logger.error(f"Dropped a chat history row for chat {row[0]} ({error}); dead-letter insert failed: {e}")
+
+    async def _insert(self, rows: List[Row]) -> None:
+        placeholders = ", ".join(["(%s, %s, %s, %s)"] * len(rows))
+        params = [value for row in rows for value in row]
+        await async_db.execute(
+            f"INSERT INTO ask_hr_history (chat_id, role, message, timestamp) VALUES {placeholders}",
+            params,
+        )
+        logger.info(f"Persisted {len(rows)} chat history rows")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self.write_behind and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+history_writer = ChatHistoryWriter()
@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from psycopg.types.json import Jsonb
+
+from db import async_db
+
+logger = logging.getLogger(__name__)
+
+INGEST_JOB_CONCURRENCY = int(os.getenv("INGEST_JOB_CONCURRENCY", "2"))
+INGEST_JOB_POLL_INTERVAL = float(os.getenv("INGEST_JOB_POLL_INTERVAL", "5"))
+INGEST_JOB_STALE_SECONDS = int(os.getenv("INGEST_JOB_STALE_SECONDS", "300"))
+
+DISPATCH_JOB_ID = "ingestion_dispatch"
+
+_STATUS_QUERY = """
+SELECT j.job_id, j.kind, j.domain, j.status, j.total_documents, j.error,
+       j.created_at, j.started_at, j.finished_at,
+       COUNT(i.item_key) FILTER (WHERE i.status = 'done') AS processed_documents,
+       COUNT(i.item_key) FILTER (WHERE i.status = 'failed') AS failed_documents,
+       COALESCE(SUM(i.chunks), 0)::int AS chunks,
+       EXTRACT(EPOCH FROM COALESCE(j.finished_at, NOW()) - j.started_at) AS elapsed_seconds
+FROM ingestion_jobs j
+LEFT JOIN ingestion_job_items i USING (job_id)
+"""
+
+
+class IngestionJob:
+    """A claimed job as seen by its handler."""
+
+    def __init__(self, row: Dict[str, Any], done_items: Set[str], secrets: Dict[str, Any]):
+        self.job_id = str(row["job_id"])
+        self.kind = row["kind"]
+        self.domain = row["domain"]
+        self.params = row["params"]
+        self.secrets = secrets
+        self._done = done_items
+
+    def is_done(self, item_key: str) -> bool:
+        """True when the document was ingested by an earlier run of this job."""
+        return item_key in self._done
+
+    async def set_total(self, total: int) -> None:
+        await async_db.execute(
+            "UPDATE ingestion_jobs SET total_documents = %s, heartbeat_at = NOW() WHERE job_id = %s",
+            (total, self.job_id),
+        )
+
+    async def checkpoint(self, item_key: str, chunks: int = 0, error: Optional[str] = None) -> None:
+        """Record one finished document and refresh the job's heartbeat."""
+        await async_db.execute(
+            """
+            WITH item AS (
+                INSERT INTO ingestion_job_items (job_id, item_key, status, chunks, error)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (job_id, item_key) DO UPDATE
+                SET status = EXCLUDED.status, chunks = EXCLUDED.chunks,
+                    error = EXCLUDED.error, updated_at = NOW()
+            )
+            UPDATE ingestion_jobs SET heartbeat_at = NOW() WHERE job_id = %s
+            """,
+            (self.job_id, item_key, "failed" if error else "done", chunks, error, self.job_id),
+        )
+        if not error:
+            self._done.add(item_key)
+
+
+Handler = Callable[[IngestionJob], Awaitable[None]]
+
+
+class IngestionJobRunner:
+    """
+    Runs ingestion jobs in the background, checkpointed in Postgres.
+
+    Jobs are queued in `ingestion_jobs` and claimed with
+    `FOR UPDATE SKIP LOCKED`, so several app instances can share the queue.
+    An APScheduler interval job polls for work, refreshes the heartbeat of
+    running jobs and keeps at most `concurrency` jobs running per process.
+    Handlers checkpoint each document in `ingestion_job_items`. A job
+    interrupted by a shutdown is re-queued, and a job whose heartbeat goes
+    stale (its process died) is claimed again. Either way the job resumes
+    from its checkpoints.
+
+    Secrets such as OneDrive tokens are kept in memory only, so a kind
+    registered with `needs_secrets` is claimed only by the process that
+    holds the job's secrets. That process keeps the job's heartbeat fresh
+    while it is queued. If the holder dies, the heartbeat goes stale and
+    any process may claim the job. The job then fails for lack of a
+    token, and can be resumed with a fresh one.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = INGEST_JOB_CONCURRENCY,
+        poll_interval: float = INGEST_JOB_POLL_INTERVAL,
+        stale_seconds: int = INGEST_JOB_STALE_SECONDS,
+    ):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_seconds = stale_seconds
+        self._handlers: Dict[str, Handler] = {}
+        self._secret_kinds: Set[str] = set()
+        self._secrets: Dict[str, Dict[str, Any]] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._dispatch_lock = asyncio.Lock()
+        self._scheduler: Optional[AsyncIOScheduler] = None
+
+    def register(self, kind: str, handler: Handler, needs_secrets: bool = False) -> None:
+        self._handlers[kind] = handler
+        if needs_secrets:
+            self._secret_kinds.add(kind)
+
+    async def submit(self, kind: str, domain: str, params: Dict[str, Any], secrets: Optional[Dict[str, Any]] = None) -> str:
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown ingestion job kind '{kind}'")
+        job_id = str(uuid.uuid4())
+        await async_db.execute(
+            "INSERT INTO ingestion_jobs (job_id, kind, domain, params, heartbeat_at) VALUES (%s, %s, %s, %s, NOW())",
+            (job_id, kind, domain, Jsonb(params)),
+        )
+        if secrets:
+            self._secrets[job_id] = secrets
+        logger.info(f"Queued {kind} ingestion job {job_id} for domain '{domain}'")
+        self.wake()
+        return job_id
+
+    async def resume(self, job_id: str, secrets: Optional[Dict[str, Any]] = None) -> bool:
+        """Re-queue a failed job; it skips the documents it already ingested."""
+        rows = await async_db.fetch_all(
+            """
+            UPDATE ingestion_jobs SET status = 'queued', error = NULL, finished_at = NULL, heartbeat_at = NOW()
+            WHERE job_id = %s AND status IN ('queued', 'failed')
+            RETURNING job_id
+            """,
+            (job_id,),
+        )
+        if not rows:
+            return False
+        if secrets:
+            self._secrets[job_id] = secrets
+        self.wake()
+        return True
+
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = await async_db.fetch_all(_STATUS_QUERY + "WHERE j.job_id = %s GROUP BY j.job_id", (job_id,))
+        return _with_progress(rows[0]) if rows else None
+
+    async def list_jobs(self, domain: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        rows = await async_db.fetch_all(
+            _STATUS_QUERY
+            + """
+            WHERE (%s::text IS NULL OR j.domain = %s) AND (%s::text IS NULL OR j.status = %s)
+            GROUP BY j.job_id
+            ORDER BY j.created_at DESC
+            LIMIT %s
+            """,
+            (domain, domain, status, status, limit),
+        )
+        return [_with_progress(row) for row in rows]
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        rows = await async_db.fetch_all(
+            """
+            UPDATE ingestion_jobs
+            SET status = 'running', started_at = COALESCE(started_at, NOW()), heartbeat_at = NOW()
+            WHERE job_id = (
+                SELECT job_id FROM ingestion_jobs
+                WHERE ((status = 'queued'
+                        AND (NOT (kind = ANY(%s))
+                             OR job_id::text = ANY(%s)
+                             OR COALESCE(heartbeat_at, created_at) < NOW() - make_interval(secs => %s)))
+                       OR (status = 'running' AND heartbeat_at < NOW() - make_interval(secs => %s)))
+                  AND NOT (job_id::text = ANY(%s))
+                ORDER BY created_at
+                FOR UPDATE SKIP LOCKED
+                LIMIT 1
+            )
+            RETURNING job_id, kind, domain, params
+            """,
+            (
+                list(self._secret_kinds),
+                list(self._secrets),
+                self.stale_seconds,
+                self.stale_seconds,
+                list(self._running),
+            ),
+        )
+        return rows[0] if rows else None
+
+    async def dispatch(self) -> None:
+        """Claim queued jobs until this process runs `concurrency` of them."""
+        async with self._dispatch_lock:
+            while len(self._running) < self.concurrency:
+                row = await self._claim()
+                if row is None:
+                    return
+                job_id = str(row["job_id"])
+                self._running[job_id] = asyncio.create_task(self._run_job(row))
+
+    async def _tick(self) -> None:
+        try:
+            # Running jobs, and queued jobs that only this process can run
+            alive = set(self._running) | set(self._secrets)
+            if alive:
+                await async_db.execute(
+                    "UPDATE ingestion_jobs SET heartbeat_at = NOW() WHERE job_id::text = ANY(%s)",
+                    (list(alive),),
+                )
+            await self.dispatch()
+        except Exception as e:
+            logger.error(f"Ingestion job dispatch failed: {e}")
+
+    async def _run_job(self, row: Dict[str, Any]) -> None:
+        job_id = str(row["job_id"])
+        logger.info(f"Starting {row['kind']} ingestion job {job_id} for domain '{row['domain']}'")
+        try:
+            handler = self._handlers.get(row["kind"])
+            if handler is None:
+                raise RuntimeError(f"No handler registered for job kind '{row['kind']}'")
+            done = await async_db.fetch_all(
+                "SELECT item_key FROM ingestion_job_items WHERE job_id = %s AND status = 'done'",
+                (job_id,),
+            )
+            job = IngestionJob(row, {r["item_key"] for r in done}, self._secrets.get(job_id, {}))
+            await handler(job)
+            await async_db.execute(
+                "UPDATE ingestion_jobs SET status = 'completed', finished_at = NOW(), heartbeat_at = NOW() WHERE job_id = %s",
+                (job_id,),
+            )
+            self._secrets.pop(job_id, None)
+            logger.info(f"Ingestion job {job_id} completed")
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back so the next start resumes it
+            await async_db.execute("UPDATE ingestion_jobs SET status = 'queued' WHERE job_id = %s", (job_id,))
+            raise
+        except Exception as e:
+            logger.error(f"Ingestion job {job_id} failed: {e}")
+            await async_db.execute(
+                "UPDATE ingestion_jobs SET status = 'failed', error = %s, finished_at = NOW() WHERE job_id = %s",
+                (str(e), job_id),
+            )
+        finally:
+            self._running.pop(job_id, None)
+        self.wake()
+
+    def wake(self) -> None:
+        """Run the dispatcher now instead of waiting for the next poll."""
+        if self._scheduler is not None:
+            self._scheduler.modify_job(DISPATCH_JOB_ID, next_run_time=datetime.now())
+
+    def start(self) -> None:
+        if self._scheduler is not None:
+            return
+        self._scheduler = AsyncIOScheduler()
+        self._scheduler.add_job(
+            self._tick,
+            "interval",
+            seconds=self.poll_interval,
+            id=DISPATCH_JOB_ID,
+            max_instances=1,
+            coalesce=True,
+            next_run_time=datetime.now(),
+        )
+        self._scheduler.start()
+
+    async def stop(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+        tasks = list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _with_progress(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Add throughput and ETA to a job status row."""
+    job = dict(row)
+    job["job_id"] = str(job["job_id"])
+    elapsed = float(job.pop("elapsed_seconds") or 0.0)
+    finished = job["processed_documents"] + job["failed_documents"]
+    total = job["total_documents"]
+
+    job["elapsed_seconds"] = round(elapsed, 1)
+    job["documents_per_second"] = round(finished / elapsed, 3) if elapsed else 0.0
+    job["chunks_per_second"] = round(job["chunks"] / elapsed, 2) if elapsed else 0.0
+    job["progress"] = round(finished / total, 4) if total else None
+    job["eta_seconds"] = None
+    if job["status"] == "running" and total and job["documents_per_second"]:
+        job["eta_seconds"] = round(max(total - finished, 0) / job["documents_per_second"], 1)
+    return job
+
+
+ingestion_jobs = IngestionJobRunner()
@@ -0,0 +1,101 @@
+"""
+Per-source manifest of ingested chunks, stored in the `documents` table.
+
+Chunk point IDs are derived from the collection, the source and a hash of
+the chunk text, so re-ingesting a source only needs to embed chunks whose
+IDs are not already in its manifest and delete the ones that disappeared.
+"""
+import hashlib
+import logging
+import uuid
+from typing import Dict, List, Sequence, Set, Tuple
+
+import psycopg2.extras
+
+from db.psql_connector import DB, default_config
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_point_id(collection_name: str, source: str, content_hash: str) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{collection_name}|{source}|{content_hash}"))
+
+
+def load_manifest(collection_name: str, source: str) -> Set[str]:
+    """Return the point IDs currently recorded for a source."""
+    db = DB(default_config())
+    try:
+        db.exec(
+            "SELECT document_id FROM documents WHERE collection_id = %s AND source = %s",
+            (collection_name, source),
+        )
+        return {str(row["document_id"]) for row in db.fetchall()}
+    finally:
+        db.close()
+
+
+def replace_manifest(collection_name: str, source: str, entries: Sequence[Tuple[str, int, str]]) -> None:
+    """Replace a source's manifest with (point_id, chunk_index, content_hash) entries."""
+    db = DB(default_config())
+    try:
+        db.exec(
+            "DELETE FROM documents WHERE collection_id = %s AND source = %s",
+            (collection_name, source),
+        )
+        psycopg2.extras.execute_values(
+            db.get_cur(),
+            """
+            INSERT INTO documents (document_id, collection_id, chunk_index, total_chunks, source, metadata)
+            VALUES %s
+            """,
+            [
+                (point_id, collection_name, index, len(entries), source, psycopg2.extras.Json({"hash": content_hash}))
+                for point_id, index, content_hash in entries
+            ],
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def delete_manifest(collection_name: str) -> None:
+    db = DB(default_config())
+    try:
+        db.exec("DELETE FROM documents WHERE collection_id = %s", (collection_name,))
+        db.commit()
+    finally:
+        db.close()
+
+
+def plan_source_sync(collection_name: str, source: str, texts: Sequence[str]) -> Dict:
+    """
+    Diff a source's new chunks against its manifest.
+
+    Returns deduplicated manifest entries, the (position in `texts`, point_id)
+    pairs that need embedding and the stale point IDs to delete.
+    """
+    entries: List[Tuple[str, int, str]] = []
+    positions: List[int] = []
+    seen: Set[str] = set()
+    for position, text in enumerate(texts):
+        content_hash = chunk_hash(text)
+        point_id = chunk_point_id(collection_name, source, content_hash)
+        if point_id in seen:
+            continue
+        seen.add(point_id)
+        entries.append((point_id, len(entries), content_hash))
+        positions.append(position)
+
+    try:
+        existing = load_manifest(collection_name, source)
+    except Exception as e:
+        logger.warning(f"Could not load manifest for '{source}', re-embedding all chunks: {e}")
+        existing = set()
+
+    to_embed = [(pos, point_id) for pos, (point_id, _, _) in zip(positions, entries) if point_id not in existing]
+    stale = sorted(existing - seen)
+    return {"entries": entries, "to_embed": to_embed, "stale": stale}
@@ -1,16 +1,36 @@
 import re
+import os
+import time
 import logging
-from typing import Optional
+import threading
+from typing import Dict, Optional, Tuple
 import spacy
+from cachetools import TTLCache
+from prometheus_client import Histogram
 from langchain import LLMChain, PromptTemplate
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 from langgraph.graph.message import add_messages
 from .app_types import AgentState
+from .embedding_cache import normalize_query
 
 logger = logging.getLogger(__name__)
 nlp = spacy.load("en_core_web_sm")
 
+INTENT_LABELS = ["BOOKING", "MAPPING", "DOCUMENT", "NONE"]
+INTENT_LOCAL_CONFIDENCE = float(os.getenv("INTENT_LOCAL_CONFIDENCE", "0.8"))
+INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", "4096"))
+INTENT_CACHE_TTL = int(os.getenv("INTENT_CACHE_TTL", "86400"))
+
+INTENT_LATENCY = Histogram(
+    "intent_detection_seconds", "Intent detection latency by resolution path", ["source"]
+)
+
+# TTLCache is not thread-safe and detect_intent runs on several threads
+_intent_cache: TTLCache = TTLCache(maxsize=INTENT_CACHE_SIZE, ttl=INTENT_CACHE_TTL)
+_intent_cache_lock = threading.Lock()
+_intent_chain = None
+
 def detect_intent_with_context(query: str, destination_context: str = None) -> str:
     """
     Enhanced intent detection that considers destination context.
@@ -36,69 +56,149 @@ def detect_intent(query: str) -> str:
     Unified intent detection for queries:
     - DOCUMENT (knowledge/document retrieval intent)
     - NONE (no clear intent)
+
+    Results are memoized per normalized query. The LLM is only consulted
+    when the local feature-based classifier is not confident enough.
     """
+    started = time.perf_counter()
+    key = normalize_query(query)
+
+    with _intent_cache_lock:
+        cached = _intent_cache.get(key)
+    if cached is not None:
+        INTENT_LATENCY.labels(source="cache").observe(time.perf_counter() - started)
+        logger.info(f"Cached intent for '{query}': {cached}")
+        return cached
 
     try:
-        doc = nlp(query)
+        features = extract_intent_features(query)
 
-        has_booking_verbs = any(
-            token.lemma_ in ["book", "reserve", "make", "get", "find", "search", "stay"]
-            for token in doc if token.pos_ == "VERB"
-        )
-        has_accommodation_nouns = any(
-            token.lemma_ in ["hotel", "room", "accommodation", "stay", "booking", "reservation", "lodge", "inn"]
-            for token in doc if token.pos_ == "NOUN"
-        )
-        has_temporal_references = any(
-            token.lemma_ in ["tonight", "tomorrow", "today", "date", "night", "week", "month", "weekend"]
-            for token in doc
-        )
+        intent, confidence = classify_locally(features)
+        if confidence >= INTENT_LOCAL_CONFIDENCE:
+            source = "local"
+        else:
+            intent = _classify_with_llm(query, features)
+            source = "llm"
 
-        has_movement_verbs = any(
-            token.lemma_ in ["go", "get", "reach", "travel", "move", "navigate", "drive", "walk", "come", "head", "visit"]
-            for token in doc if token.pos_ == "VERB"
-        )
-        has_location_entities = any(ent.label_ in ["GPE", "LOC", "FAC"] for ent in doc.ents)
-        has_directional_words = any(
-            token.lemma_ in ["direction", "route", "way", "path", "road", "highway", "map"]
-            for token in doc if token.pos_ == "NOUN"
-        )
-        has_spatial_references = any(
-            token.lemma_ in ["there", "here", "place", "from", "to", "near", "around"]
-            for token in doc if token.pos_ in ["ADV", "NOUN", "ADP"]
-        )
-        has_from_to_pattern = bool(re.search(r"from\s+.+\s+to\s+", query, re.IGNORECASE))
-
-        document_keywords = [
-            "policy", "procedure", "document", "manual", "guide", "regulation",
-            "specification", "requirement", "standard", "report", "analysis",
-            "data", "information", "details", "explain", "what is", "how does",
-            "definition", "overview", "summary",
-
-            "places", "attractions", "sites", "things to do", "visit",
-            "famous", "popular", "best", "top", "interesting", "beautiful",
-            "culture", "history", "food", "restaurants", "temples", "museums",
-            "shopping", "activities", "events", "festivals", "weather",
-            "about", "regarding", "concerning", "tell me", "what are",
-            "list", "show me", "recommend", "suggest"
-        ]
-        query_lower = query.lower()
-        has_document_keywords = any(keyword in query_lower for keyword in document_keywords)
-
-        document_question_patterns = [
-            r"what\s+(are|is)\s+",
-            r"tell\s+me\s+about",
-            r"famous\s+\w+\s+in",
-            r"places\s+in",
-            r"things\s+to\s+do",
-            r"attractions\s+in",
-            r"sites\s+in",
-            r"best\s+\w+\s+in",
-            r"popular\s+\w+\s+in",
-            r"interesting\s+\w+\s+in",
-        ]
-        has_document_patterns = any(re.search(pattern, query_lower) for pattern in document_question_patterns)
+        with _intent_cache_lock:
+            _intent_cache[key] = intent
+        INTENT_LATENCY.labels(source=source).observe(time.perf_counter() - started)
+        logger.info(f"Enhanced intent detection for '{query}': {intent} ({source}, local confidence {confidence:.2f})")
+        return intent
+
+    except Exception as e:
+        logger.error(f"Enhanced intent detection failed: {e}")
+        intent = _fallback_intent(query)
+        INTENT_LATENCY.labels(source="fallback").observe(time.perf_counter() - started)
+        return intent
+
+def extract_intent_features(query: str) -> Dict[str, bool]:
+    """Keyword, regex and spaCy features shared by the local and LLM classifiers."""
+    doc = nlp(query)
+
+    has_booking_verbs = any(
+        token.lemma_ in ["book", "reserve", "make", "get", "find", "search", "stay"]
+        for token in doc if token.pos_ == "VERB"
+    )
+    has_accommodation_nouns = any(
+        token.lemma_ in ["hotel", "room", "accommodation", "stay", "booking", "reservation", "lodge", "inn"]
+        for token in doc if token.pos_ == "NOUN"
+    )
+    has_temporal_references = any(
+        token.lemma_ in ["tonight", "tomorrow", "today", "date", "night", "week", "month", "weekend"]
+        for token in doc
+    )
+
+    has_movement_verbs = any(
+        token.lemma_ in ["go", "get", "reach", "travel", "move", "navigate", "drive", "walk", "come", "head", "visit"]
+        for token in doc if token.pos_ == "VERB"
+    )
+    has_location_entities = any(ent.label_ in ["GPE", "LOC", "FAC"] for ent in doc.ents)
+    has_directional_words = any(
+        token.lemma_ in ["direction", "route", "way", "path", "road", "highway", "map"]
+        for token in doc if token.pos_ == "NOUN"
+    )
+    has_spatial_references = any(
+        token.lemma_ in ["there", "here", "place", "from", "to", "near", "around"]
+        for token in doc if token.pos_ in ["ADV", "NOUN", "ADP"]
+    )
+    has_from_to_pattern = bool(re.search(r"from\s+.+\s+to\s+", query, re.IGNORECASE))
+
+    document_keywords = [
+        "policy", "procedure", "document", "manual", "guide", "regulation",
+        "specification", "requirement", "standard", "report", "analysis",
+        "data", "information", "details", "explain", "what is", "how does",
+        "definition", "overview", "summary",
 
+        "places", "attractions", "sites", "things to do", "visit",
+        "famous", "popular", "best", "top", "interesting", "beautiful",
+        "culture", "history", "food", "restaurants", "temples", "museums",
+        "shopping", "activities", "events", "festivals", "weather",
+        "about", "regarding", "concerning", "tell me", "what are",
+        "list", "show me", "recommend", "suggest"
+    ]
+    query_lower = query.lower()
+    has_document_keywords = any(keyword in query_lower for keyword in document_keywords)
+
+    document_question_patterns = [
+        r"what\s+(are|is)\s+",
+        r"tell\s+me\s+about",
+        r"famous\s+\w+\s+in",
+        r"places\s+in",
+        r"things\s+to\s+do",
+        r"attractions\s+in",
+        r"sites\s+in",
+        r"best\s+\w+\s+in",
+        r"popular\s+\w+\s+in",
+        r"interesting\s+\w+\s+in",
+    ]
+    has_document_patterns = any(re.search(pattern, query_lower) for pattern in document_question_patterns)
+
+    return {
+        "has_booking_verbs": has_booking_verbs,
+        "has_accommodation_nouns": has_accommodation_nouns,
+        "has_temporal_references": has_temporal_references,
+        "has_movement_verbs": has_movement_verbs,
+        "has_location_entities": has_location_entities,
+        "has_directional_words": has_directional_words,
+        "has_spatial_references": has_spatial_references,
+        "has_from_to_pattern": has_from_to_pattern,
+        "has_document_keywords": has_document_keywords,
+        "has_document_patterns": has_document_patterns,
+    }
+
+def classify_locally(features: Dict[str, bool]) -> Tuple[str, float]:
+    """
+    Score intents from the extracted features alone.
+    Returns the best label and a confidence in [0, 1].
+    """
+    booking = (
+        0.5 * features["has_booking_verbs"]
+        + 0.4 * features["has_accommodation_nouns"]
+        + 0.1 * features["has_temporal_references"]
+    )
+    mapping = (
+        0.5 * features["has_from_to_pattern"]
+        + 0.3 * features["has_directional_words"]
+        + 0.2 * (features["has_movement_verbs"] and features["has_spatial_references"])
+    )
+    document = (
+        0.5 * features["has_document_patterns"]
+        + 0.4 * features["has_document_keywords"]
+        + 0.1 * (not features["has_booking_verbs"] and not features["has_from_to_pattern"])
+    )
+
+    scores = {"BOOKING": booking, "MAPPING": mapping, "DOCUMENT": document}
+    intent = max(scores, key=scores.get)
+    runner_up = max(v for k, v in scores.items() if k != intent)
+    confidence = scores[intent] - 0.5 * runner_up
+    if scores[intent] == 0:
+        return "NONE", 0.0
+    return intent, max(0.0, min(1.0, confidence))
+
+def _get_intent_chain():
+    global _intent_chain
+    if _intent_chain is None:
         prompt = PromptTemplate.from_template(
             """Classify the user's intent into one of these categories:
 - BOOKING: if the user wants to book, reserve, or find accommodation (hotel, room, etc.)
@@ -138,53 +238,39 @@ Answer with only one label: BOOKING, MAPPING, DOCUMENT, or NONE.
             temperature=0,
             convert_system_message_to_human=True
         )
-        chain = LLMChain(llm=llm, prompt=prompt)
-
-        result = chain.run(
-            query=query,
-            has_booking_verbs=has_booking_verbs,
-            has_accommodation_nouns=has_accommodation_nouns,
-            has_temporal_references=has_temporal_references,
-            has_movement_verbs=has_movement_verbs,
-            has_location_entities=has_location_entities,
-            has_directional_words=has_directional_words,
-            has_spatial_references=has_spatial_references,
-            has_from_to_pattern=has_from_to_pattern,
-            has_document_keywords=has_document_keywords,
-            has_document_patterns=has_document_patterns
-        )
+        _intent_chain = LLMChain(llm=llm, prompt=prompt)
+    return _intent_chain
 
-        intent = result.strip().upper()
-        if intent not in ["BOOKING", "MAPPING", "DOCUMENT", "NONE"]:
-            intent = "NONE"
+def _classify_with_llm(query: str, features: Dict[str, bool]) -> str:
+    result = _get_intent_chain().run(query=query, **features)
 
-        logger.info(f"Enhanced intent detection for '{query}': {intent}")
-        return intent
+    intent = result.strip().upper()
+    if intent not in INTENT_LABELS:
+        intent = "NONE"
+    return intent
 
-    except Exception as e:
-        logger.error(f"Enhanced intent detection failed: {e}")
-        
-        query_lower = query.lower()
-
-        document_fallback_patterns = [
-            "places", "attractions", "sites", "things to do", "visit",
-            "famous", "popular", "best", "top", "interesting",
-            "what are", "tell me", "about", "culture", "history",
-            "food", "restaurants", "temples", "museums", "weather"
-        ]
-        
-        if any(pattern in query_lower for pattern in document_fallback_patterns):
-            logger.info(f"Fallback: Classified '{query}' as DOCUMENT")
-            return "DOCUMENT"
-
-        if any(word in query_lower for word in ["book", "reserve", "hotel", "room", "stay", "accommodation"]):
-            logger.info(f"Fallback: Classified '{query}' as BOOKING")
-            return "BOOKING"
-
-        if re.search(r"from\s+.+\s+to\s+", query_lower) or \
-           any(word in query_lower for word in ["direction", "route", "navigate", "map", "how to get", "how to go"]):
-            logger.info(f"Fallback: Classified '{query}' as MAPPING")
-            return "MAPPING"
-
-        logger.info(f"Fallback: Classified '{query}' as NONE")
-        return "NONE"
\ No newline at end of file
+def _fallback_intent(query: str) -> str:
+    query_lower = query.lower()
+
+    document_fallback_patterns = [
+        "places", "attractions", "sites", "things to do", "visit",
+        "famous", "popular", "best", "top", "interesting",
+        "what are", "tell me", "about", "culture", "history",
+        "food", "restaurants", "temples", "museums", "weather"
+    ]
+    
+    if any(pattern in query_lower for pattern in document_fallback_patterns):
+        logger.info(f"Fallback: Classified '{query}' as DOCUMENT")
+        return "DOCUMENT"
+
+    if any(word in query_lower for word in ["book", "reserve", "hotel", "room", "stay", "accommodation"]):
+        logger.info(f"Fallback: Classified '{query}' as BOOKING")
+        return "BOOKING"
+
+    if re.search(r"from\s+.+\s+to\s+", query_lower) or \
+       any(word in query_lower for word in ["direction", "route", "navigate", "map", "how to get", "how to go"]):
+        logger.info(f"Fallback: Classified '{query}' as MAPPING")
+        return "MAPPING"
+
+    logger.info(f"Fallback: Classified '{query}' as NONE")
+    return "NONE"
\ No newline at end of file
@@ -0,0 +1,95 @@
+import asyncio
+import io
+import logging
+import os
+import tempfile
+from typing import Any, AsyncIterator, Dict, Optional, Union
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+GRAPH_URL = "https://graph.microsoft.com/v1.0"
+
+ONEDRIVE_DOWNLOAD_CONCURRENCY = int(os.getenv("ONEDRIVE_DOWNLOAD_CONCURRENCY", "4"))
+ONEDRIVE_SPOOL_MAX_BYTES = int(os.getenv("ONEDRIVE_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+ONEDRIVE_MAX_DEPTH = int(os.getenv("ONEDRIVE_MAX_DEPTH", "10"))
+ONEDRIVE_PAGE_SIZE = int(os.getenv("ONEDRIVE_PAGE_SIZE", "200"))
+ONEDRIVE_CHUNK_BYTES = 1024 * 1024
+
+
+class DownloadedFile:
+    """
+    A downloaded drive item.
+
+    Small files are kept in memory; anything larger than the spool limit is
+    streamed to a temporary file on disk and `source` is its path, which the
+    parsers open directly. Call `cleanup()` once the file is parsed.
+    """
+
+    def __init__(self, item: Dict[str, Any], source: Union[bytes, str]):
+        self.item = item
+        self.source = source
+
+    @property
+    def name(self) -> str:
+        return self.item["name"]
+
+    def cleanup(self) -> None:
+        if isinstance(self.source, str) and os.path.exists(self.source):
+            os.remove(self.source)
+
+
+class GraphClient:
+    """Minimal async Microsoft Graph client for walking and downloading OneDrive folders."""
+
+    def __init__(self, token: str, session: aiohttp.ClientSession, download_concurrency: int = ONEDRIVE_DOWNLOAD_CONCURRENCY):
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.session = session
+        self._downloads = asyncio.Semaphore(download_concurrency)
+
+    async def list_children(self, folder_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every child of a folder, following @odata.nextLink pages."""
+        url: Optional[str] = f"{GRAPH_URL}/me/drive/items/{folder_id}/children?$top={ONEDRIVE_PAGE_SIZE}"
+        while url:
+            async with self.session.get(url, headers=self.headers) as response:
+                response.raise_for_status()
+                page = await response.json()
+            for item in page.get("value", []):
+                yield item
+            url = page.get("@odata.nextLink")
+
+    async def walk(self, folder_id: str, depth: int = 0) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every file under a folder, recursing into subfolders."""
+        async for item in self.list_children(folder_id):
+            if "folder" in item:
+                if depth >= ONEDRIVE_MAX_DEPTH:
+                    logger.warning(f"Not descending into {item['name']}: max depth {ONEDRIVE_MAX_DEPTH} reached")
+                    continue
+                async for child in self.walk(item["id"], depth + 1):
+                    yield child
+            elif "@microsoft.graph.downloadUrl" in item:
+                yield item
+
+    async def download(self, item: Dict[str, Any]) -> DownloadedFile:
+        """Stream a file's content, spooling large files to disk."""
+        async with self._downloads:
+            async with self.session.get(item["@microsoft.graph.downloadUrl"]) as response:
+                response.raise_for_status()
+                if item.get("size", 0) <= ONEDRIVE_SPOOL_MAX_BYTES:
+                    buffer = io.BytesIO()
+                    async for chunk in response.content.iter_chunked(ONEDRIVE_CHUNK_BYTES):
+                        buffer.write(chunk)
+                    return DownloadedFile(item, buffer.getvalue())
+
+                suffix = os.path.splitext(item["name"])[1]
+                with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as spool:
+                    try:
+                        async for chunk in response.content.iter_chunked(ONEDRIVE_CHUNK_BYTES):
+                            spool.write(chunk)
+                    except BaseException:
+                        # Failed or cancelled part-way: do not leave the partial file behind
+                        spool.close()
+                        os.remove(spool.name)
+                        raise
+                return DownloadedFile(item, spool.name)
@@ -0,0 +1,99 @@
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List
+
+from api.v1.chat.chunking import token_counts
+
+logger = logging.getLogger(__name__)
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "true").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "ms-marco-MiniLM-L-12-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+RERANK_DEDUP_THRESHOLD = float(os.getenv("RERANK_DEDUP_THRESHOLD", "0.85"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+
+_ranker = None
+_ranker_lock = threading.Lock()
+
+
+def _get_ranker():
+    """Load the FlashRank cross-encoder (ONNX, CPU) once per process."""
+    global _ranker
+    if _ranker is None:
+        with _ranker_lock:
+            if _ranker is None:
+                from flashrank import Ranker
+                _ranker = Ranker(model_name=RERANK_MODEL)
+                logger.info(f"Loaded reranker model {RERANK_MODEL}")
+    return _ranker
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = re.findall(r"\w+", text.lower())
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+
+def _page_content(hit: Dict[str, Any]) -> str:
+    return (hit.get("payload") or {}).get("page_content", "")
+
+
+def rerank(query: str, hits: List[Dict[str, Any]], batch_size: int = RERANK_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """Score hits with the cross-encoder in batches and sort by rerank score."""
+    from flashrank import RerankRequest
+
+    ranker = _get_ranker()
+    scores: Dict[int, float] = {}
+    for start in range(0, len(hits), batch_size):
+        passages = [
+            {"id": i, "text": _page_content(hits[i])}
+            for i in range(start, min(start + batch_size, len(hits)))
+        ]
+        for result in ranker.rerank(RerankRequest(query=query, passages=passages)):
+            scores[result["id"]] = float(result["score"])
+
+    ranked = [{**hit, "rerank_score": scores.get(i, 0.0)} for i, hit in enumerate(hits)]
+    ranked.sort(key=lambda hit: hit["rerank_score"], reverse=True)
+    return ranked
+
+
+def select_context(
+    query: str,
+    hits: List[Dict[str, Any]],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    dedup_threshold: float = RERANK_DEDUP_THRESHOLD,
+) -> List[Dict[str, Any]]:
+    """
+    Rerank candidates, drop near-duplicates and keep the best chunks that fit
+    in the token budget. If the reranker is unavailable the vector-search
+    order is kept.
+    """
+    hits = [hit for hit in hits if _page_content(hit)]
+    if RERANK_ENABLED and len(hits) > 1:
+        try:
+            hits = rerank(query, hits)
+        except Exception as e:
+            logger.warning(f"Reranking failed, keeping vector search order: {e}")
+
+    selected: List[Dict[str, Any]] = []
+    selected_shingles: List[set] = []
+    used_tokens = 0
+    # Same tokenizer and fallback as the chunker, so chunk and context budgets agree
+    texts = [_page_content(hit) for hit in hits]
+    for hit, text, tokens in zip(hits, texts, token_counts(texts)):
+        shingles = _shingles(text)
+        if any(len(shingles & other) / len(shingles | other) >= dedup_threshold for other in selected_shingles):
+            continue
+
+        if used_tokens + tokens > token_budget:
+            if selected:
+                continue
+            # Always keep the best chunk, even if it alone exceeds the budget
+        selected.append(hit)
+        selected_shingles.append(shingles)
+        used_tokens += tokens
+
+    logger.info(f"Selected {len(selected)}/{len(hits)} chunks using {used_tokens}/{token_budget} tokens")
+    return selected
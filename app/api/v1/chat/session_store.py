@@ -0,0 +1,228 @@
+import logging
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Optional
+
+from langgraph.checkpoint.memory import MemorySaver
+from prometheus_client import Gauge
+
+logger = logging.getLogger(__name__)
+
+SESSION_STORE_MAX = int(os.getenv("SESSION_STORE_MAX", "1000"))
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "3600"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "1000"))
+CHECKPOINT_HISTORY = int(os.getenv("CHECKPOINT_HISTORY", "5"))
+CHECKPOINT_MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_BYTES", str(256 * 1024 * 1024)))
+CHECKPOINTER = os.getenv("CHECKPOINTER", "memory").lower()
+
+LIVE_SESSIONS = Gauge("session_store_live_sessions", "Sessions held in memory", ["store"])
+RETAINED_BYTES = Gauge("session_store_retained_bytes", "Approximate bytes held in memory", ["store"])
+
+
+def _estimate_size(value: Any) -> int:
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class BoundedSessionStore(MutableMapping):
+    """
+    Dict-like session store with LRU and idle-TTL eviction and a memory ceiling.
+
+    Sizes are estimated when a value is assigned, so mutate-in-place updates
+    should be written back (`store[key] = value`) to be accounted for.
+    """
+
+    def __init__(self, name: str, max_entries: int = SESSION_STORE_MAX, idle_ttl: int = SESSION_IDLE_TTL, max_bytes: int = SESSION_MAX_BYTES):
+        self.name = name
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        LIVE_SESSIONS.labels(store=name).set_function(lambda: len(self._data))
+        RETAINED_BYTES.labels(store=name).set_function(lambda: self._bytes)
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._data:
+            key, (_, last_access, _) = next(iter(self._data.items()))
+            over_limit = len(self._data) > self.max_entries or self._bytes > self.max_bytes
+            if not over_limit and now - last_access < self.idle_ttl:
+                break
+            self._pop(key)
+
+    def _pop(self, key: str):
+        value, _, size = self._data.pop(key)
+        self._bytes -= size
+        return value
+
+    def __getitem__(self, key: str) -> Any:
+        with self._lock:
+            self._expire()
+            value, _, size = self._data[key]
+            self._data[key] = (value, time.monotonic(), size)
+            self._data.move_to_end(key)
+            return value
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            size = _estimate_size(value)
+            self._data[key] = (value, time.monotonic(), size)
+            self._bytes += size
+            self._expire()
+
+    def __delitem__(self, key: str) -> None:
+        with self._lock:
+            self._pop(key)
+
+    def __contains__(self, key: object) -> bool:
+        with self._lock:
+            self._expire()
+            return key in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            self._expire()
+            return iter(list(self._data))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._expire()
+            return len(self._data)
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    MemorySaver that keeps at most `history` checkpoints per thread and evicts
+    whole threads by LRU, idle TTL and a total byte ceiling.
+    """
+
+    def __init__(self, max_threads: int = CHECKPOINT_MAX_THREADS, idle_ttl: int = SESSION_IDLE_TTL, max_bytes: int = CHECKPOINT_MAX_BYTES, history: int = CHECKPOINT_HISTORY, **kwargs):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.history = history
+        self._access: "OrderedDict[str, float]" = OrderedDict()
+        self._thread_bytes: Dict[str, int] = {}
+        self._evict_lock = threading.RLock()
+        LIVE_SESSIONS.labels(store="checkpoints").set_function(lambda: len(self._access))
+        RETAINED_BYTES.labels(store="checkpoints").set_function(lambda: sum(self._thread_bytes.values()))
+
+    @staticmethod
+    def _thread_id(config) -> Optional[str]:
+        return config.get("configurable", {}).get("thread_id")
+
+    def _touch(self, thread_id: str) -> None:
+        with self._evict_lock:
+            self._access[thread_id] = time.monotonic()
+            self._access.move_to_end(thread_id)
+
+    def _trim_history(self, thread_id: str) -> None:
+        for checkpoint_ns, checkpoints in self.storage.get(thread_id, {}).items():
+            stale = sorted(checkpoints)[:-self.history] if len(checkpoints) > self.history else []
+            for checkpoint_id in stale:
+                checkpoints.pop(checkpoint_id, None)
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+    def _measure(self, thread_id: str) -> int:
+        size = 0
+        for checkpoints in self.storage.get(thread_id, {}).values():
+            for saved in checkpoints.values():
+                size += sum(len(part[1]) for part in saved[:2] if isinstance(part, tuple) and isinstance(part[1], (bytes, bytearray)))
+        # Newer MemorySaver versions keep channel values in a separate blobs dict
+        for key, blob in getattr(self, "blobs", {}).items():
+            if key[0] == thread_id and isinstance(blob, tuple) and isinstance(blob[1], (bytes, bytearray)):
+                size += len(blob[1])
+        return size
+
+    def evict_thread(self, thread_id: str) -> None:
+        with self._evict_lock:
+            self.storage.pop(thread_id, None)
+            for key in [k for k in self.writes if k[0] == thread_id]:
+                self.writes.pop(key, None)
+            blobs = getattr(self, "blobs", None)
+            if blobs is not None:
+                for key in [k for k in blobs if k[0] == thread_id]:
+                    blobs.pop(key, None)
+            self._access.pop(thread_id, None)
+            self._thread_bytes.pop(thread_id, None)
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        with self._evict_lock:
+            while self._access:
+                thread_id, last_access = next(iter(self._access.items()))
+                over_limit = (
+                    len(self._access) > self.max_threads
+                    or sum(self._thread_bytes.values()) > self.max_bytes
+                )
+                if not over_limit and now - last_access < self.idle_ttl:
+                    break
+                logger.info(f"Evicting checkpoints for thread {thread_id}")
+                self.evict_thread(thread_id)
+
+    def get_tuple(self, config):
+        thread_id = self._thread_id(config)
+        if thread_id in self._access:
+            self._touch(thread_id)
+        return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = self._thread_id(config)
+        if thread_id is not None:
+            with self._evict_lock:
+                self._trim_history(thread_id)
+                self._thread_bytes[thread_id] = self._measure(thread_id)
+                self._touch(thread_id)
+                self._evict()
+        return result
+
+
+_checkpoint_pool = None
+
+
+async def create_postgres_checkpointer():
+    """
+    Create a Postgres-backed checkpointer shared by every worker. Its
+    connection pool is closed by close_postgres_checkpointer().
+    """
+    global _checkpoint_pool
+    from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import AsyncConnectionPool
+
+    from db.async_db import _conninfo, ASYNC_DB_POOL_MAX
+    from db.psql_connector import default_config
+
+    pool = AsyncConnectionPool(
+        _conninfo(default_config()),
+        max_size=ASYNC_DB_POOL_MAX,
+        kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+        open=False,
+    )
+    await pool.open()
+    _checkpoint_pool = pool
+    saver = AsyncPostgresSaver(pool)
+    await saver.setup()
+    logger.info("Using Postgres checkpointer")
+    return saver
+
+
+async def close_postgres_checkpointer() -> None:
+    global _checkpoint_pool
+    if _checkpoint_pool is not None:
+        await _checkpoint_pool.close()
+        _checkpoint_pool = None
@@ -1,11 +1,19 @@
 from __future__ import annotations
 import os
-from typing import List, Optional, Sequence, Union, Dict, Any
-from qdrant_client import QdrantClient, models
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple, Union, Dict, Any
+from qdrant_client import QdrantClient, AsyncQdrantClient, models
 import google.generativeai as genai
+import asyncio
+import threading
+import time
 import uuid
+from datetime import date, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, ALL_COMPLETED, wait
 from dotenv import load_dotenv
 from mode import server
+from api.v1.chat.embedding_cache import embedding_cache
+from api.v1.chat.answer_cache import answer_cache
+from api.v1.chat import ingest_manifest
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -14,7 +22,7 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-DEFAULT_DIM = os.getenv("VECTORSTORE_DIM")
+DEFAULT_DIM = int(os.getenv("VECTORSTORE_DIM", "768"))
 DEFAULT_GEMINI_MODEL = os.getenv("DEFAULT_GEMINI_EMBEDDING_MODEL")
 
 if server:
@@ -22,44 +30,399 @@ if server:
 else:
     QDRANT_URL = os.getenv("VECTORSTORE_DEV_URL")
 
+QDRANT_PREFER_GRPC = os.getenv("VECTORSTORE_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("VECTORSTORE_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT = int(os.getenv("VECTORSTORE_TIMEOUT", "30"))
+
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+SEARCH_FANOUT_CONCURRENCY = int(os.getenv("SEARCH_FANOUT_CONCURRENCY", "8"))
+
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "false").lower() == "true"
+SPARSE_MODEL = os.getenv("SPARSE_MODEL", "Qdrant/bm25")
+SPARSE_VECTOR_NAME = "bm25"
+HYBRID_PREFETCH_LIMIT = int(os.getenv("HYBRID_PREFETCH_LIMIT", "20"))
+
+COLLECTION_PROFILE = os.getenv("COLLECTION_PROFILE", "default")
+QUANTIZATION_OVERSAMPLING = float(os.getenv("QUANTIZATION_OVERSAMPLING", "2.0"))
+COLLECTION_DIM_TTL = float(os.getenv("COLLECTION_DIM_TTL", "30"))
+REEMBED_SUFFIX = "__reembed_"
+
+# Storage profiles selectable per domain at creation time:
+#   default  - float32 vectors and HNSW graph in RAM
+#   scalar   - int8 quantized copy in RAM, originals on disk for rescoring (~4x less RAM)
+#   binary   - 1-bit quantized copy in RAM, originals on disk for rescoring (~32x less RAM)
+#   on_disk  - vectors, HNSW graph and payloads on disk (memory-mapped)
+COLLECTION_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "scalar": {"on_disk": True, "quantization": "scalar"},
+    "binary": {"on_disk": True, "quantization": "binary"},
+    "on_disk": {"on_disk": True, "on_disk_payload": True, "hnsw_on_disk": True},
+}
+
+# Quantization params are ignored by Qdrant for collections without quantization
+SEARCH_PARAMS = models.SearchParams(
+    quantization=models.QuantizationSearchParams(
+        rescore=True,
+        oversampling=QUANTIZATION_OVERSAMPLING,
+    )
+)
+
+_client: Optional[QdrantClient] = None
+_async_client: Optional[AsyncQdrantClient] = None
+_client_lock = threading.Lock()
+_known_collections: set = set()
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_FANOUT_CONCURRENCY, thread_name_prefix="qdrant-search")
+_genai_configured = False
+_sparse_collections: Dict[str, bool] = {}
+# collection -> (dimension, time read); re-read from Qdrant after COLLECTION_DIM_TTL
+_collection_dims: Dict[str, Tuple[int, float]] = {}
+_sparse_model = None
+
+def _client_kwargs(url: Optional[str]) -> Dict[str, Any]:
+    if url == ":memory:":
+        return {"location": ":memory:"}
+    return {
+        "url": url,
+        "prefer_grpc": QDRANT_PREFER_GRPC,
+        "grpc_port": QDRANT_GRPC_PORT,
+        "timeout": QDRANT_TIMEOUT,
+    }
+
+def get_client() -> QdrantClient:
+    """Return the process-wide Qdrant client.
+
+    The client keeps its HTTP (or gRPC) connections alive between calls, so
+    every request reuses the same pool instead of reconnecting.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = QdrantClient(**_client_kwargs(QDRANT_URL))
+                logger.info(f"Initialized shared Qdrant client (grpc={QDRANT_PREFER_GRPC})")
+    return _client
+
+def get_async_client() -> AsyncQdrantClient:
+    """Return the process-wide async Qdrant client for FastAPI handlers."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncQdrantClient(**_client_kwargs(QDRANT_URL))
+        logger.info(f"Initialized shared async Qdrant client (grpc={QDRANT_PREFER_GRPC})")
+    return _async_client
+
+async def close_clients() -> None:
+    """Close the shared clients on application shutdown."""
+    global _client, _async_client
+    if _client is not None:
+        _client.close()
+        _client = None
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    _known_collections.clear()
+
+def _alias_target(client: QdrantClient, alias_name: str) -> Optional[str]:
+    """Collection behind an alias, or None when `alias_name` is not an alias."""
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == alias_name:
+            return alias.collection_name
+    return None
+
+def _collection_exists(client: QdrantClient, collection_name: str) -> bool:
+    """
+    Check collection existence once and remember positive answers. A domain
+    that has been re-embedded is an alias for a versioned collection.
+    """
+    if collection_name in _known_collections:
+        return True
+    if client.collection_exists(collection_name) or _alias_target(client, collection_name):
+        _known_collections.add(collection_name)
+        return True
+    return False
+
+async def _aalias_target(client: AsyncQdrantClient, alias_name: str) -> Optional[str]:
+    """Async variant of `_alias_target`."""
+    for alias in (await client.get_aliases()).aliases:
+        if alias.alias_name == alias_name:
+            return alias.collection_name
+    return None
+
+async def _acollection_exists(client: AsyncQdrantClient, collection_name: str) -> bool:
+    """Async variant of `_collection_exists`, aliases included."""
+    if collection_name in _known_collections:
+        return True
+    if await client.collection_exists(collection_name) or await _aalias_target(client, collection_name):
+        _known_collections.add(collection_name)
+        return True
+    return False
+
+def _forget_collection(collection_name: str) -> None:
+    """Drop everything this process has cached about a collection."""
+    _known_collections.discard(collection_name)
+    _sparse_collections.pop(collection_name, None)
+    _indexed_collections.discard(collection_name)
+    _collection_dims.pop(collection_name, None)
+
+def _collection_missing(collection_name: str, exc: Exception) -> bool:
+    """
+    True when `exc` is Qdrant's "not found" for the collection, e.g. because
+    another worker deleted it. The collection is forgotten so the next call
+    takes the missing-collection path instead of failing again.
+    """
+    status = getattr(exc, "status_code", None)
+    if status is None and callable(getattr(exc, "code", None)):  # gRPC
+        status = getattr(exc.code(), "name", None)
+    if status not in (404, "NOT_FOUND"):
+        return False
+    logger.warning(f"Collection '{collection_name}' no longer exists, dropping it from the cache")
+    _forget_collection(collection_name)
+    return True
+
+def _dimension_changed(collection_name: str, exc: Exception) -> bool:
+    """
+    True when Qdrant rejected a query vector of the wrong size, e.g. because
+    another worker re-embedded the collection. The cached dimension is
+    dropped so the query can be embedded again at the new size.
+    """
+    if "dimension" not in str(exc).lower():
+        return False
+    logger.warning(f"Vector size of '{collection_name}' changed, re-reading it")
+    _collection_dims.pop(collection_name, None)
+    return True
+
+def _get_sparse_model():
+    """Lazily load the fastembed BM25 model used for sparse vectors."""
+    global _sparse_model
+    if _sparse_model is None:
+        from fastembed import SparseTextEmbedding
+        _sparse_model = SparseTextEmbedding(model_name=SPARSE_MODEL)
+    return _sparse_model
+
+def _sparse_embed(texts: Sequence[str]) -> List[models.SparseVector]:
+    return [
+        models.SparseVector(indices=e.indices.tolist(), values=e.values.tolist())
+        for e in _get_sparse_model().embed(list(texts))
+    ]
+
+def _sparse_embed_query(query_text: str) -> models.SparseVector:
+    [e] = list(_get_sparse_model().query_embed(query_text))
+    return models.SparseVector(indices=e.indices.tolist(), values=e.values.tolist())
+
+def _has_sparse(client: QdrantClient, collection_name: str) -> bool:
+    """Whether a collection was created with BM25 sparse vectors."""
+    if collection_name not in _sparse_collections:
+        params = client.get_collection(collection_name).config.params
+        _sparse_collections[collection_name] = bool(
+            params.sparse_vectors and SPARSE_VECTOR_NAME in params.sparse_vectors
+        )
+    return _sparse_collections[collection_name]
+
+PAYLOAD_INDEXES = {
+    "domain": models.PayloadSchemaType.KEYWORD,
+    "source": models.PayloadSchemaType.KEYWORD,
+    "doc_type": models.PayloadSchemaType.KEYWORD,
+    "content_type": models.PayloadSchemaType.KEYWORD,
+    "date": models.PayloadSchemaType.DATETIME,
+}
+_indexed_collections: set = set()
+
+def ensure_payload_indexes(client: QdrantClient, collection_name: str) -> None:
+    """Create the payload indexes used by filtered search (idempotent)."""
+    if collection_name in _indexed_collections:
+        return
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=schema,
+        )
+    _indexed_collections.add(collection_name)
+
+def _start_of_day(value: Union[date, str], days: int = 0) -> datetime:
+    """Midnight of a date (or ISO date string), optionally `days` later."""
+    if isinstance(value, datetime):
+        value = value.date()
+    elif not isinstance(value, date):
+        value = date.fromisoformat(str(value)[:10])
+    return datetime.combine(value + timedelta(days=days), datetime.min.time())
+
+def build_filter(filters: Optional[Dict[str, Any]]) -> Optional[models.Filter]:
+    """
+    Translate API filters into a Qdrant filter.
+
+    Supported keys: `source`, `doc_type` and `content_type` ("text" or
+    "table", where a missing content_type counts as "text"), each a value
+    or a list of values,
+    and `date_from` / `date_to` (dates or ISO date strings, inclusive).
+    `date_to` covers its whole day, so the range ends before midnight of
+    the following day.
+    """
+    if not filters:
+        return None
+
+    must = []
+    for key in ("source", "doc_type", "content_type"):
+        value = filters.get(key)
+        if not value:
+            continue
+        values = value if isinstance(value, (list, tuple)) else [value]
+        condition = models.FieldCondition(key=key, match=models.MatchAny(any=list(values)))
+        if key == "content_type" and "text" in values:
+            # Points ingested before content_type existed are all text
+            condition = models.Filter(should=[
+                condition,
+                models.IsEmptyCondition(is_empty=models.PayloadField(key=key)),
+            ])
+        must.append(condition)
+
+    date_from, date_to = filters.get("date_from"), filters.get("date_to")
+    if date_from or date_to:
+        must.append(models.FieldCondition(
+            key="date",
+            range=models.DatetimeRange(
+                gte=_start_of_day(date_from) if date_from else None,
+                lt=_start_of_day(date_to, days=1) if date_to else None,
+            ),
+        ))
+
+    return models.Filter(must=must) if must else None
+
 def get_collection_name(domain: str) -> str:
     """Generate collection name based on domain."""
     return f"{domain.lower().replace(' ', '_')}"
 
-def create_collection(domain: str, size: int = DEFAULT_DIM) -> str:
+def get_collection_dim(collection_name: str) -> Optional[int]:
+    """
+    Dense vector size of a collection, which fixes its embedding
+    dimensionality. It is read from Qdrant and reused for
+    COLLECTION_DIM_TTL seconds, so a re-embed done by another worker is
+    picked up without a restart.
+    """
+    cached = _collection_dims.get(collection_name)
+    if cached is not None and time.monotonic() - cached[1] < COLLECTION_DIM_TTL:
+        return cached[0]
+    client = get_client()
+    if not _collection_exists(client, collection_name):
+        return None
+    try:
+        vectors = client.get_collection(collection_name).config.params.vectors
+    except Exception as e:
+        if _collection_missing(collection_name, e):
+            return None
+        raise
+    if isinstance(vectors, dict):
+        vectors = vectors.get("")
+    if vectors is None:
+        return None
+    _collection_dims[collection_name] = (vectors.size, time.monotonic())
+    return vectors.size
+
+def _quantization_config(kind: Optional[str]) -> Optional[models.QuantizationConfig]:
+    if kind == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if kind == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+def create_collection(
+    domain: str,
+    size: Optional[int] = None,
+    hybrid: bool = HYBRID_SEARCH,
+    profile: str = COLLECTION_PROFILE,
+    hnsw_m: Optional[int] = None,
+    hnsw_ef_construct: Optional[int] = None,
+) -> str:
+    """
+    Create the domain's collection. With `hybrid`, a BM25 sparse vector is
+    indexed next to the dense one so hybrid search can be used. `profile`
+    picks one of COLLECTION_PROFILES; `hnsw_m` / `hnsw_ef_construct`
+    override Qdrant's HNSW defaults. `size` is the embedding dimensionality
+    used for everything ingested into and searched in the collection.
+    """
+    if profile not in COLLECTION_PROFILES:
+        raise ValueError(f"Unknown collection profile '{profile}', expected one of {sorted(COLLECTION_PROFILES)}")
+    settings = COLLECTION_PROFILES[profile]
+    size = int(size or DEFAULT_DIM)
+
     collection_name = get_collection_name(domain)
-    client = QdrantClient(url=QDRANT_URL)
+    client = get_client()
 
-    if client.collection_exists(collection_name):
+    if _collection_exists(client, collection_name):
         logger.info("The collection already exists")
         return client.get_collection(collection_name).status
 
+    hnsw_config = None
+    if hnsw_m is not None or hnsw_ef_construct is not None or settings.get("hnsw_on_disk"):
+        hnsw_config = models.HnswConfigDiff(
+            m=hnsw_m,
+            ef_construct=hnsw_ef_construct,
+            on_disk=settings.get("hnsw_on_disk"),
+        )
+
     client.create_collection(
         collection_name=collection_name,
         vectors_config=models.VectorParams(
             size=size,
             distance=models.Distance.COSINE,
+            on_disk=settings.get("on_disk"),
         ),
+        sparse_vectors_config={
+            SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)
+        } if hybrid else None,
+        hnsw_config=hnsw_config,
+        quantization_config=_quantization_config(settings.get("quantization")),
+        on_disk_payload=settings.get("on_disk_payload"),
     )
+    logger.info(f"Created collection '{collection_name}' with profile '{profile}' ({size} dims)")
+    _known_collections.add(collection_name)
+    _collection_dims[collection_name] = (size, time.monotonic())
+    _sparse_collections[collection_name] = hybrid
+    ensure_payload_indexes(client, collection_name)
     return client.get_collection(collection_name).status
 
 def delete_collection(domain: str) -> None:
     collection_name = get_collection_name(domain)
-    client = QdrantClient(url=QDRANT_URL)
+    client = get_client()
+    _forget_collection(collection_name)
+    answer_cache.invalidate(collection_name)
 
-    if client.collection_exists(collection_name):
+    target = _alias_target(client, collection_name)
+    if target is not None:
+        client.update_collection_aliases(change_aliases_operations=[
+            models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=collection_name)),
+        ])
+        client.delete_collection(target)
+        logger.info(f"Collection Deleted ({target})")
+        try:
+            ingest_manifest.delete_manifest(collection_name)
+        except Exception as e:
+            logger.error(f"Failed to clear manifest for '{collection_name}': {e}")
+    elif client.collection_exists(collection_name):
         client.delete_collection(collection_name)
         logger.info("Collection Deleted")
+        try:
+            ingest_manifest.delete_manifest(collection_name)
+        except Exception as e:
+            logger.error(f"Failed to clear manifest for '{collection_name}': {e}")
     else:
         logger.info("The collection already exists")
 
 
 def get_collection(domain: str) -> Dict[str, Any]:
-    if client.collection_exists(domain):
-        """Return full collection info as a dict."""
-        collection_name = get_collection_name(domain)
-        client = QdrantClient(url=QDRANT_URL)
-        info = client.get_collection(collection_name)
+    """Return full collection info as a dict."""
+    collection_name = get_collection_name(domain)
+    client = get_client()
+    if _collection_exists(client, collection_name):
+        try:
+            info = client.get_collection(collection_name)
+        except Exception as e:
+            if _collection_missing(collection_name, e):
+                return None
+            raise
         return info.dict() if hasattr(info, "dict") else info
     else:
         return None
@@ -72,7 +435,7 @@ def get_all_collections() -> List[Dict[str, Any]]:
     FIXED: Properly handle the Qdrant response structure.
     """
     try:
-        client = QdrantClient(url=QDRANT_URL)
+        client = get_client()
         response = client.get_collections()
 
         logger.info(f"Response type: {type(response)}")
@@ -83,6 +446,9 @@ def get_all_collections() -> List[Dict[str, Any]]:
         else:
             collections_list = response if isinstance(response, list) else []
 
+        # Re-embedded domains are aliases for versioned collections
+        aliases = {a.collection_name: a.alias_name for a in client.get_aliases().aliases}
+
         result = []
         for collection in collections_list:
             if hasattr(collection, 'name'):
@@ -92,6 +458,11 @@ def get_all_collections() -> List[Dict[str, Any]]:
             else:
                 name = str(collection)
 
+            if name in aliases:
+                name = aliases[name]
+            elif REEMBED_SUFFIX in name:
+                continue  # unfinished re-embed
+
             result.append({
                 "domain": name,
                 "collection_name": name
@@ -104,38 +475,98 @@ def get_all_collections() -> List[Dict[str, Any]]:
         logger.error(f"Error in get_all_collections: {str(e)}", exc_info=True)
         return []
 
-def get_all_points(
+PointId = Union[int, str]
+
+def parse_point_cursor(cursor: Optional[str]) -> Optional[PointId]:
+    """
+    Turn a cursor string from the API back into a Qdrant scroll offset.
+    Raises ValueError when it is neither an unsigned integer nor a UUID.
+    """
+    if not cursor:
+        return None
+    if cursor.isdigit():
+        return int(cursor)
+    return str(uuid.UUID(cursor))
+
+def _payload_selector(fields: Optional[Sequence[str]]) -> Union[bool, models.PayloadSelectorInclude]:
+    """None returns the whole payload, an empty list none of it, otherwise only `fields`."""
+    if fields is None:
+        return True
+    if not fields:
+        return False
+    return models.PayloadSelectorInclude(include=list(fields))
+
+def iter_points(
     domain: str,
-    limit: int = 100,
+    batch_size: int = 100,
     with_payload: bool = True,
     with_vectors: bool = False,
-) -> List[Dict[str, Any]]:
-
+    fields: Optional[Sequence[str]] = None,
+    offset: Optional[PointId] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield a domain's points one scroll page at a time."""
     collection_name = get_collection_name(domain)
-    client = QdrantClient(url=QDRANT_URL)
+    client = get_client()
+    if not _collection_exists(client, collection_name):
+        return
 
-    all_points: List[Dict[str, Any]] = []
-    offset: Optional[str] = None
-
-    if client.collection_exists(collection_name):
-        while True:
-            scroll_result = client.scroll(
+    payload = _payload_selector(fields) if with_payload else False
+    while True:
+        try:
+            points, offset = client.scroll(
                 collection_name=collection_name,
-                limit=limit,
+                limit=batch_size,
                 offset=offset,
-                with_payload=with_payload,
+                with_payload=payload,
                 with_vectors=with_vectors,
             )
+        except Exception as e:
+            if _collection_missing(collection_name, e):
+                return
+            raise
+        for p in points:
+            yield p.dict() if hasattr(p, "dict") else p
+        if offset is None:  # no more points
+            return
+
+def get_all_points(
+    domain: str,
+    limit: int = 100,
+    with_payload: bool = True,
+    with_vectors: bool = False,
+) -> List[Dict[str, Any]]:
+    return list(iter_points(domain, batch_size=limit, with_payload=with_payload, with_vectors=with_vectors))
 
-            points, offset = scroll_result
-            for p in points:
-                d = p.dict() if hasattr(p, "dict") else p
-                all_points.append(d)
+async def ascroll_points(
+    domain: str,
+    limit: int = 100,
+    offset: Optional[PointId] = None,
+    fields: Optional[Sequence[str]] = None,
+    with_vectors: bool = False,
+) -> Tuple[List[Dict[str, Any]], Optional[PointId]]:
+    """
+    One scroll page of a domain's points and the offset of the next page
+    (None on the last page), via the shared async client.
+    """
+    collection_name = get_collection_name(domain)
+    client = get_async_client()
 
-            if offset is None:  # no more points
-                break
+    if not await _acollection_exists(client, collection_name):
+        return [], None
 
-    return all_points
+    try:
+        points, next_offset = await client.scroll(
+            collection_name=collection_name,
+            limit=limit,
+            offset=offset,
+            with_payload=_payload_selector(fields),
+            with_vectors=with_vectors,
+        )
+    except Exception as e:
+        if _collection_missing(collection_name, e):
+            return [], None
+        raise
+    return [p.dict() if hasattr(p, "dict") else p for p in points], next_offset
 
 def _embed_texts(
     texts: Sequence[str],
@@ -143,10 +574,13 @@ def _embed_texts(
     output_dimensionality: Optional[int] = None,
 ) -> List[List[float]]:
 
+    global _genai_configured
     if not GOOGLE_API_KEY:
         raise RuntimeError("GOOGLE_API_KEY is not set in the environment.")
 
-    genai.configure(api_key=GOOGLE_API_KEY)
+    if not _genai_configured:
+        genai.configure(api_key=GOOGLE_API_KEY)
+        _genai_configured = True
 
     kwargs = {}
     if output_dimensionality is not None:
@@ -164,6 +598,99 @@ def _embed_texts(
     else:
         raise RuntimeError(f"Unexpected Gemini embedding response: {resp}")
 
+def embed_query(
+    query_text: str,
+    model: str = DEFAULT_GEMINI_MODEL,
+    output_dimensionality: Optional[int] = None,
+) -> List[float]:
+    """Embed a single query, serving repeated questions from the embedding cache."""
+    key = embedding_cache.make_key(model, query_text, output_dimensionality)
+    cached = embedding_cache.get(key)
+    if cached is not None:
+        return cached
+
+    [qvec] = _embed_texts(
+        [query_text], model=model, output_dimensionality=output_dimensionality
+    )
+    embedding_cache.set(key, qvec)
+    return qvec
+
+def embed_domain_query(query_text: str, domain: str, model: str = DEFAULT_GEMINI_MODEL) -> List[float]:
+    """Embed a query at the dimensionality of the domain's collection."""
+    dim = get_collection_dim(get_collection_name(domain)) or DEFAULT_DIM
+    return embed_query(query_text, model=model, output_dimensionality=dim)
+
+def _embed_for_domains(
+    query_text: str,
+    domains: Sequence[str],
+    model: str = DEFAULT_GEMINI_MODEL,
+    output_dimensionality: Optional[int] = None,
+) -> Dict[str, List[float]]:
+    """Query vector per existing domain, embedding once per distinct dimensionality."""
+    by_dim: Dict[int, List[float]] = {}
+    qvecs = {}
+    for domain in domains:
+        dim = output_dimensionality or get_collection_dim(get_collection_name(domain))
+        if dim is None:
+            continue
+        if dim not in by_dim:
+            by_dim[dim] = embed_query(query_text, model=model, output_dimensionality=dim)
+        qvecs[domain] = by_dim[dim]
+    return qvecs
+
+
+
+class _AdaptiveBackoff:
+    """Shared delay between embedding calls that grows on 429s and decays on success."""
+
+    def __init__(self, initial: float = 1.0, maximum: float = 60.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.delay = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+
+    def throttle(self) -> None:
+        with self._lock:
+            self.delay = min(max(self.delay * 2, self.initial), self.maximum)
+
+    def relax(self) -> None:
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay > 0.1 else 0.0
+
+
+def _is_rate_limited(exc: Exception) -> bool:
+    try:
+        from google.api_core.exceptions import ResourceExhausted, TooManyRequests
+        if isinstance(exc, (ResourceExhausted, TooManyRequests)):
+            return True
+    except ImportError:
+        pass
+    return "429" in str(exc) or "quota" in str(exc).lower()
+
+
+def _embed_batch(
+    batch: Sequence[str],
+    backoff: _AdaptiveBackoff,
+    model: str = DEFAULT_GEMINI_MODEL,
+    output_dimensionality: Optional[int] = None,
+) -> tuple:
+    """Embed one batch, retrying with the shared backoff when rate limited."""
+    for attempt in range(EMBED_MAX_RETRIES):
+        backoff.wait()
+        start = time.perf_counter()
+        try:
+            vectors = _embed_texts(batch, model=model, output_dimensionality=output_dimensionality)
+            backoff.relax()
+            return vectors, time.perf_counter() - start
+        except Exception as e:
+            if not _is_rate_limited(e) or attempt == EMBED_MAX_RETRIES - 1:
+                raise
+            backoff.throttle()
+            logger.warning(f"Embedding rate limited, backing off {backoff.delay:.1f}s (attempt {attempt + 1})")
 
 
 def add_texts(
@@ -172,35 +699,134 @@ def add_texts(
     ids: Optional[Sequence[Union[int, str]]] = None,
     *,
     domain: str,
+    source: Optional[str] = None,
+    batch_size: int = EMBED_BATCH_SIZE,
+    concurrency: int = EMBED_CONCURRENCY,
 ) -> Dict[str, Any]:
+    """
+    Embed and upsert texts in batches.
+
+    Batches are embedded concurrently by a bounded worker pool and each batch
+    is upserted as soon as its embeddings arrive, so only a few batches are
+    held in memory at a time. Returns throughput and per-stage timing.
+
+    When `source` is given, point IDs are derived from the source and chunk
+    content. Only chunks missing from the source's manifest are embedded, and
+    chunks that are no longer present are deleted.
+    """
     collection_name = get_collection_name(domain)
-    client = QdrantClient(url=QDRANT_URL)
+    client = get_client()
     
-    if not client.collection_exists(collection_name):
+    if not _collection_exists(client, collection_name):
         create_collection(domain=domain)
 
-    metadatas = [{"page_content":text, "domain":domain} for text in texts]
+    ensure_payload_indexes(client, collection_name)
+    dim = get_collection_dim(collection_name)
+
+    if metadatas is not None and len(metadatas) != len(texts):
+        raise ValueError("texts, metadatas, and ids must have the same length")
 
-    if ids is None:
+    plan = None
+    if source is not None:
+        plan = ingest_manifest.plan_source_sync(collection_name, source, texts)
+        if metadatas is not None:
+            metadatas = [metadatas[pos] for pos, _ in plan["to_embed"]]
+        texts = [texts[pos] for pos, _ in plan["to_embed"]]
+        ids = [point_id for _, point_id in plan["to_embed"]]
+    elif ids is None:
         ids = [str(uuid.uuid4()) for _ in texts]
 
-    if not (len(texts) == len(metadatas) == len(ids)):
-        raise ValueError("texts, metadatas, and ids must have the same length")
+    if len(texts) != len(ids):
+        raise ValueError("texts and ids must have the same length")
 
-    vectors = _embed_texts(
-        texts=texts
-    )
+    stats = {
+        "status": "completed",
+        "chunks": 0,
+        "batches": 0,
+        "embed_seconds": 0.0,
+        "upsert_seconds": 0.0,
+    }
+    backoff = _AdaptiveBackoff()
+    started = time.perf_counter()
 
-    points = [
-        models.PointStruct(
-            id=pid,
-            vector=vec,
-            payload=meta,
-        )
-        for pid, vec, meta in zip(ids, vectors, metadatas)
-    ]
-    result = client.upsert(collection_name=collection_name, points=points)
-    return result.dict() if hasattr(result, "dict") else result
+    def _payload(position: int) -> Dict[str, Any]:
+        payload = {}
+        if metadatas is not None:
+            payload.update({k: v for k, v in metadatas[position].items() if v is not None})
+        payload.update({"page_content": texts[position], "domain": domain})
+        if source is not None:
+            payload["source"] = source
+        return payload
+
+    hybrid = _has_sparse(client, collection_name)
+
+    def upsert_batch(offset: int, vectors: List[List[float]]) -> None:
+        if hybrid:
+            sparse = _sparse_embed(texts[offset:offset + len(vectors)])
+            vectors = [{"": vec, SPARSE_VECTOR_NAME: sv} for vec, sv in zip(vectors, sparse)]
+        points = [
+            models.PointStruct(
+                id=ids[offset + i],
+                vector=vec,
+                payload=_payload(offset + i),
+            )
+            for i, vec in enumerate(vectors)
+        ]
+        upsert_start = time.perf_counter()
+        try:
+            client.upsert(collection_name=collection_name, points=points)
+        except Exception as e:
+            _collection_missing(collection_name, e)
+            raise
+        stats["upsert_seconds"] += time.perf_counter() - upsert_start
+        stats["chunks"] += len(points)
+        stats["batches"] += 1
+
+    def drain(pending: Dict[Any, int], return_when) -> None:
+        done, _ = wait(list(pending), return_when=return_when)
+        for future in done:
+            offset = pending.pop(future)
+            vectors, embed_seconds = future.result()
+            stats["embed_seconds"] += embed_seconds
+            upsert_batch(offset, vectors)
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        pending: Dict[Any, int] = {}
+        for offset in range(0, len(texts), batch_size):
+            if len(pending) >= concurrency * 2:
+                drain(pending, FIRST_COMPLETED)
+            batch = texts[offset:offset + batch_size]
+            pending[pool.submit(_embed_batch, batch, backoff, output_dimensionality=dim)] = offset
+        if pending:
+            drain(pending, ALL_COMPLETED)
+
+    if plan is not None:
+        if plan["stale"]:
+            client.delete(
+                collection_name=collection_name,
+                points_selector=models.PointIdsList(points=plan["stale"]),
+            )
+        try:
+            ingest_manifest.replace_manifest(collection_name, source, plan["entries"])
+        except Exception as e:
+            logger.error(f"Failed to update manifest for '{source}': {e}")
+        stats["skipped"] = len(plan["entries"]) - len(plan["to_embed"])
+        stats["deleted"] = len(plan["stale"])
+
+    if stats["chunks"] or stats.get("deleted"):
+        answer_cache.invalidate(collection_name)
+
+    elapsed = time.perf_counter() - started
+    stats["total_seconds"] = round(elapsed, 3)
+    stats["embed_seconds"] = round(stats["embed_seconds"], 3)
+    stats["upsert_seconds"] = round(stats["upsert_seconds"], 3)
+    stats["chunks_per_second"] = round(stats["chunks"] / elapsed, 2) if elapsed else 0.0
+
+    logger.info(
+        f"Ingested {stats['chunks']} chunks into '{collection_name}' in {stats['batches']} batches: "
+        f"{stats['chunks_per_second']} chunks/s (embed {stats['embed_seconds']}s, upsert {stats['upsert_seconds']}s)"
+    )
+    return stats
 
 
 def search_similar(
@@ -211,23 +837,142 @@ def search_similar(
     model: str = DEFAULT_GEMINI_MODEL,
     output_dimensionality: Optional[int] = None,
     with_payload: bool = True,
+    score_threshold: Optional[float] = None,
+    filters: Optional[Dict[str, Any]] = None,
 ) -> List[Dict[str, Any]]:
     collection_name = get_collection_name(domain)
-    client = QdrantClient(url=QDRANT_URL)
+    client = get_client()
     
-    if not client.collection_exists(collection_name):
+    if not _collection_exists(client, collection_name):
         return []
 
-    [qvec] = _embed_texts(
-        [query_text], model=model, output_dimensionality=output_dimensionality
-    )
+    for attempt in range(2):
+        qvec = embed_query(
+            query_text, model=model,
+            output_dimensionality=output_dimensionality or get_collection_dim(collection_name),
+        )
+        try:
+            hits = client.search(
+                collection_name=collection_name,
+                query_vector=qvec,
+                limit=limit,
+                search_params=SEARCH_PARAMS,
+                with_payload=with_payload,
+                score_threshold=score_threshold,
+                query_filter=build_filter(filters),
+            )
+            break
+        except Exception as e:
+            if _collection_missing(collection_name, e):
+                return []
+            if attempt or output_dimensionality or not _dimension_changed(collection_name, e):
+                raise
 
-    hits = client.search(
-        collection_name=collection_name,
-        query_vector=qvec,
-        limit=limit,
-        with_payload=with_payload,
-    )
+    out = []
+    for h in hits:
+        d = h.dict() if hasattr(h, "dict") else h
+        out.append(d)
+    return out
+
+def search_hybrid(
+    query_text: str,
+    limit: int = 5,
+    *,
+    domain: str,
+    model: str = DEFAULT_GEMINI_MODEL,
+    output_dimensionality: Optional[int] = None,
+    with_payload: bool = True,
+    prefetch_limit: int = HYBRID_PREFETCH_LIMIT,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Dense + BM25 search fused with reciprocal-rank fusion in a single Qdrant
+    query. Collections without sparse vectors fall back to dense search.
+    """
+    collection_name = get_collection_name(domain)
+    client = get_client()
+
+    if not _collection_exists(client, collection_name):
+        return []
+    try:
+        hybrid = _has_sparse(client, collection_name)
+    except Exception as e:
+        if _collection_missing(collection_name, e):
+            return []
+        raise
+    if not hybrid:
+        return search_similar(
+            query_text, limit, domain=domain, model=model,
+            output_dimensionality=output_dimensionality, with_payload=with_payload,
+            filters=filters,
+        )
+
+    query_filter = build_filter(filters)
+    for attempt in range(2):
+        qvec = embed_query(
+            query_text, model=model,
+            output_dimensionality=output_dimensionality or get_collection_dim(collection_name),
+        )
+        try:
+            response = client.query_points(
+                collection_name=collection_name,
+                prefetch=[
+                    models.Prefetch(query=qvec, limit=prefetch_limit, filter=query_filter, params=SEARCH_PARAMS),
+                    models.Prefetch(query=_sparse_embed_query(query_text), using=SPARSE_VECTOR_NAME, limit=prefetch_limit, filter=query_filter),
+                ],
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
+                limit=limit,
+                with_payload=with_payload,
+            )
+            break
+        except Exception as e:
+            if _collection_missing(collection_name, e):
+                return []
+            if attempt or output_dimensionality or not _dimension_changed(collection_name, e):
+                raise
+
+    out = []
+    for h in response.points:
+        d = h.dict() if hasattr(h, "dict") else h
+        out.append(d)
+    return out
+
+async def asearch_similar(
+    query_text: str,
+    limit: int = 5,
+    *,
+    domain: str,
+    model: str = DEFAULT_GEMINI_MODEL,
+    output_dimensionality: Optional[int] = None,
+    with_payload: bool = True,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Async variant of `search_similar` backed by the shared async client."""
+    collection_name = get_collection_name(domain)
+    client = get_async_client()
+
+    if not await _acollection_exists(client, collection_name):
+        return []
+
+    for attempt in range(2):
+        # get_collection_dim may ask Qdrant, keep it off the event loop
+        dimension = output_dimensionality or await asyncio.to_thread(get_collection_dim, collection_name)
+        qvec = await asyncio.to_thread(embed_query, query_text, model=model, output_dimensionality=dimension)
+        try:
+            hits = await client.search(
+                collection_name=collection_name,
+                query_vector=qvec,
+                limit=limit,
+                search_params=SEARCH_PARAMS,
+                with_payload=with_payload,
+                query_filter=build_filter(filters),
+            )
+            break
+        except Exception as e:
+            if _collection_missing(collection_name, e):
+                return []
+            if attempt or output_dimensionality or not _dimension_changed(collection_name, e):
+                raise
 
     out = []
     for h in hits:
@@ -235,37 +980,360 @@ def search_similar(
         out.append(d)
     return out
 
+def _search_vector(
+    domain: str,
+    qvec: List[float],
+    limit: int,
+    score_threshold: Optional[float],
+    with_payload: bool = True,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    collection_name = get_collection_name(domain)
+    client = get_client()
+    if not _collection_exists(client, collection_name):
+        return []
+    try:
+        hits = client.search(
+            collection_name=collection_name,
+            query_vector=qvec,
+            limit=limit,
+            search_params=SEARCH_PARAMS,
+            with_payload=with_payload,
+            score_threshold=score_threshold,
+            query_filter=build_filter(filters),
+        )
+    except Exception as e:
+        if _collection_missing(collection_name, e):
+            return []
+        _dimension_changed(collection_name, e)
+        raise
+    return [h.dict() if hasattr(h, "dict") else h for h in hits]
+
 def search_across_domains(
     query_text: str,
     domains: List[str],
     limit_per_domain: int = 5,
     score_threshold: Optional[float] = None,
+    model: str = DEFAULT_GEMINI_MODEL,
+    output_dimensionality: Optional[int] = None,
+    filters: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, List[Dict[str, Any]]]:
-    """Search across multiple domains and return results grouped by domain."""
+    """
+    Search across multiple domains and return results grouped by domain.
+
+    The query is embedded once per distinct collection dimensionality and
+    the per-collection searches run concurrently, with the score threshold
+    applied by Qdrant.
+    """
+    qvecs = _embed_for_domains(query_text, domains, model=model, output_dimensionality=output_dimensionality)
+
+    futures = {
+        domain: _search_pool.submit(_search_vector, domain, qvec, limit_per_domain, score_threshold, True, filters)
+        for domain, qvec in qvecs.items()
+    }
+
     results = {}
-    
-    for domain in domains:
-        domain_results = search_similar(
-            query_text=query_text,
-            domain=domain,
-            limit=limit_per_domain,
-            score_threshold=score_threshold
-        )
+    for domain, future in futures.items():
+        try:
+            domain_results = future.result()
+        except Exception as e:
+            logger.error(f"Search failed for domain '{domain}': {e}")
+            continue
         if domain_results:
             results[domain] = domain_results
     
     return results
 
+def merge_domain_results(
+    grouped: Dict[str, List[Dict[str, Any]]],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """
+    Merge per-domain hits into one ranking.
+
+    Raw scores are not comparable across collections (different content
+    and, possibly, embedding dimensionality), so each domain's scores are
+    min-max scaled to [0, 1] on their own. Hits are ranked by that
+    `normalized_score`, with the raw score breaking ties. A domain whose
+    hits all score the same gets 1.0.
+    """
+    pooled = []
+    for domain, hits in grouped.items():
+        if not hits:
+            continue
+        scores = [hit["score"] for hit in hits]
+        low, high = min(scores), max(scores)
+        span = high - low
+        pooled.extend(
+            {**hit, "domain": domain, "normalized_score": (hit["score"] - low) / span if span else 1.0}
+            for hit in hits
+        )
+
+    pooled.sort(key=lambda hit: (hit["normalized_score"], hit["score"]), reverse=True)
+    return pooled[:limit]
+
+def search_domains_merged(
+    query_text: str,
+    domains: List[str],
+    limit: int = 5,
+    score_threshold: Optional[float] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Global top-k across several domains."""
+    grouped = search_across_domains(
+        query_text,
+        domains,
+        limit_per_domain=limit,
+        score_threshold=score_threshold,
+        filters=filters,
+    )
+    return merge_domain_results(grouped, limit)
+
+async def asearch_domains_merged(
+    query_text: str,
+    domains: List[str],
+    limit: int = 5,
+    score_threshold: Optional[float] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Async variant of `search_domains_merged` using the shared async client."""
+    qvecs = await asyncio.to_thread(_embed_for_domains, query_text, domains)
+    client = get_async_client()
+    domains = list(qvecs)
+
+    async def search(domain: str) -> List[Dict[str, Any]]:
+        collection_name = get_collection_name(domain)
+        try:
+            hits = await client.search(
+                collection_name=collection_name,
+                query_vector=qvecs[domain],
+                limit=limit,
+                search_params=SEARCH_PARAMS,
+                with_payload=True,
+                score_threshold=score_threshold,
+                query_filter=build_filter(filters),
+            )
+        except Exception as e:
+            if _collection_missing(collection_name, e):
+                return []
+            _dimension_changed(collection_name, e)
+            raise
+        return [h.dict() if hasattr(h, "dict") else h for h in hits]
+
+    outcomes = await asyncio.gather(*(search(d) for d in domains), return_exceptions=True)
+    grouped = {}
+    for domain, outcome in zip(domains, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(f"Search failed for domain '{domain}': {outcome}")
+        elif outcome:
+            grouped[domain] = outcome
+    return merge_domain_results(grouped, limit)
+
+def _create_like(client: QdrantClient, info: models.CollectionInfo, collection_name: str, size: int) -> None:
+    """Create `collection_name` with the same storage settings as `info` but a new vector size."""
+    params = info.config.params
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=models.VectorParams(
+            size=size,
+            distance=params.vectors.distance,
+            on_disk=params.vectors.on_disk,
+        ),
+        sparse_vectors_config=params.sparse_vectors,
+        hnsw_config=models.HnswConfigDiff(**info.config.hnsw_config.model_dump()),
+        quantization_config=info.config.quantization_config,
+        on_disk_payload=params.on_disk_payload,
+    )
+
+def _point_ids(client: QdrantClient, collection_name: str, batch_size: int = 1000) -> set:
+    ids, offset = set(), None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name, limit=batch_size, offset=offset,
+            with_payload=False, with_vectors=False,
+        )
+        ids.update(p.id for p in points)
+        if offset is None:
+            return ids
+
+def _reembed_points(
+    client: QdrantClient,
+    points: Sequence[models.Record],
+    target: str,
+    dimension: int,
+    hybrid: bool,
+    backoff: _AdaptiveBackoff,
+) -> None:
+    """Embed `points` at `dimension` and upsert them, with their payloads and BM25 vectors, into `target`."""
+    texts = [(p.payload or {}).get("page_content", "") for p in points]
+    vectors, _ = _embed_batch(texts, backoff, output_dimensionality=dimension)
+    if hybrid:
+        vectors = [{"": vec, SPARSE_VECTOR_NAME: p.vector[SPARSE_VECTOR_NAME]} for vec, p in zip(vectors, points)]
+    client.upsert(
+        collection_name=target,
+        points=[models.PointStruct(id=p.id, vector=vec, payload=p.payload) for p, vec in zip(points, vectors)],
+    )
+
+def _catch_up(
+    client: QdrantClient,
+    source: str,
+    target: str,
+    dimension: int,
+    hybrid: bool,
+    backoff: _AdaptiveBackoff,
+    batch_size: int,
+    delete_stale: bool = True,
+) -> int:
+    """
+    Re-embed points written to `source` after the main pass read past them,
+    and, with `delete_stale`, drop points deleted from it meanwhile.
+    Returns the number of points copied.
+    """
+    source_ids = _point_ids(client, source)
+    target_ids = _point_ids(client, target)
+    missing = list(source_ids - target_ids)
+    for start in range(0, len(missing), batch_size):
+        points = client.retrieve(
+            collection_name=source, ids=missing[start:start + batch_size],
+            with_payload=True, with_vectors=[SPARSE_VECTOR_NAME] if hybrid else False,
+        )
+        if points:
+            _reembed_points(client, points, target, dimension, hybrid, backoff)
+    stale = list(target_ids - source_ids)
+    if delete_stale and stale:
+        client.delete(collection_name=target, points_selector=models.PointIdsList(points=stale))
+    return len(missing)
+
+def reembed_collection(
+    domain: str,
+    dimension: int,
+    target: Optional[str] = None,
+    batch_size: int = EMBED_BATCH_SIZE,
+    on_batch: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Re-embed every chunk of a domain at a new dimensionality.
+
+    The new vectors are written to a new versioned collection
+    (`<name>__reembed_<tag>`, with the same storage settings). The live
+    collection keeps serving searches and ingestion in the meantime. Points
+    written or deleted during the re-embed are reconciled, and the domain's
+    name is then switched to the new collection as a Qdrant alias in one
+    atomic alias update. Points that land in the old collection just before
+    the switch are copied over afterwards, and the old collection is
+    dropped last. Point IDs and payloads are preserved, so the ingest
+    manifest stays valid.
+
+    A domain that has never been re-embedded is a plain collection. It has
+    to be deleted before its name can become an alias, so that first
+    switch leaves the name missing for the time between two Qdrant calls.
+
+    Re-running with the same `target` resumes: points already in it are
+    skipped. `on_batch(index, chunks)` is called after each batch of the
+    main pass with the batch's point count, except for batches a previous
+    run already finished.
+    """
+    collection_name = get_collection_name(domain)
+    client = get_client()
+    if not _collection_exists(client, collection_name):
+        raise ValueError(f"Domain '{domain}' not found")
+
+    target = target or f"{collection_name}{REEMBED_SUFFIX}{uuid.uuid4().hex[:8]}"
+    current = _alias_target(client, collection_name)
+    if current == target:
+        logger.info(f"'{collection_name}' already points to '{target}', nothing to do")
+        return {"domain": domain, "collection": target, "chunks": 0, "dimension": dimension}
+    source = current or collection_name
+
+    info = client.get_collection(source)
+    previous = info.config.params.vectors.size
+    hybrid = _has_sparse(client, collection_name)
+    started = time.perf_counter()
+
+    if not client.collection_exists(target):
+        _create_like(client, info, target, dimension)
+    ensure_payload_indexes(client, target)
+
+    backoff = _AdaptiveBackoff()
+    chunks = 0
+    batch = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=source, limit=batch_size, offset=offset,
+            with_payload=True, with_vectors=[SPARSE_VECTOR_NAME] if hybrid else False,
+        )
+        # A resumed run skips what it already re-embedded
+        done = {
+            p.id for p in client.retrieve(
+                collection_name=target, ids=[p.id for p in points], with_payload=False, with_vectors=False,
+            )
+        } if points else set()
+        pending = [p for p in points if p.id not in done]
+        if pending:
+            _reembed_points(client, pending, target, dimension, hybrid, backoff)
+            chunks += len(pending)
+        if on_batch is not None and (pending or not points):
+            on_batch(batch, len(points))
+        batch += 1
+        if offset is None:
+            break
+
+    chunks += _catch_up(client, source, target, dimension, hybrid, backoff, batch_size)
+
+    if current is not None:
+        client.update_collection_aliases(change_aliases_operations=[
+            models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=collection_name)),
+            models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=collection_name)),
+        ])
+        # Writes that reached the old collection before the switch; deletions
+        # can no longer be told apart from writes to the new one
+        chunks += _catch_up(client, source, target, dimension, hybrid, backoff, batch_size, delete_stale=False)
+        client.delete_collection(source)
+    else:
+        client.delete_collection(collection_name)
+        client.update_collection_aliases(change_aliases_operations=[
+            models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=target, alias_name=collection_name)),
+        ])
+
+    _forget_collection(collection_name)
+    answer_cache.invalidate(collection_name)
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Re-embedded {chunks} chunks of '{collection_name}' into '{target}' from {previous} to {dimension} dims in {elapsed:.1f}s")
+    return {
+        "domain": domain,
+        "collection": target,
+        "chunks": chunks,
+        "previous_dimension": previous,
+        "dimension": dimension,
+        "total_seconds": round(elapsed, 3),
+    }
+
+def _describe_quantization(config: Optional[models.QuantizationConfig]) -> Optional[str]:
+    if isinstance(config, models.ScalarQuantization):
+        return "scalar"
+    if isinstance(config, models.BinaryQuantization):
+        return "binary"
+    if isinstance(config, models.ProductQuantization):
+        return "product"
+    return None
+
 def get_domain_stats(domain: str) -> Dict[str, Any]:
     """Get statistics for a specific domain's collection."""
     collection_name = get_collection_name(domain)
-    client = QdrantClient(url=QDRANT_URL)
+    client = get_client()
     
-    if not client.collection_exists(collection_name):
+    if not _collection_exists(client, collection_name):
         return {"exists": False, "domain": domain}
+
+    try:
+        info = client.get_collection(collection_name)
+    except Exception as e:
+        if _collection_missing(collection_name, e):
+            return {"exists": False, "domain": domain}
+        raise
     
-    info = client.get_collection(collection_name)
-    
     return {
         "exists": True,
         "domain": domain,
@@ -273,6 +1341,36 @@ def get_domain_stats(domain: str) -> Dict[str, Any]:
         "points_count": info.points_count,
         "vectors_count": info.vectors_count,
         "status": info.status,
+        "dimension": info.config.params.vectors.size if isinstance(info.config.params.vectors, models.VectorParams) else None,
+        "quantization": _describe_quantization(info.config.quantization_config),
+        "vectors_on_disk": bool(info.config.params.vectors.on_disk) if isinstance(info.config.params.vectors, models.VectorParams) else None,
+    }
+
+async def aget_domain_stats(domain: str) -> Dict[str, Any]:
+    """Async variant of `get_domain_stats` for the FastAPI handlers."""
+    collection_name = get_collection_name(domain)
+    client = get_async_client()
+
+    if not await _acollection_exists(client, collection_name):
+        return {"exists": False, "domain": domain}
+
+    try:
+        info = await client.get_collection(collection_name)
+    except Exception as e:
+        if _collection_missing(collection_name, e):
+            return {"exists": False, "domain": domain}
+        raise
+
+    return {
+        "exists": True,
+        "domain": domain,
+        "collection_name": collection_name,
+        "points_count": info.points_count,
+        "vectors_count": info.vectors_count,
+        "status": info.status,
+        "dimension": info.config.params.vectors.size if isinstance(info.config.params.vectors, models.VectorParams) else None,
+        "quantization": _describe_quantization(info.config.quantization_config),
+        "vectors_on_disk": bool(info.config.params.vectors.on_disk) if isinstance(info.config.params.vectors, models.VectorParams) else None,
     }
 
 
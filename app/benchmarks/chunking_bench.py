@@ -0,0 +1,102 @@
+"""
+Chunking throughput on a synthetic corpus.
+
+Compares the old per-call RecursiveCharacterTextSplitter with the token
+chunking engine, run serially and across the extraction process pool.
+
+Run from the `app` directory:
+
+    python -m benchmarks.chunking_bench --docs 200 --words 5000
+
+The corpus mixes headings, numbered sections and prose so the
+sentence/heading-aware boundaries are exercised.
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from api.v1.chat import chunking
+from api.v1.chat.extraction import extraction_executor
+
+WORDS = (
+    "revenue margin liability asset equity cash flow dividend expense income "
+    "quarter fiscal audit ledger budget forecast variance accrual depreciation "
+    "amortization tax provision segment operating net gross capital reserve"
+).split()
+
+
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(WORDS, k=rng.randint(6, 28))
+    return words[0].capitalize() + " " + " ".join(words[1:]) + rng.choice([".", ".", ".", "!", "?"])
+
+
+def _document(rng: random.Random, words: int) -> str:
+    parts, count, section = [], 0, 1
+    while count < words:
+        parts.append(f"\n\n{section}. {rng.choice(WORDS).capitalize()} {rng.choice(WORDS).capitalize()}\n\n")
+        section += 1
+        for _ in range(rng.randint(2, 6)):
+            paragraph = " ".join(_sentence(rng) for _ in range(rng.randint(3, 10)))
+            count += len(paragraph.split())
+            parts.append(paragraph + "\n\n")
+    return "".join(parts)
+
+
+def _report(name, docs, seconds, chunks):
+    sizes = chunking.token_counts([c for doc in chunks for c in doc])
+    megabytes = sum(len(d) for d in docs) / 1024 / 1024
+    print(
+        f"{name:<18} {len(docs) / seconds:8.1f} docs/s {megabytes / seconds:6.2f} MB/s "
+        f"chunks={len(sizes)} tokens/chunk mean={statistics.mean(sizes):.0f} max={max(sizes)}"
+    )
+
+
+async def _pooled(docs, chunk_size, chunk_overlap):
+    # A few batches per worker, so one long document does not leave the others idle
+    batch_count = min(len(docs), extraction_executor.workers * 4)
+    bounds = [len(docs) * i // batch_count for i in range(batch_count + 1)]
+    batches = await asyncio.gather(*(
+        extraction_executor.run(chunking.chunk_batch, docs[start:end], chunk_size, chunk_overlap)
+        for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+    ))
+    return [[c["text"] for c in chunks] for batch in batches for chunks in batch]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--words", type=int, default=5000)
+    parser.add_argument("--chunk-tokens", type=int, default=chunking.CHUNK_TOKENS)
+    parser.add_argument("--overlap-tokens", type=int, default=chunking.CHUNK_OVERLAP_TOKENS)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    docs = [_document(rng, args.words) for _ in range(args.docs)]
+    chunking.token_counts(["warm up the tokenizer"])
+
+    start = time.perf_counter()
+    baseline = [
+        RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, length_function=len).split_text(doc)
+        for doc in docs
+    ]
+    _report("recursive (chars)", docs, time.perf_counter() - start, baseline)
+
+    start = time.perf_counter()
+    serial = [chunking.chunk_text(doc, args.chunk_tokens, args.overlap_tokens) for doc in docs]
+    _report("engine serial", docs, time.perf_counter() - start, serial)
+
+    # Start the workers before timing so the pool's spawn cost is excluded
+    asyncio.run(_pooled(docs[:extraction_executor.workers], args.chunk_tokens, args.overlap_tokens))
+    start = time.perf_counter()
+    pooled = asyncio.run(_pooled(docs, args.chunk_tokens, args.overlap_tokens))
+    _report(f"engine pool x{extraction_executor.workers}", docs, time.perf_counter() - start, pooled)
+
+    extraction_executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
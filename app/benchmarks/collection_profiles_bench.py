@@ -0,0 +1,125 @@
+"""
+Memory footprint, recall@k and latency for each collection profile.
+
+Run from the `app` directory against a Qdrant server (the in-process
+":memory:" mode ignores HNSW and quantization settings):
+
+    python -m benchmarks.collection_profiles_bench --url http://localhost:6333
+    python -m benchmarks.collection_profiles_bench --profiles default scalar --points 50000
+
+Every profile is seeded with the same Gaussian vectors. Recall is measured
+against exact (brute-force) search on the full-precision vectors. Memory
+is an estimate of what each profile keeps resident in RAM: vectors,
+quantized vectors and the HNSW graph.
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+from qdrant_client import models
+
+from api.v1.chat import vectorstore
+
+DOMAIN_PREFIX = "bench_profile_"
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": samples[len(samples) // 2] * 1000,
+        "p95": samples[int(len(samples) * 0.95) - 1] * 1000,
+        "mean": statistics.mean(samples) * 1000,
+    }
+
+
+def _estimated_ram_mb(profile: str, points: int, dim: int, m: int) -> float:
+    settings = vectorstore.COLLECTION_PROFILES[profile]
+    ram = 0 if settings.get("on_disk") else points * dim * 4
+    if settings.get("quantization") == "scalar":
+        ram += points * dim
+    elif settings.get("quantization") == "binary":
+        ram += points * dim / 8
+    if not settings.get("hnsw_on_disk"):
+        # Level-0 links dominate: 2 * m neighbours of 4 bytes per point
+        ram += points * m * 2 * 4
+    return ram / 1024 / 1024
+
+
+def _seed(client, domain: str, profile: str, vectors: np.ndarray, m: int, ef_construct: int) -> str:
+    collection = vectorstore.get_collection_name(domain)
+    if client.collection_exists(collection):
+        client.delete_collection(collection)
+    vectorstore._forget_collection(collection)
+    vectorstore.create_collection(
+        domain, size=vectors.shape[1], hybrid=False, profile=profile,
+        hnsw_m=m, hnsw_ef_construct=ef_construct,
+    )
+    for offset in range(0, len(vectors), 1000):
+        batch = vectors[offset:offset + 1000]
+        client.upsert(
+            collection_name=collection,
+            points=models.Batch(ids=list(range(offset, offset + len(batch))), vectors=batch.tolist()),
+            wait=True,
+        )
+    while client.get_collection(collection).status != models.CollectionStatus.GREEN:
+        time.sleep(0.5)
+    return collection
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=vectorstore.QDRANT_URL or ":memory:")
+    parser.add_argument("--profiles", nargs="+", default=list(vectorstore.COLLECTION_PROFILES))
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construct", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.url == ":memory:":
+        print("warning: local mode ignores HNSW/quantization, numbers are not representative")
+
+    vectorstore.QDRANT_URL = args.url
+    client = vectorstore.get_client()
+    rng = np.random.default_rng(42)
+    vectors = rng.standard_normal((args.points, args.dim), dtype=np.float32)
+    queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32).tolist()
+
+    truth = None
+    for profile in args.profiles:
+        domain = f"{DOMAIN_PREFIX}{profile}"
+        collection = _seed(client, domain, profile, vectors, args.m, args.ef_construct)
+
+        if truth is None:
+            truth = [
+                {h.id for h in client.search(
+                    collection_name=collection, query_vector=q, limit=args.k,
+                    search_params=models.SearchParams(
+                        exact=True, quantization=models.QuantizationSearchParams(ignore=True)
+                    ),
+                )}
+                for q in queries
+            ]
+
+        samples, recalls = [], []
+        for qvec, expected in zip(queries, truth):
+            start = time.perf_counter()
+            hits = vectorstore._search_vector(domain, qvec, args.k, None, with_payload=False)
+            samples.append(time.perf_counter() - start)
+            recalls.append(len({h["id"] for h in hits} & expected) / args.k)
+
+        stats = _percentiles(samples)
+        ram = _estimated_ram_mb(profile, args.points, args.dim, args.m)
+        print(
+            f"{profile:<8} ram~{ram:8.1f}MB recall@{args.k}={statistics.mean(recalls):.3f} "
+            f"p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms mean={stats['mean']:.2f}ms"
+        )
+        client.delete_collection(collection)
+        vectorstore._forget_collection(collection)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Offline recall@k and latency for dense vs hybrid (dense + BM25, RRF) retrieval.
+
+Run from the `app` directory against a collection created with hybrid
+enabled:
+
+    python -m benchmarks.retrieval_bench --domain finance --queries queries.jsonl --k 5
+
+`queries.jsonl` holds one labelled query per line:
+
+    {"query": "What is form 27B used for?", "relevant": ["<point id>", ...]}
+
+`relevant` may also contain text snippets; a hit counts as relevant when
+its id matches or its page_content contains the snippet.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from api.v1.chat import vectorstore
+
+
+def _is_relevant(hit, relevant):
+    content = (hit.get("payload") or {}).get("page_content", "")
+    return any(str(hit["id"]) == r or (r and r in content) for r in relevant)
+
+
+def _evaluate(search, domain, labelled, k):
+    recalls, latencies = [], []
+    for item in labelled:
+        # Warm the embedding cache so both modes are compared on retrieval only
+        vectorstore.embed_domain_query(item["query"], domain)
+        start = time.perf_counter()
+        hits = search(item["query"], k, domain=domain)
+        latencies.append(time.perf_counter() - start)
+
+        relevant = item["relevant"]
+        found = sum(1 for r in relevant if any(_is_relevant(h, [r]) for h in hits))
+        recalls.append(found / len(relevant) if relevant else 0.0)
+
+    latencies.sort()
+    return {
+        "recall": statistics.mean(recalls),
+        "p50": latencies[len(latencies) // 2] * 1000,
+        "p95": latencies[max(0, int(len(latencies) * 0.95) - 1)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--domain", required=True)
+    parser.add_argument("--queries", required=True)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.queries) as f:
+        labelled = [json.loads(line) for line in f if line.strip()]
+
+    for name, search in (("dense", vectorstore.search_similar), ("hybrid", vectorstore.search_hybrid)):
+        stats = _evaluate(search, args.domain, labelled, args.k)
+        print(f"{name:<7} recall@{args.k}={stats['recall']:.3f} p50={stats['p50']:.1f}ms p95={stats['p95']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Per-query latency of a fresh Qdrant client per call vs the shared client.
+
+Run from the `app` directory:
+
+    python -m benchmarks.vectorstore_bench --url http://localhost:6333
+    python -m benchmarks.vectorstore_bench --url :memory:
+
+Query vectors are random so the numbers measure Qdrant access only, not
+Gemini embedding latency.
+"""
+import argparse
+import random
+import statistics
+import time
+
+from qdrant_client import QdrantClient, models
+
+from api.v1.chat import vectorstore
+
+COLLECTION = "bench_vectorstore"
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {
+        "p50": samples[len(samples) // 2] * 1000,
+        "p95": samples[int(len(samples) * 0.95) - 1] * 1000,
+        "mean": statistics.mean(samples) * 1000,
+    }
+
+
+def _seed(client: QdrantClient, dim: int, points: int) -> None:
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+    client.create_collection(
+        collection_name=COLLECTION,
+        vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+    )
+    client.upsert(
+        collection_name=COLLECTION,
+        points=[
+            models.PointStruct(id=i, vector=[random.random() for _ in range(dim)], payload={"page_content": f"doc {i}"})
+            for i in range(points)
+        ],
+    )
+
+
+def _per_call_client(url: str, qvec) -> None:
+    # Mirrors the old behaviour: new client plus an existence check per query.
+    client = QdrantClient(url=url)
+    if client.collection_exists(COLLECTION):
+        client.search(collection_name=COLLECTION, query_vector=qvec, limit=5)
+
+
+def _shared_client(qvec) -> None:
+    client = vectorstore.get_client()
+    if vectorstore._collection_exists(client, COLLECTION):
+        client.search(collection_name=COLLECTION, query_vector=qvec, limit=5)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=vectorstore.QDRANT_URL or ":memory:")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--points", type=int, default=1000)
+    args = parser.parse_args()
+
+    vectorstore.QDRANT_URL = args.url
+    client = vectorstore.get_client()
+    _seed(client, args.dim, args.points)
+    queries = [[random.random() for _ in range(args.dim)] for _ in range(args.queries)]
+
+    results = {}
+    if args.url != ":memory:":
+        samples = []
+        for qvec in queries:
+            start = time.perf_counter()
+            _per_call_client(args.url, qvec)
+            samples.append(time.perf_counter() - start)
+        results["per-call client"] = _percentiles(samples)
+
+    samples = []
+    for qvec in queries:
+        start = time.perf_counter()
+        _shared_client(qvec)
+        samples.append(time.perf_counter() - start)
+    results["shared client"] = _percentiles(samples)
+
+    for name, stats in results.items():
+        print(f"{name:<16} p50={stats['p50']:.2f}ms p95={stats['p95']:.2f}ms mean={stats['mean']:.2f}ms")
+
+    client.delete_collection(COLLECTION)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+
+from db.psql_connector import default_config, DB_POOL_CONNECTIONS
+
+logger = logging.getLogger(__name__)
+
+ASYNC_DB_POOL_MIN = int(os.getenv("ASYNC_DB_POOL_MIN", "2"))
+ASYNC_DB_POOL_MAX = int(os.getenv("ASYNC_DB_POOL_MAX", "20"))
+ASYNC_DB_POOL_TIMEOUT = float(os.getenv("ASYNC_DB_POOL_TIMEOUT", "30"))
+
+_pool: Optional[AsyncConnectionPool] = None
+_pool_lock = asyncio.Lock()
+
+
+def _conninfo(params: Dict[str, str]) -> str:
+    # database.ini uses psycopg2's "database" alias, libpq expects "dbname"
+    params = dict(params)
+    if "database" in params:
+        params["dbname"] = params.pop("database")
+    return make_conninfo(**params)
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    """Return the process-wide async pool, opening it on first use."""
+    global _pool
+    if _pool is not None:
+        return _pool
+    async with _pool_lock:
+        if _pool is not None:
+            return _pool
+        pool = AsyncConnectionPool(
+            _conninfo(default_config()),
+            min_size=ASYNC_DB_POOL_MIN,
+            max_size=ASYNC_DB_POOL_MAX,
+            timeout=ASYNC_DB_POOL_TIMEOUT,
+            kwargs={"row_factory": dict_row},
+            check=AsyncConnectionPool.check_connection,
+            open=False,
+        )
+        await pool.open()
+        _pool = pool
+        DB_POOL_CONNECTIONS.labels(pool="async", state="in_use").set_function(
+            lambda: _stat("pool_size") - _stat("pool_available")
+        )
+        DB_POOL_CONNECTIONS.labels(pool="async", state="idle").set_function(
+            lambda: _stat("pool_available")
+        )
+        DB_POOL_CONNECTIONS.labels(pool="async", state="waiting").set_function(
+            lambda: _stat("requests_waiting")
+        )
+        logger.info(f"Opened async Postgres pool (min={ASYNC_DB_POOL_MIN}, max={ASYNC_DB_POOL_MAX})")
+    return _pool
+
+
+def _stat(name: str) -> int:
+    if _pool is None:
+        return 0
+    return _pool.get_stats().get(name, 0)
+
+
+async def close_async_pool() -> None:
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+async def fetch_all(query: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        cursor = await conn.execute(query, params)
+        return await cursor.fetchall()
+
+
+async def execute(query: str, params: Sequence[Any] = ()) -> None:
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        await conn.execute(query, params)
+
+
+async def execute_many(query: str, params_seq: Sequence[Sequence[Any]]) -> None:
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.executemany(query, params_seq)
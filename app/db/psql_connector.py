@@ -1,7 +1,25 @@
 #! /usr/bin/python
 from configparser import ConfigParser
+import os
+import threading
+import time
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
+from prometheus_client import Gauge
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_HEALTHCHECK = os.getenv("DB_POOL_HEALTHCHECK", "true").lower() == "true"
+DB_POOL_HEALTHCHECK_IDLE = float(os.getenv("DB_POOL_HEALTHCHECK_IDLE", "30"))
+
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Postgres pool connections by state", ["pool", "state"]
+)
+
+_pools = {}
+_pools_lock = threading.Lock()
 
 
 def default_config(filename="db/database.ini", section="postgresql"):
@@ -56,12 +74,101 @@ def version():
             print("Database connection closed.")
 
 
+class BlockingConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """
+    ThreadedConnectionPool that waits for a free connection instead of
+    raising, and keeps up to `maxconn` connections open.
+
+    `minconn` connections are opened up front. psycopg2 closes every returned
+    connection above `minconn`, so once the initial connections are open the
+    retention limit is raised to `maxconn`. Otherwise connections would
+    still be opened and closed constantly under concurrent load.
+    """
+
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._returned_at = {}
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self.minconn = maxconn
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=DB_POOL_TIMEOUT):
+            raise psycopg2.pool.PoolError("timed out waiting for a pooled connection")
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        if close or conn.closed:
+            self._returned_at.pop(id(conn), None)
+        else:
+            self._returned_at[id(conn)] = time.monotonic()
+        super().putconn(conn, key, close)
+        self._slots.release()
+
+    def idle_seconds(self, conn) -> float:
+        """How long `conn` sat in the pool before this checkout (0 if new)."""
+        returned_at = self._returned_at.get(id(conn))
+        return time.monotonic() - returned_at if returned_at is not None else 0.0
+
+
+def get_pool(params) -> BlockingConnectionPool:
+    """Return the process-wide sync connection pool for these parameters."""
+    key = tuple(sorted(params.items()))
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = BlockingConnectionPool(DB_POOL_MIN, DB_POOL_MAX, **params)
+                _pools[key] = pool
+                DB_POOL_CONNECTIONS.labels(pool="sync", state="in_use").set_function(
+                    lambda: sum(len(p._used) for p in _pools.values())
+                )
+                DB_POOL_CONNECTIONS.labels(pool="sync", state="idle").set_function(
+                    lambda: sum(len(p._pool) for p in _pools.values())
+                )
+    return pool
+
+
+def _checkout(pool):
+    """Take a connection from the pool, replacing it if it has gone stale."""
+    conn = pool.getconn()
+    if conn.closed:
+        pool.putconn(conn, close=True)
+        return pool.getconn()
+    # Only connections that sat idle for a while are worth a round trip
+    if DB_POOL_HEALTHCHECK and pool.idle_seconds(conn) >= DB_POOL_HEALTHCHECK_IDLE:
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+        except psycopg2.Error:
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+    return conn
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.closeall()
+        _pools.clear()
+
+
 class DB:
     conn = None
     cursor = None
-
-    def __init__(self, params, cf=psycopg2.extras.RealDictCursor) -> None:
-        self.conn = psycopg2.connect(**params)
+    pool = None
+
+    def __init__(self, params, cf=psycopg2.extras.RealDictCursor, pooled=True) -> None:
+        if pooled:
+            self.pool = get_pool(params)
+            self.conn = _checkout(self.pool)
+        else:
+            self.conn = psycopg2.connect(**params)
         self.cursor = self.conn.cursor(cursor_factory=cf)
 
     def execute(self, query, params=None):
@@ -99,8 +206,16 @@ class DB:
     def close(self):
         if self.cursor is not None:
             self.cursor.close()
+            self.cursor = None
         if self.conn is not None:
-            self.conn.close()
+            if self.pool is not None:
+                # Discard any uncommitted work before the connection is reused
+                if not self.conn.closed:
+                    self.conn.rollback()
+                self.pool.putconn(self.conn, close=bool(self.conn.closed))
+            else:
+                self.conn.close()
+            self.conn = None
 
     def __del__(self):
         self.close()
@@ -6,8 +6,16 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from prometheus_fastapi_instrumentator import Instrumentator
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.v1.chat.base import router as multi_agent_router
+from api.v1.chat.base import router as multi_agent_router, init_chat_graph
 from api.v1.chat.document_agent import router as document_router
+from api.v1.chat.vectorstore import close_clients
+from db.async_db import get_async_pool, close_async_pool
+from db.psql_connector import close_pools
+from api.v1.chat.history_writer import history_writer
+from api.v1.chat.history_store import deletion_watcher
+from api.v1.chat.extraction import extraction_executor
+from api.v1.chat.ingest_jobs import ingestion_jobs
+from api.v1.chat.session_store import close_postgres_checkpointer
 
 app = FastAPI(title="ASK Finance Agent")
 Instrumentator().instrument(app).expose(app)
@@ -16,6 +24,25 @@ Instrumentator().instrument(app).expose(app)
 app.include_router(multi_agent_router, prefix="/api/v1")
 app.include_router(document_router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def open_db_pools():
+    await get_async_pool()
+    history_writer.start()
+    deletion_watcher.start()
+    ingestion_jobs.start()
+    await init_chat_graph()
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    await history_writer.stop()
+    await deletion_watcher.stop()
+    await ingestion_jobs.stop()
+    await close_clients()
+    await close_async_pool()
+    await close_postgres_checkpointer()
+    close_pools()
+    extraction_executor.shutdown()
+
 config = dotenv_values(".env")
 
 origins = ["*"]
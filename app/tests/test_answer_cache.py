@@ -0,0 +1,68 @@
+import types
+
+import pytest
+
+from api.v1.chat import answer_cache as answer_cache_module
+from api.v1.chat.answer_cache import SemanticAnswerCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache_module, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_similar_query_hits():
+    cache = SemanticAnswerCache(threshold=0.95, max_per_domain=10, ttl=3600)
+    pages = [{"source": "policy.pdf", "pages": [4, 5]}]
+    cache.store("hr", [1.0, 0.0, 0.0], "leave days?", "20 days", ["policy.pdf"], pages)
+    hit = cache.lookup("hr", [0.99, 0.05, 0.0])
+    assert hit["answer"] == "20 days"
+    assert hit["sources"] == ["policy.pdf"]
+    assert hit["pages"] == pages
+    assert hit["similarity"] >= 0.95
+
+
+def test_answers_stored_without_pages_return_none():
+    cache = SemanticAnswerCache(threshold=0.9, max_per_domain=10, ttl=3600)
+    cache.store("hr", [1.0, 0.0], "q", "a", ["web"])
+    assert cache.lookup("hr", [1.0, 0.0])["pages"] == []
+
+
+def test_dissimilar_query_and_other_domain_miss():
+    cache = SemanticAnswerCache(threshold=0.95, max_per_domain=10, ttl=3600)
+    cache.store("hr", [1.0, 0.0], "leave days?", "20 days", [])
+    assert cache.lookup("hr", [0.0, 1.0]) is None
+    assert cache.lookup("finance", [1.0, 0.0]) is None
+
+
+def test_entries_expire(clock):
+    cache = SemanticAnswerCache(threshold=0.9, max_per_domain=10, ttl=60)
+    cache.store("hr", [1.0, 0.0], "q", "a", [])
+    clock[0] += 61
+    assert cache.lookup("hr", [1.0, 0.0]) is None
+
+
+def test_oldest_answers_are_dropped_past_the_domain_limit():
+    cache = SemanticAnswerCache(threshold=0.99, max_per_domain=2, ttl=3600)
+    cache.store("hr", [1.0, 0.0, 0.0], "first", "a1", [])
+    cache.store("hr", [0.0, 1.0, 0.0], "second", "a2", [])
+    cache.store("hr", [0.0, 0.0, 1.0], "third", "a3", [])
+    assert cache.lookup("hr", [1.0, 0.0, 0.0]) is None
+    assert cache.lookup("hr", [0.0, 0.0, 1.0])["answer"] == "a3"
+
+
+def test_invalidate_clears_the_domain():
+    cache = SemanticAnswerCache(threshold=0.9, max_per_domain=10, ttl=3600)
+    cache.store("hr", [1.0, 0.0], "q", "a", [])
+    cache.invalidate("hr")
+    assert cache.lookup("hr", [1.0, 0.0]) is None
+
+
+def test_dimension_change_drops_the_domain():
+    cache = SemanticAnswerCache(threshold=0.9, max_per_domain=10, ttl=3600)
+    cache.store("hr", [1.0, 0.0], "q", "a", [])
+    assert cache.lookup("hr", [1.0, 0.0, 0.0]) is None
+    cache.store("hr", [1.0, 0.0, 0.0], "q", "a3", [])
+    assert cache.lookup("hr", [1.0, 0.0, 0.0])["answer"] == "a3"
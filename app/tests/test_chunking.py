@@ -0,0 +1,84 @@
+import pytest
+
+from api.v1.chat.chunking import IncrementalChunker, chunk_segments, chunk_text, split_units, token_counts
+
+
+def test_markdown_and_standalone_titles_are_headings():
+    text = "# Leave\nStaff get leave.\n\n1.2 Sick Leave\n\nA certificate is needed.\n\nBENEFITS\n\nSee the handbook."
+    headings = [unit for unit, is_heading in split_units(text) if is_heading]
+    assert headings == ["Leave", "1.2 Sick Leave", "BENEFITS"]
+
+
+def test_wrapped_number_prefixed_line_is_not_a_heading():
+    text = "2023 Results were driven by higher interest income and lower\nnet charge-offs. Costs rose."
+    units = list(split_units(text))
+    assert not any(is_heading for _, is_heading in units)
+    assert units[0][0] == "2023 Results were driven by higher interest income and lower net charge-offs."
+
+
+def test_running_page_header_does_not_split_the_page():
+    page = "ANNUAL REPORT 2023\nRevenue grew in every segment.\nMargins held steady."
+    assert not any(is_heading for _, is_heading in split_units(page))
+
+
+def test_sentences_are_split():
+    units = [unit for unit, _ in split_units("First one. Second one! Third one?")]
+    assert units == ["First one.", "Second one!", "Third one?"]
+
+
+def test_chunks_respect_the_token_budget():
+    text = " ".join(f"Sentence number {i} talks about quarterly revenue." for i in range(200))
+    chunks = chunk_text(text, chunk_size=64, chunk_overlap=8)
+    assert len(chunks) > 1
+    assert max(token_counts(chunks)) <= 64
+
+
+def test_heading_is_repeated_and_never_crossed():
+    text = "# Leave\n" + " ".join("Leave rules apply to everyone here." for _ in range(30)) + "\n\n# Pay\nPay is monthly."
+    chunks = chunk_text(text, chunk_size=40, chunk_overlap=0)
+    leave, pay = chunks[:-1], chunks[-1]
+    assert all(chunk.startswith("Leave\n") for chunk in leave)
+    assert pay == "Pay\nPay is monthly."
+
+
+def test_overlap_repeats_trailing_sentences():
+    text = " ".join(f"Fact {i} is here." for i in range(40))
+    chunks = chunk_text(text, chunk_size=30, chunk_overlap=10)
+    first_of_next = chunks[1].split(". ")[0] + "."
+    last_of_first = chunks[0].rsplit(". ", 1)[-1]
+    assert first_of_next in chunks[0]
+    assert last_of_first in chunks[1]
+
+
+def test_overlap_never_pushes_a_chunk_over_budget():
+    sentences = ["A" * 100 + "."] * 9 + ["B" * 950 + ".", "A" * 100 + "."]
+    chunks = list(chunk_segments([(None, " ".join(sentences))], chunk_size=256, chunk_overlap=32))
+    assert len(chunks) > 1
+    assert all(chunk["tokens"] <= 256 for chunk in chunks)
+    assert max(token_counts([chunk["text"] for chunk in chunks])) <= 256
+
+
+def test_overlong_sentence_is_hard_split():
+    chunks = chunk_text("word " * 1000, chunk_size=50, chunk_overlap=0)
+    assert len(chunks) > 1
+    assert max(token_counts(chunks)) <= 50
+
+
+def test_chunks_record_their_pages():
+    pages = [(1, "Page one text. " * 5), (2, "Page two text. " * 5)]
+    chunks = list(chunk_segments(pages, chunk_size=1000, chunk_overlap=0))
+    assert len(chunks) == 1
+    assert chunks[0]["pages"] == [1, 2]
+
+
+def test_incremental_chunker_emits_before_flush():
+    chunker = IncrementalChunker(chunk_size=20, chunk_overlap=0)
+    emitted = list(chunker.feed(" ".join(f"Line {i} of the text." for i in range(20)), page=1))
+    assert emitted
+    assert list(chunker.flush())
+    assert list(chunker.flush()) == []
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        IncrementalChunker(chunk_size=10, chunk_overlap=10)
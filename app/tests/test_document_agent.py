@@ -0,0 +1,55 @@
+import pytest
+from pydantic import ValidationError
+
+from api.v1.chat.chunking import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, CHUNK_TOKENS
+from api.v1.chat.document_agent import BulkLinkRequest, document_source, source_pages
+
+
+def _hit(point_id: str, payload: dict) -> dict:
+    return {"id": point_id, "score": 0.5, "payload": payload}
+
+
+def test_source_prefers_url_then_source_then_point_id():
+    assert document_source(_hit("1", {"url": "https://x/a", "source": "a.pdf"})) == "https://x/a"
+    assert document_source(_hit("2", {"source": "a.pdf"})) == "a.pdf"
+    assert document_source(_hit("3", {})) == "3"
+
+
+def test_pages_are_grouped_per_source():
+    hits = [
+        _hit("1", {"source": "a.pdf", "pages": [3, 4]}),
+        _hit("2", {"source": "b.pdf", "pages": [1]}),
+        _hit("3", {"source": "a.pdf", "pages": [4, 9]}),
+        _hit("4", {"url": "https://x/page"}),
+    ]
+    assert source_pages(hits) == [
+        {"source": "a.pdf", "pages": [3, 4, 9]},
+        {"source": "b.pdf", "pages": [1]},
+    ]
+
+
+def _links(**chunking) -> BulkLinkRequest:
+    return BulkLinkRequest(urls=["https://example.com/"], domain="hr", **chunking)
+
+
+def test_chunk_sizes_default_to_the_token_settings():
+    assert _links().token_sizes() == (CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS)
+
+
+def test_legacy_character_sizes_are_converted_to_tokens():
+    assert _links(chunk_size=1000, chunk_overlap=200).token_sizes() == (250, 50)
+
+
+def test_token_fields_take_precedence():
+    assert _links(chunk_tokens=128, overlap_tokens=16, chunk_size=1000, chunk_overlap=200).token_sizes() == (128, 16)
+
+
+@pytest.mark.parametrize("chunking", [
+    {"chunk_tokens": CHUNK_MAX_TOKENS + 1},
+    {"chunk_size": CHUNK_MAX_TOKENS * 4 + 1},
+    {"chunk_tokens": 64, "overlap_tokens": 64},
+    {"chunk_size": 400, "chunk_overlap": 400},
+])
+def test_oversized_or_inconsistent_sizes_are_rejected(chunking):
+    with pytest.raises(ValidationError):
+        _links(**chunking)
@@ -0,0 +1,40 @@
+from api.v1.chat.embedding_cache import EmbeddingCache, normalize_query
+
+
+def test_normalize_query_ignores_case_and_whitespace():
+    assert normalize_query("  What is   the\tLeave POLICY?\n") == "what is the leave policy?"
+
+
+def test_keys_differ_by_model_and_dimensionality():
+    key = EmbeddingCache.make_key("text-embedding-004", "Leave policy", 768)
+    assert key == EmbeddingCache.make_key("text-embedding-004", "leave   POLICY", 768)
+    assert key != EmbeddingCache.make_key("text-embedding-004", "leave policy", 256)
+    assert key != EmbeddingCache.make_key("gemini-embedding-001", "leave policy", 768)
+
+
+def test_get_returns_stored_vector():
+    cache = EmbeddingCache(maxsize=4, ttl=60, backend="memory")
+    key = cache.make_key("model", "query", None)
+    assert cache.get(key) is None
+    cache.set(key, [0.1, 0.2])
+    assert cache.get(key) == [0.1, 0.2]
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = EmbeddingCache(maxsize=2, ttl=60, backend="memory")
+    first, second, third = (cache.make_key("model", text, None) for text in ("a", "b", "c"))
+    cache.set(first, [1.0])
+    cache.set(second, [2.0])
+    cache.get(first)
+    cache.set(third, [3.0])
+    assert cache.get(first) == [1.0]
+    assert cache.get(second) is None
+    assert cache.get(third) == [3.0]
+
+
+def test_clear_empties_the_local_tier():
+    cache = EmbeddingCache(maxsize=4, ttl=60, backend="memory")
+    key = cache.make_key("model", "query", None)
+    cache.set(key, [0.5])
+    cache.clear()
+    assert cache.get(key) is None
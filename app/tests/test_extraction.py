@@ -0,0 +1,46 @@
+import pandas as pd
+
+from api.v1.chat.chunking import token_counts
+from api.v1.chat.extraction import table_chunks
+
+
+def _frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {"Region": [f"Region {i}" for i in range(rows)], "Revenue": [f"{i * 1000}" for i in range(rows)]}
+    )
+
+
+def test_every_chunk_repeats_caption_and_header():
+    chunks = table_chunks(_frame(200), caption="Table 3 (page 7)", max_tokens=64)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.startswith("Table 3 (page 7)\nRegion | Revenue\n")
+
+
+def test_chunks_stay_within_budget_and_keep_every_row():
+    chunks = table_chunks(_frame(200), max_tokens=64)
+    assert max(token_counts(chunks)) <= 64
+    rows = [line for chunk in chunks for line in chunk.split("\n")[1:]]
+    assert rows == [f"Region {i} | {i * 1000}" for i in range(200)]
+
+
+def test_overlong_row_is_split():
+    frame = pd.DataFrame({"Note": ["word " * 400, "short"]})
+    chunks = table_chunks(frame, max_tokens=50)
+    assert len(chunks) > 2
+    assert max(token_counts(chunks)) <= 50
+    assert chunks[-1].endswith("short")
+
+
+def test_overlong_header_is_cut_to_leave_room_for_rows():
+    frame = pd.DataFrame([["a", "b"]], columns=["x" * 1000, "y"])
+    chunks = table_chunks(frame, max_tokens=40)
+    assert len(chunks) == 1
+    assert token_counts(chunks)[0] <= 40
+    assert chunks[0].endswith("a | b")
+
+
+def test_blank_rows_are_dropped_and_no_budget_gives_one_chunk():
+    frame = pd.DataFrame({"A": ["1", None, " "], "B": ["x", None, ""]})
+    assert table_chunks(frame, max_tokens=None) == ["A | B\n1 | x"]
+    assert table_chunks(pd.DataFrame(), max_tokens=None) == []
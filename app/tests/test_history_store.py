@@ -0,0 +1,53 @@
+import asyncio
+
+from api.v1.chat import history_store
+from api.v1.chat.history_store import RecentHistoryCache, load_recent_history
+from api.v1.chat.history_writer import ChatHistoryWriter
+from db import async_db
+
+
+class FakeHistoryTable:
+    """ask_hr_history in memory; the tail query yields once so a flush can race it."""
+
+    def __init__(self, writer: ChatHistoryWriter):
+        self.writer = writer
+        self.rows = []
+
+    async def execute(self, query, params):
+        self.rows.extend(
+            {"chat_id": params[i], "role": params[i + 1], "message": params[i + 2]}
+            for i in range(0, len(params), 4)
+        )
+
+    async def fetch_all(self, query, params):
+        chat_id, limit = params
+        result = [row for row in self.rows if row["chat_id"] == chat_id][-limit:]
+        # A background flush gets the event loop while the query is in flight
+        flush = asyncio.ensure_future(self.writer.flush())
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.flush = flush
+        return result
+
+
+def test_flush_between_query_and_merge_does_not_drop_a_turn(monkeypatch):
+    writer = ChatHistoryWriter(write_behind=True, flush_size=100, flush_interval=60)
+    table = FakeHistoryTable(writer)
+    monkeypatch.setattr(async_db, "execute", table.execute)
+    monkeypatch.setattr(async_db, "fetch_all", table.fetch_all)
+    monkeypatch.setattr(history_store, "history_writer", writer)
+    monkeypatch.setattr(history_store, "recent_history", RecentHistoryCache(turns=5, max_chats=10, ttl=60))
+
+    async def scenario():
+        await writer.save_turn("chat", "first question", "first answer")
+        await writer.flush()
+        await writer.save_turn("chat", "second question", "second answer")
+        messages = await load_recent_history("chat", turns=5)
+        await table.flush
+        return messages
+
+    messages = asyncio.run(scenario())
+    assert [m["content"] for m in messages] == [
+        "first question", "first answer", "second question", "second answer",
+    ]
+    assert len(table.rows) == 4
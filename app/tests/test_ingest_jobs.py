@@ -0,0 +1,48 @@
+import uuid
+
+from api.v1.chat.ingest_jobs import _with_progress
+
+
+def _row(**overrides) -> dict:
+    row = {
+        "job_id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "kind": "links",
+        "domain": "hr",
+        "status": "running",
+        "total_documents": 100,
+        "processed_documents": 18,
+        "failed_documents": 2,
+        "chunks": 400,
+        "elapsed_seconds": 10.0,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_running_job_reports_rate_progress_and_eta():
+    job = _with_progress(_row())
+    assert job["job_id"] == "12345678-1234-5678-1234-567812345678"
+    assert job["documents_per_second"] == 2.0
+    assert job["chunks_per_second"] == 40.0
+    assert job["progress"] == 0.2
+    assert job["eta_seconds"] == 40.0
+
+
+def test_finished_job_has_no_eta():
+    job = _with_progress(_row(status="done", processed_documents=100, failed_documents=0))
+    assert job["progress"] == 1.0
+    assert job["eta_seconds"] is None
+
+
+def test_job_that_has_not_started_reports_zero_rates():
+    job = _with_progress(_row(status="queued", processed_documents=0, failed_documents=0, chunks=0, elapsed_seconds=None))
+    assert job["elapsed_seconds"] == 0.0
+    assert job["documents_per_second"] == 0.0
+    assert job["chunks_per_second"] == 0.0
+    assert job["eta_seconds"] is None
+
+
+def test_unknown_total_has_no_progress():
+    job = _with_progress(_row(total_documents=None))
+    assert job["progress"] is None
+    assert job["eta_seconds"] is None
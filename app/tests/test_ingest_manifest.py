@@ -0,0 +1,38 @@
+from api.v1.chat import ingest_manifest
+from api.v1.chat.ingest_manifest import chunk_hash, chunk_point_id, plan_source_sync
+
+
+def _point_id(text: str) -> str:
+    return chunk_point_id("hr", "policy.pdf", chunk_hash(text))
+
+
+def test_point_ids_are_stable_and_scoped_to_the_source():
+    assert _point_id("chunk") == _point_id("chunk")
+    assert _point_id("chunk") != chunk_point_id("hr", "other.pdf", chunk_hash("chunk"))
+    assert _point_id("chunk") != chunk_point_id("finance", "policy.pdf", chunk_hash("chunk"))
+
+
+def test_new_source_embeds_every_distinct_chunk(monkeypatch):
+    monkeypatch.setattr(ingest_manifest, "load_manifest", lambda collection, source: set())
+    plan = plan_source_sync("hr", "policy.pdf", ["a", "b", "a", "c"])
+    assert [pos for pos, _ in plan["to_embed"]] == [0, 1, 3]
+    assert [index for _, index, _ in plan["entries"]] == [0, 1, 2]
+    assert plan["stale"] == []
+
+
+def test_unchanged_chunks_are_skipped_and_removed_ones_are_stale(monkeypatch):
+    existing = {_point_id("a"), _point_id("b")}
+    monkeypatch.setattr(ingest_manifest, "load_manifest", lambda collection, source: existing)
+    plan = plan_source_sync("hr", "policy.pdf", ["a", "c"])
+    assert plan["to_embed"] == [(1, _point_id("c"))]
+    assert plan["stale"] == [_point_id("b")]
+
+
+def test_unreadable_manifest_re_embeds_everything(monkeypatch):
+    def fail(collection, source):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(ingest_manifest, "load_manifest", fail)
+    plan = plan_source_sync("hr", "policy.pdf", ["a", "b"])
+    assert len(plan["to_embed"]) == 2
+    assert plan["stale"] == []
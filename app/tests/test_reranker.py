@@ -0,0 +1,60 @@
+import pytest
+
+from api.v1.chat import reranker
+from api.v1.chat.reranker import select_context
+
+
+def _hit(point_id: str, text: str) -> dict:
+    return {"id": point_id, "score": 0.5, "payload": {"page_content": text}}
+
+
+@pytest.fixture(autouse=True)
+def word_tokens(monkeypatch):
+    # One token per word keeps the budget arithmetic readable
+    monkeypatch.setattr(reranker, "token_counts", lambda texts: [len(text.split()) for text in texts])
+    monkeypatch.setattr(reranker, "RERANK_ENABLED", False)
+
+
+def test_near_duplicates_are_dropped():
+    hits = [
+        _hit("a", "annual leave is twenty working days per calendar year for all staff"),
+        _hit("b", "annual leave is twenty working days per calendar year for all staff members"),
+        _hit("c", "sick leave requires a medical certificate after two days"),
+    ]
+    assert [hit["id"] for hit in select_context("leave", hits, token_budget=100)] == ["a", "c"]
+
+
+def test_chunks_past_the_budget_are_skipped_but_smaller_ones_still_fit():
+    hits = [
+        _hit("a", "one two three four five six"),
+        _hit("b", "seven eight nine ten eleven twelve thirteen"),
+        _hit("c", "fourteen fifteen"),
+    ]
+    assert [hit["id"] for hit in select_context("q", hits, token_budget=9)] == ["a", "c"]
+
+
+def test_best_chunk_is_kept_even_over_budget():
+    hits = [_hit("a", "one two three four five"), _hit("b", "six")]
+    assert [hit["id"] for hit in select_context("q", hits, token_budget=2)] == ["a"]
+
+
+def test_hits_without_text_are_ignored():
+    hits = [{"id": "empty", "score": 0.9, "payload": {}}, _hit("a", "some text")]
+    assert [hit["id"] for hit in select_context("q", hits, token_budget=100)] == ["a"]
+
+
+def test_reranker_failure_keeps_vector_order(monkeypatch):
+    def fail(query, hits):
+        raise RuntimeError("model missing")
+
+    monkeypatch.setattr(reranker, "RERANK_ENABLED", True)
+    monkeypatch.setattr(reranker, "rerank", fail)
+    hits = [_hit("a", "first chunk text"), _hit("b", "second chunk body")]
+    assert [hit["id"] for hit in select_context("q", hits, token_budget=100)] == ["a", "b"]
+
+
+def test_reranked_order_is_used(monkeypatch):
+    monkeypatch.setattr(reranker, "RERANK_ENABLED", True)
+    monkeypatch.setattr(reranker, "rerank", lambda query, hits: list(reversed(hits)))
+    hits = [_hit("a", "first chunk text"), _hit("b", "second chunk body")]
+    assert [hit["id"] for hit in select_context("q", hits, token_budget=100)] == ["b", "a"]
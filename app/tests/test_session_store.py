@@ -0,0 +1,59 @@
+import types
+
+import pytest
+
+from api.v1.chat import session_store
+from api.v1.chat.session_store import BoundedSessionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store, "time", types.SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_least_recently_used_session_is_evicted():
+    store = BoundedSessionStore("test_lru", max_entries=2, idle_ttl=3600, max_bytes=1 << 20)
+    store["a"] = {"messages": []}
+    store["b"] = {"messages": []}
+    store["a"]
+    store["c"] = {"messages": []}
+    assert set(store) == {"a", "c"}
+
+
+def test_idle_sessions_expire(clock):
+    store = BoundedSessionStore("test_ttl", max_entries=10, idle_ttl=60, max_bytes=1 << 20)
+    store["idle"] = {"messages": []}
+    clock[0] += 30
+    store["active"] = {"messages": []}
+    clock[0] += 40
+    assert "idle" not in store
+    assert "active" in store
+
+
+def test_byte_ceiling_evicts_oldest_sessions():
+    store = BoundedSessionStore("test_bytes", max_entries=10, idle_ttl=3600, max_bytes=3000)
+    store["old"] = {"messages": ["x" * 1000]}
+    store["new"] = {"messages": ["y" * 1000]}
+    store["newest"] = {"messages": ["z" * 1000]}
+    assert "old" not in store
+    assert "newest" in store
+
+
+def test_reassigning_a_session_updates_its_size():
+    store = BoundedSessionStore("test_resize", max_entries=10, idle_ttl=3600, max_bytes=1 << 20)
+    session = {"messages": []}
+    store["chat"] = session
+    before = store._bytes
+    session["messages"].append({"role": "user", "content": "x" * 500})
+    store["chat"] = session
+    assert store._bytes > before + 500
+
+
+def test_delete_releases_bytes():
+    store = BoundedSessionStore("test_delete", max_entries=10, idle_ttl=3600, max_bytes=1 << 20)
+    store["chat"] = {"messages": ["hello"]}
+    del store["chat"]
+    assert len(store) == 0
+    assert store._bytes == 0
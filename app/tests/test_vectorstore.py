@@ -0,0 +1,100 @@
+from datetime import date, datetime
+
+import pytest
+from qdrant_client import models
+
+from api.v1.chat.vectorstore import build_filter, merge_domain_results, parse_point_cursor
+
+
+def _hit(point_id: str, score: float) -> dict:
+    return {"id": point_id, "score": score, "payload": {}}
+
+
+def test_domains_are_ranked_on_their_own_scale():
+    grouped = {
+        # Dense collection with high raw scores
+        "hr": [_hit("hr-1", 0.91), _hit("hr-2", 0.89), _hit("hr-3", 0.80)],
+        # Fused hybrid scores live on a much smaller scale
+        "finance": [_hit("fin-1", 0.05), _hit("fin-2", 0.01)],
+    }
+    merged = merge_domain_results(grouped, limit=3)
+    assert {hit["id"] for hit in merged[:2]} == {"hr-1", "fin-1"}
+    assert all(hit["normalized_score"] == 1.0 for hit in merged[:2])
+    assert merged[0]["id"] == "hr-1"
+    assert merged[2]["domain"] in {"hr", "finance"}
+
+
+def test_hits_are_tagged_with_their_domain_and_limited():
+    grouped = {"hr": [_hit("a", 0.5), _hit("b", 0.4)], "it": [_hit("c", 0.3)], "empty": []}
+    merged = merge_domain_results(grouped, limit=2)
+    assert len(merged) == 2
+    assert {hit["domain"] for hit in merged} <= {"hr", "it"}
+
+
+def test_equal_scores_in_a_domain_normalize_to_one():
+    merged = merge_domain_results({"hr": [_hit("a", 0.7), _hit("b", 0.7)]}, limit=5)
+    assert [hit["normalized_score"] for hit in merged] == [1.0, 1.0]
+
+
+def test_lowest_hit_of_each_domain_normalizes_to_zero():
+    merged = merge_domain_results({"hr": [_hit("a", 0.9), _hit("b", 0.6), _hit("c", 0.3)]}, limit=5)
+    assert [hit["id"] for hit in merged] == ["a", "b", "c"]
+    assert merged[1]["normalized_score"] == 0.5
+    assert merged[2]["normalized_score"] == 0.0
+
+
+def _condition(query_filter: models.Filter, key: str):
+    return next(condition for condition in query_filter.must if getattr(condition, "key", None) == key)
+
+
+def test_empty_filters_build_no_filter():
+    assert build_filter(None) is None
+    assert build_filter({}) is None
+    assert build_filter({"source": [], "doc_type": None}) is None
+
+
+def test_single_values_and_lists_match_any():
+    query_filter = build_filter({"source": "policy.pdf", "doc_type": ["pdf", "docx"]})
+    assert _condition(query_filter, "source").match.any == ["policy.pdf"]
+    assert _condition(query_filter, "doc_type").match.any == ["pdf", "docx"]
+
+
+def test_date_to_includes_its_whole_day():
+    query_filter = build_filter({"date_from": "2024-01-01", "date_to": "2024-01-31"})
+    date_range = _condition(query_filter, "date").range
+    assert date_range.gte == datetime(2024, 1, 1)
+    assert date_range.lt == datetime(2024, 2, 1)
+
+
+def test_date_objects_and_open_ranges():
+    query_filter = build_filter({"date_to": date(2024, 12, 31)})
+    date_range = _condition(query_filter, "date").range
+    assert date_range.gte is None
+    assert date_range.lt == datetime(2025, 1, 1)
+
+
+def test_text_content_type_also_matches_points_without_one():
+    content_type = build_filter({"content_type": ["text"]}).must[0]
+    assert isinstance(content_type, models.Filter)
+    assert content_type.should[0].match.any == ["text"]
+    assert content_type.should[1].is_empty.key == "content_type"
+
+
+def test_table_content_type_matches_only_tables():
+    content_type = build_filter({"content_type": "table"}).must[0]
+    assert content_type.key == "content_type"
+    assert content_type.match.any == ["table"]
+
+
+def test_cursor_round_trips_integer_and_uuid_ids():
+    assert parse_point_cursor(None) is None
+    assert parse_point_cursor("") is None
+    assert parse_point_cursor("42") == 42
+    point_id = "8f14e45f-ceea-467f-a9f2-7b2d3c1e9a00"
+    assert parse_point_cursor(point_id.upper()) == point_id
+
+
+@pytest.mark.parametrize("cursor", ["-1", "abc", "12ab", "8f14e45f-ceea"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        parse_point_cursor(cursor)
@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS ask_hr_history (
+    id SERIAL PRIMARY KEY,
+    chat_id VARCHAR(255) NOT NULL,
+    role VARCHAR(50) NOT NULL,
+    message TEXT NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_ask_hr_history_chat_id_timestamp
+    ON ask_hr_history (chat_id, timestamp DESC);
@@ -0,0 +1,14 @@
+CREATE TABLE IF NOT EXISTS documents (
+    id SERIAL PRIMARY KEY,
+    document_id UUID NOT NULL,
+    collection_id TEXT,
+    chunk_index INT,
+    total_chunks INT,
+    content TEXT,
+    source TEXT,
+    metadata JSONB,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_documents_collection_source
+    ON documents (collection_id, source);
@@ -0,0 +1,28 @@
+CREATE TABLE IF NOT EXISTS ingestion_jobs (
+    job_id UUID PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,  -- 'links', 'onedrive' or 'reembed'
+    domain TEXT NOT NULL,
+    status VARCHAR(50) NOT NULL DEFAULT 'queued',  -- queued, running, completed, failed
+    params JSONB NOT NULL,
+    total_documents INT,
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    started_at TIMESTAMP,
+    heartbeat_at TIMESTAMP,
+    finished_at TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status_created
+    ON ingestion_jobs (status, created_at);
+
+-- One row per document of a job, written as each document finishes. A
+-- resumed job skips documents marked done; progress is counted from here.
+CREATE TABLE IF NOT EXISTS ingestion_job_items (
+    job_id UUID NOT NULL REFERENCES ingestion_jobs (job_id) ON DELETE CASCADE,
+    item_key TEXT NOT NULL,
+    status VARCHAR(50) NOT NULL,  -- 'done' or 'failed'
+    chunks INT NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (job_id, item_key)
+);
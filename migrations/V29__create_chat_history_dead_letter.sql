@@ -0,0 +1,10 @@
+-- Chat history rows the write-behind buffer could not insert
+CREATE TABLE IF NOT EXISTS ask_hr_history_dead_letter (
+    id SERIAL PRIMARY KEY,
+    chat_id VARCHAR(255),
+    role VARCHAR(50),
+    message TEXT,
+    timestamp TIMESTAMP,
+    error TEXT,
+    failed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,8 @@
+-- Deleted chat sessions, polled by every worker to evict its cached history
+CREATE TABLE IF NOT EXISTS chat_deletions (
+    chat_id VARCHAR(255) PRIMARY KEY,
+    deleted_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_deletions_deleted_at
+    ON chat_deletions (deleted_at);